@@ -112,11 +112,10 @@ def show_dashboard(db, face_service):
     with col4:
         # Calculate total faces detected
         try:
-            conn = db._connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT SUM(face_count) FROM images WHERE face_count > 0')
-            total_faces = cursor.fetchone()[0] or 0
-            conn.close()
+            with db._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT SUM(face_count) FROM images WHERE face_count > 0')
+                total_faces = cursor.fetchone()[0] or 0
             st.metric("🔍 Total Faces Detected", total_faces)
         except:
             st.metric("🔍 Total Faces Detected", "N/A")
@@ -129,18 +128,17 @@ def show_dashboard(db, face_service):
     with col1:
         # Articles by category
         try:
-            conn = db._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT topic_category, COUNT(*) as count 
-                FROM articles 
-                WHERE topic_category IS NOT NULL 
-                GROUP BY topic_category 
-                ORDER BY count DESC 
-                LIMIT 10
-            ''')
-            category_data = cursor.fetchall()
-            conn.close()
+            with db._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT topic_category, COUNT(*) as count 
+                    FROM articles 
+                    WHERE topic_category IS NOT NULL 
+                    GROUP BY topic_category 
+                    ORDER BY count DESC 
+                    LIMIT 10
+                ''')
+                category_data = cursor.fetchall()
             
             if category_data:
                 df_categories = pd.DataFrame(category_data, columns=['Category', 'Count'])
@@ -154,16 +152,15 @@ def show_dashboard(db, face_service):
     with col2:
         # Sentiment distribution
         try:
-            conn = db._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT sentiment_label, COUNT(*) as count 
-                FROM articles 
-                WHERE sentiment_label IS NOT NULL 
-                GROUP BY sentiment_label
-            ''')
-            sentiment_data = cursor.fetchall()
-            conn.close()
+            with db._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT sentiment_label, COUNT(*) as count 
+                    FROM articles 
+                    WHERE sentiment_label IS NOT NULL 
+                    GROUP BY sentiment_label
+                ''')
+                sentiment_data = cursor.fetchall()
             
             if sentiment_data:
                 df_sentiment = pd.DataFrame(sentiment_data, columns=['Sentiment', 'Count'])
@@ -178,16 +175,15 @@ def show_dashboard(db, face_service):
     st.subheader("📰 Recent Articles")
     try:
         # Use existing schema - get basic article info
-        conn = db._connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT article_id, title, target_uri, language, sentiment_label, sentiment_score, topic_category
-            FROM articles 
-            ORDER BY article_id DESC 
-            LIMIT 5
-        ''')
-        recent_articles = cursor.fetchall()
-        conn.close()
+        with db._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT article_id, title, target_uri, language, sentiment_label, sentiment_score, topic_category
+                FROM articles 
+                ORDER BY article_id DESC 
+                LIMIT 5
+            ''')
+            recent_articles = cursor.fetchall()
         
         if recent_articles:
             for article in recent_articles:
@@ -308,27 +304,26 @@ def show_articles(db):
     
     # Load articles using existing schema
     try:
-        conn = db._connect()
-        cursor = conn.cursor()
+        with db._checkout() as conn:
+            cursor = conn.cursor()
         
-        if search_query:
-            cursor.execute('''
-                SELECT article_id, title, target_uri, language, sentiment_label, sentiment_score, topic_category
-                FROM articles 
-                WHERE title LIKE ? OR cleaned_text LIKE ?
-                ORDER BY article_id DESC 
-                LIMIT 100
-            ''', (f'%{search_query}%', f'%{search_query}%'))
-        else:
-            cursor.execute('''
-                SELECT article_id, title, target_uri, language, sentiment_label, sentiment_score, topic_category
-                FROM articles 
-                ORDER BY article_id DESC 
-                LIMIT 100
-            ''')
+            if search_query:
+                cursor.execute('''
+                    SELECT article_id, title, target_uri, language, sentiment_label, sentiment_score, topic_category
+                    FROM articles 
+                    WHERE title LIKE ? OR cleaned_text LIKE ?
+                    ORDER BY article_id DESC 
+                    LIMIT 100
+                ''', (f'%{search_query}%', f'%{search_query}%'))
+            else:
+                cursor.execute('''
+                    SELECT article_id, title, target_uri, language, sentiment_label, sentiment_score, topic_category
+                    FROM articles 
+                    ORDER BY article_id DESC 
+                    LIMIT 100
+                ''')
         
-        articles = cursor.fetchall()
-        conn.close()
+            articles = cursor.fetchall()
         
         if articles:
             # Apply filters
@@ -351,15 +346,14 @@ def show_articles(db):
                         
                     # Show related images
                     try:
-                        conn = db._connect()
-                        cursor = conn.cursor()
-                        cursor.execute('''
-                            SELECT i.image_path, i.face_count, i.detected_faces
-                            FROM images i
-                            WHERE i.article_id = ?
-                        ''', (article[0],))
-                        images = cursor.fetchall()
-                        conn.close()
+                        with db._checkout() as conn:
+                            cursor = conn.cursor()
+                            cursor.execute('''
+                                SELECT i.image_path, i.face_count, i.detected_faces
+                                FROM images i
+                                WHERE i.article_id = ?
+                            ''', (article[0],))
+                            images = cursor.fetchall()
                         
                         if images:
                             st.write("**Related Images:**")
@@ -383,17 +377,16 @@ def show_images_and_faces(db, face_service):
     
     # Load images using existing schema
     try:
-        conn = db._connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT i.id, i.image_path, i.face_count, i.detected_faces, a.title as article_title
-            FROM images i
-            JOIN articles a ON i.article_id = a.article_id
-            ORDER BY i.id DESC 
-            LIMIT 50
-        ''')
-        images = cursor.fetchall()
-        conn.close()
+        with db._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT i.id, i.image_path, i.face_count, i.detected_faces, a.title as article_title
+                FROM images i
+                JOIN articles a ON i.article_id = a.article_id
+                ORDER BY i.id DESC 
+                LIMIT 50
+            ''')
+            images = cursor.fetchall()
         
         # Debug: Show what we found
         st.write(f"🔍 Found {len(images)} images in database")
@@ -494,16 +487,15 @@ def show_known_faces(db):
     
     # Display known faces using existing schema
     try:
-        conn = db._connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, name, encoding
-            FROM known_faces 
-            ORDER BY id DESC 
-            LIMIT 100
-        ''')
-        faces = cursor.fetchall()
-        conn.close()
+        with db._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, name, encoding
+                FROM known_faces 
+                ORDER BY id DESC 
+                LIMIT 100
+            ''')
+            faces = cursor.fetchall()
         
         if faces:
             # Search faces
@@ -537,17 +529,16 @@ def show_search(db):
         query = st.text_input("Search articles", placeholder="Enter keywords...")
         if query:
             try:
-                conn = db._connect()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT article_id, title, target_uri, language, sentiment_label, topic_category
-                    FROM articles 
-                    WHERE title LIKE ? OR cleaned_text LIKE ?
-                    ORDER BY article_id DESC 
-                    LIMIT 50
-                ''', (f'%{query}%', f'%{query}%'))
-                results = cursor.fetchall()
-                conn.close()
+                with db._checkout() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT article_id, title, target_uri, language, sentiment_label, topic_category
+                        FROM articles 
+                        WHERE title LIKE ? OR cleaned_text LIKE ?
+                        ORDER BY article_id DESC 
+                        LIMIT 50
+                    ''', (f'%{query}%', f'%{query}%'))
+                    results = cursor.fetchall()
                 
                 if results:
                     st.success(f"Found {len(results)} articles")
@@ -593,11 +584,10 @@ def show_analytics():
                 try:
                     from data_access.database import DatabaseManager
                     db = DatabaseManager()
-                    conn = db._connect()
-                    cursor = conn.cursor()
-                    cursor.execute('SELECT COUNT(*) FROM known_faces')
-                    total_encodings = cursor.fetchone()[0]
-                    conn.close()
+                    with db._checkout() as conn:
+                        cursor = conn.cursor()
+                        cursor.execute('SELECT COUNT(*) FROM known_faces')
+                        total_encodings = cursor.fetchone()[0]
                     st.metric("🔢 Total Encodings", total_encodings)
                 except:
                     st.metric("🔢 Total Encodings", "N/A")
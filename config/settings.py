@@ -5,7 +5,54 @@ MAX_WARC_FILES =10    # stop after this many WARC files
 MAX_HTML_PAGES = 12       # stop after this many HTML pages total
 MAX_IMAGES_PER_PAGE = 5   # max images to download from one HTML
 IMAGE_DOWNLOAD_TIMEOUT = 5  # seconds
+IMAGE_DOWNLOAD_WORKERS = 16      # threads fetching images across all pages, and so the cap on requests in flight
+IMAGE_DOWNLOAD_PER_HOST = 4      # concurrent connections to one image host
 MAX_PEOPLE = 10
+FACE_ENROLL_WORKERS = 1     # >1 encodes LFW people in a process pool during Phase 3
+FACE_MATCH_TOLERANCE = 0.6  # max encoding distance for a face to count as a known person
+FACE_SEARCH_BACKEND = "exact"  # "exact" brute force, or "ivf" approximate index for large galleries
+FACE_IVF_NPROBE = 8         # IVF cells searched per query; higher is slower but more accurate
+FACE_GALLERY_MODE = "full"  # "compact" matches against per-person centroids/prototypes
+FACE_PROTOTYPES_PER_PERSON = 3
+FACE_PROTOTYPE_MAX_THRESHOLD = 0.7  # upper bound for per-person adaptive thresholds
+FACE_DETECT_WORKERS = 1     # >1 runs Phase 4 face detection in a process pool
+FACE_DETECT_CHUNK_SIZE = 16  # images handed to a detection worker at a time
+FACE_DETECTOR_MODEL = "hog"  # face_recognition detector: "hog" (CPU) or "cnn"
+FACE_DETECT_MAX_SIDE = 1024  # longest side (px) HOG detection runs on; 0 = full resolution
+FACE_DECODE_MAX_SIDE = 2048  # longest side images are decoded to for encodings; 0 = full resolution
+FACE_TRIAGE_MIN_SIDE = 40    # images with a shorter side (px) cannot hold a detectable face
+FACE_TRIAGE_MAX_ASPECT_RATIO = 4.0  # wider/taller than this is a banner or strip, not a photo
+FACE_TRIAGE_CASCADE = False  # also require an OpenCV Haar cascade hit before HOG
+FACE_TRIAGE_CASCADE_SIDE = 512  # longest side (px) the cascade runs on
+FACE_REIDENTIFY_BATCH_SIZE = 5000  # stored faces re-matched per batch by reidentify_faces
+WARC_PROCESS_WORKERS = 1   # >1 scans WARC files in a process pool
+WARC_SCAN_CHUNK_PAGES = 8  # pages a scan worker sends back at a time
+WARC_SCAN_QUEUE_CHUNKS = 4  # chunks waiting for the parent before scan workers pause
+WARC_DOWNLOAD_WORKERS = 2  # WARC files downloaded in parallel
+WARC_VERIFY_CHECKSUM = True  # check MD5 when the server ETag is a plain digest
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # bytes
+WARC_STREAMING = False     # parse WARC records straight from the HTTP response
+WARC_STREAM_BUFFER_CHUNKS = 16  # chunks buffered ahead of the parser when streaming
+WARC_USE_INDEX = True      # read local WARCs through their .cdx.gz offset index
+WARC_DOMAIN_FILTER = None  # e.g. "bbc.co.uk" to only ingest pages from one site (indexed mode)
+
+HTML_CLEANER = "auto"       # "selectolax", "lxml", "bs4" or "auto" (first installed C parser)
+HTML_REMOVE_BOILERPLATE = False  # drop blocks whose class/id is a whole boilerplate token (share, cookie, ...)
+TEXT_BATCH_SIZE = 32        # articles run through the NLP models together in Phase 2
+TEXT_CLEAN_WORKERS = 1      # >1 cleans HTML in a process pool
+NLP_PIPE_BATCH_SIZE = 16    # spaCy nlp.pipe batch size
+NLP_PIPE_PROCESSES = 1      # spaCy nlp.pipe n_process
+SENTIMENT_BATCH_SIZE = 16   # documents per sentiment model forward pass
+TEXT_FOLLOW_MAPPINGS = False  # Phase 2 tails mappings.jsonl while Phase 1 is still writing it
+MAPPINGS_POLL_SECONDS = 1.0   # wait between checks for new pages when following
+MAPPINGS_IDLE_TIMEOUT = 600   # stop following after this many seconds without new pages (0 = never)
+
+# ==== Pipelined runner (main.py --pipeline) ====
+PIPELINE_QUEUE_SIZE = 64      # max items waiting between two stages; a full queue pauses the stage feeding it
+PIPELINE_TEXT_WORKERS = 1     # threads running Phase 2 batches
+PIPELINE_FACE_WORKERS = 1     # threads feeding Phase 4 batches; more only help with FACE_DETECT_WORKERS > 1,
+                              # in-process dlib detection is serialized and extra threads would just wait on it
 
 # ==== Paths ====
 BASE_DATA_PATH = "data"
@@ -13,11 +60,16 @@ BASE_DATA_PATH = "data"
 EXTRACTED_DATA_PATH = os.path.join(BASE_DATA_PATH, "extracted_data")
 HTML_SAVE_PATH = os.path.join(EXTRACTED_DATA_PATH, "html")
 IMAGES_SAVE_PATH = os.path.join(EXTRACTED_DATA_PATH, "images")
+MAPPINGS_PATH = os.path.join(EXTRACTED_DATA_PATH, "mappings.jsonl")  # one page per line, appended by Phase 1
+LEGACY_MAPPINGS_PATH = os.path.join(EXTRACTED_DATA_PATH, "mappings.json")  # written by older versions
 DATABASE_PATH = os.path.join(BASE_DATA_PATH, "database", "bibliotheca_alexandrina.db")
 LFW_DATASET_PATH = os.path.join(BASE_DATA_PATH, "datasets", "lfw", "archive", "lfw-deepfunneled", "lfw-deepfunneled")
 WARC_FILES_PATH = os.path.join(BASE_DATA_PATH, "warc_files")
 
 DB_PATH = DATABASE_PATH
+DB_BATCH_SIZE = 500         # rows per transaction for bulk writes
+DB_CACHE_SIZE_KB = 64000    # SQLite page cache per connection
+DB_STATEMENT_CACHE_SIZE = 256  # prepared statements kept per pooled connection
 
 # ==== Common Crawl index ====
 COMMON_CRAWL_INDEX = "https://data.commoncrawl.org/crawl-data/CC-MAIN-2023-14/warc.paths.gz"
@@ -5,16 +5,26 @@ from src.phases.phase3 import run_phase3
 from src.phases.phase4 import run_phase4
 from src.data_access.database import DatabaseManager
 from src.utils.logging_utils import setup_logging
+from src.pipeline import run_pipeline
+import argparse
 import logging
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NewsFaces pipeline")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap the phases through bounded queues instead of running them in sequence")
+    args = parser.parse_args()
+
     setup_logging()
     logging.info("=== Starting NewsFaces Pipeline ===")
 
-    run_phase1()
-    run_phase2()
-    run_phase3()
-    run_phase4()
+    if args.pipeline:
+        run_pipeline()
+    else:
+        run_phase1()
+        run_phase2()
+        run_phase3()
+        run_phase4()
 
     db = DatabaseManager()
     logging.info("=== Final Database Statistics ===")
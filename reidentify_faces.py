@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Re-identify Stored Faces
+Re-matches the faces Phase 4 already found against the current gallery.
+Run this after enrolling new people instead of re-running face detection.
+"""
+
+from src.services.face_service import FaceService
+from src.utils.logging_utils import setup_logging
+
+if __name__ == "__main__":
+    setup_logging()
+    updated = FaceService().reidentify_faces()
+    print(f"\n✅ Re-identification complete: {updated} images updated")
+    print("   🚀 Refresh your Streamlit app to see the results!")
@@ -24,52 +24,51 @@ def run_face_detection_on_aaron():
         # Get Aaron Peirsol images
         from data_access.database import DatabaseManager
         db = DatabaseManager()
-        conn = db._connect()
-        cursor = conn.cursor()
+        with db._checkout() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT i.id, i.image_path 
-            FROM images i 
-            JOIN articles a ON i.article_id = a.article_id 
-            WHERE a.title LIKE '%Aaron%' AND a.title LIKE '%Peirsol%'
-            ORDER BY i.id
-        """)
-        aaron_images = cursor.fetchall()
+            cursor.execute("""
+                SELECT i.id, i.image_path 
+                FROM images i 
+                JOIN articles a ON i.article_id = a.article_id 
+                WHERE a.title LIKE '%Aaron%' AND a.title LIKE '%Peirsol%'
+                ORDER BY i.id
+            """)
+            aaron_images = cursor.fetchall()
         
-        print(f"📸 Found {len(aaron_images)} Aaron Peirsol images to process")
+            print(f"📸 Found {len(aaron_images)} Aaron Peirsol images to process")
         
-        # Process each image for face detection
-        for img_id, img_path in aaron_images:
-            try:
-                print(f"\n🖼️ Processing image {img_id}: {os.path.basename(img_path)}")
+            # Process each image for face detection
+            for img_id, img_path in aaron_images:
+                try:
+                    print(f"\n🖼️ Processing image {img_id}: {os.path.basename(img_path)}")
                 
-                # Check if image file exists
-                if not os.path.exists(img_path):
-                    print(f"   ⚠️ Image file not found: {img_path}")
-                    continue
+                    # Check if image file exists
+                    if not os.path.exists(img_path):
+                        print(f"   ⚠️ Image file not found: {img_path}")
+                        continue
                 
-                # Run face detection
-                face_count, detected_faces = face_service.processor.detect_and_recognize_faces(img_path)
+                    # Run face detection
+                    face_count, detected_faces = face_service.processor.detect_and_recognize_faces(img_path)
                 
-                print(f"   ✅ Face detection completed:")
-                print(f"      Faces detected: {face_count}")
-                print(f"      Face details: {detected_faces}")
+                    print(f"   ✅ Face detection completed:")
+                    print(f"      Faces detected: {face_count}")
+                    print(f"      Face details: {detected_faces}")
                 
-                # Update database with face count
-                cursor.execute("""
-                    UPDATE images 
-                    SET face_count = ?, detected_faces = ? 
-                    WHERE id = ?
-                """, (face_count, str(detected_faces), img_id))
+                    # Update database with face count
+                    cursor.execute("""
+                        UPDATE images 
+                        SET face_count = ?, detected_faces = ? 
+                        WHERE id = ?
+                    """, (face_count, str(detected_faces), img_id))
                 
-                print(f"   💾 Database updated with face count: {face_count}")
+                    print(f"   💾 Database updated with face count: {face_count}")
                 
-            except Exception as e:
-                print(f"   ❌ Error processing image {img_id}: {e}")
+                except Exception as e:
+                    print(f"   ❌ Error processing image {img_id}: {e}")
         
-        # Commit changes
-        conn.commit()
-        conn.close()
+            # Commit changes
+            conn.commit()
         
         print(f"\n🎯 Face Detection Summary:")
         print(f"   Images processed: {len(aaron_images)}")
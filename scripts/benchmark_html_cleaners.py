@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+HTML Cleaner Benchmark
+Times every available HTML cleaning backend on the same pages taken from
+local WARC files, so backends can be compared on real crawl HTML.
+
+Usage:
+    python scripts/benchmark_html_cleaners.py [warc_file ...] [--pages N] [--repeat N]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+from src.html_cleaning import CLEANERS
+from src.services.warc_service import iter_html_records
+from src.data_access.warc_downloader import WARCDownloader
+
+
+def load_corpus(warc_files, max_pages):
+    """Read the first max_pages HTML responses from the given WARC files"""
+    pages = []
+    for warc_file in warc_files:
+        with open(warc_file, "rb") as stream:
+            for _, html_content in iter_html_records(stream):
+                pages.append(html_content)
+                if len(pages) >= max_pages:
+                    return pages
+    return pages
+
+
+def benchmark(cleaner, pages, repeat):
+    """Return per-page times in milliseconds (best of `repeat` runs per page) and total text length"""
+    timings = []
+    total_chars = 0
+    for html_content in pages:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = cleaner(html_content)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+        total_chars += len(result["cleaned_text"])
+    return timings, total_chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML cleaning backends on WARC HTML")
+    parser.add_argument("warc_files", nargs="*", help="WARC files (default: all those Phase 1 downloaded)")
+    parser.add_argument("--pages", type=int, default=500, help="number of HTML pages in the corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per page; the fastest is kept")
+    args = parser.parse_args()
+
+    warc_files = args.warc_files or sorted(glob.glob(os.path.join(WARCDownloader().download_dir, "*.warc*")))
+    warc_files = [f for f in warc_files if not f.endswith((".cdx.gz", ".part"))]
+    if not warc_files:
+        print("No WARC files found. Run Phase 1 first or pass WARC paths.")
+        return
+
+    pages = load_corpus(warc_files, args.pages)
+    print(f"Corpus: {len(pages)} HTML pages, {sum(len(p) for p in pages) / 1e6:.1f} MB from {len(warc_files)} WARC file(s)")
+    print(f"Boilerplate removal: {settings.HTML_REMOVE_BOILERPLATE}")
+    print("=" * 72)
+    print(f"{'backend':<12}{'mean ms':>10}{'median ms':>12}{'p95 ms':>10}{'pages/s':>10}{'text chars':>14}")
+
+    for name, cleaner in CLEANERS.items():
+        try:
+            timings, total_chars = benchmark(cleaner, pages, args.repeat)
+        except ImportError as e:
+            print(f"{name:<12}not installed ({e})")
+            continue
+        timings_sorted = sorted(timings)
+        p95 = timings_sorted[min(len(timings_sorted) - 1, int(len(timings_sorted) * 0.95))]
+        mean = statistics.mean(timings)
+        print(
+            f"{name:<12}{mean:>10.2f}{statistics.median(timings):>12.2f}{p95:>10.2f}"
+            f"{1000 / mean if mean else 0:>10.0f}{total_chars:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Content-addressed file storage
+# data_access/blob_store.py
+import glob
+import os
+import re
+import hashlib
+import tempfile
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    """
+    Stores files under the SHA-256 of their content.
+
+    A blob with hash `abcdef...` lives at `<root>/ab/cd/abcdef...`, so
+    identical HTML pages or images are written once no matter how many URLs
+    point at them or which extension their URL had, and no directory grows
+    too large. Blobs written by older versions carry an extension
+    (`abcdef....jpg`); they are still found and reused.
+    """
+
+    def __init__(self, root, shard_levels=2, shard_width=2):
+        self.root = root
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def hash_from_path(path):
+        """Return the content hash encoded in a blob path, or None for other files"""
+        if not path:
+            return None
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return stem if _HASH_RE.match(stem) else None
+
+    def path_for(self, content_hash):
+        shards = [
+            content_hash[i * self.shard_width:(i + 1) * self.shard_width]
+            for i in range(self.shard_levels)
+        ]
+        return os.path.join(self.root, *shards, content_hash)
+
+    def find(self, content_hash):
+        """Return the path of an existing blob, including ones stored with an extension, or None"""
+        path = self.path_for(content_hash)
+        if os.path.exists(path):
+            return path
+        legacy = [p for p in glob.glob(path + ".*") if not p.endswith(".tmp")]
+        return legacy[0] if legacy else None
+
+    def put(self, content):
+        """
+        Store content unless an identical blob already exists.
+
+        Returns:
+            Tuple of (content_hash, path, created)
+        """
+        content_hash = self.content_hash(content)
+        existing = self.find(content_hash)
+        if existing:
+            return content_hash, existing, False
+
+        path = self.path_for(content_hash)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so concurrent writers never expose a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return content_hash, path, True
@@ -0,0 +1,165 @@
+# Per-thread SQLite connection reuse
+# data_access/connection_pool.py
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import settings
+
+
+def apply_pragmas(conn):
+    """WAL lets readers run during bulk writes; NORMAL sync is safe with WAL and avoids an fsync per commit"""
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute(f'PRAGMA cache_size=-{settings.DB_CACHE_SIZE_KB}')
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that survives close().
+
+    Each checkout must be released with close(), ideally through
+    ConnectionPool.checkout() so error paths release it too. When the last
+    checkout on the thread is released, uncommitted changes are rolled back
+    exactly as a real close would have done.
+
+    A checkout taken while an outer checkout on the same thread has an open
+    transaction runs inside a SAVEPOINT: its commit() only folds its work
+    into the caller's transaction, and its rollback() or close() without
+    commit only undoes its own work. Nested helpers therefore never commit
+    or discard the caller's pending changes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self._savepoints = []
+
+    def _check_out(self):
+        savepoint = None
+        if self.checkouts > 0 and self.in_transaction:
+            savepoint = f"nested_checkout_{len(self._savepoints)}"
+            self.execute(f"SAVEPOINT {savepoint}")
+        self._savepoints.append(savepoint)
+        self.checkouts += 1
+
+    def commit(self):
+        savepoint = self._savepoints[-1] if self._savepoints else None
+        if savepoint is None:
+            return super().commit()
+        # Keep the work in the caller's transaction; a fresh savepoint covers later writes
+        self.execute(f"RELEASE {savepoint}")
+        self.execute(f"SAVEPOINT {savepoint}")
+
+    def rollback(self):
+        savepoint = self._savepoints[-1] if self._savepoints else None
+        if savepoint is None:
+            return super().rollback()
+        self.execute(f"ROLLBACK TO {savepoint}")
+
+    def close(self):
+        if not self._savepoints:
+            return
+        savepoint = self._savepoints.pop()
+        self.checkouts -= 1
+        if savepoint is not None:
+            self.execute(f"ROLLBACK TO {savepoint}")
+            self.execute(f"RELEASE {savepoint}")
+        elif self.checkouts == 0 and self.in_transaction:
+            super().rollback()
+
+    def dispose(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    One connection per thread and process for a database file.
+
+    Connections are created lazily, configured once with apply_pragmas and
+    keep sqlite3's prepared statement cache warm across calls. A forked
+    child never reuses its parent's connection.
+
+    The thread-local slot holds the only strong reference, so a connection
+    is closed as soon as its thread exits (short-lived worker threads and
+    Streamlit reruns do not pile up open handles); the pool only tracks
+    the live ones weakly for close_all().
+    """
+
+    def __init__(self, db_path, cached_statements=settings.DB_STATEMENT_CACHE_SIZE):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+
+    def acquire(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid != os.getpid():
+            # Inherited through fork: closing it here could disturb the parent's handle
+            _forked_connections.append(conn)
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                factory=PooledConnection,
+                cached_statements=self.cached_statements
+            )
+            apply_pragmas(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            with self._lock:
+                self._connections.add(conn)
+        conn._check_out()
+        return conn
+
+    @contextmanager
+    def checkout(self):
+        """Check out this thread's connection and always release it, also when the body raises"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out this thread's connection; commit on success, roll back on error"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = list(self._connections), weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.dispose()
+            except sqlite3.ProgrammingError:
+                # Owned by another thread; it is released when that thread exits
+                pass
+        self._local = threading.local()
+
+
+_pools = {}
+_forked_connections = []
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path):
+    """Return the process-wide pool for a database file"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_path)
+        return _pools[key]
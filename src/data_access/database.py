@@ -1,182 +1,484 @@
 import sqlite3
 import json
 import traceback
+import threading
 import sys
 import os
+import numpy as np
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config import settings
+from src.data_access.blob_store import BlobStore
+from src.data_access.connection_pool import apply_pragmas, get_pool
+from src.face_index import FaceIndexStore
+
+
+ARTICLE_INSERT_SQL = '''
+    INSERT INTO articles (
+        target_uri, title, cleaned_text, language, sentiment_label,
+        sentiment_score, topic_category, keywords,
+        person_entities, org_entities, location_entities,
+        publication_date, source_domain, author, word_count, reading_time_minutes,
+        content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+IMAGE_INSERT_SQL = '''
+    INSERT INTO images (
+        article_id, image_path, image_url, image_alt_text, 
+        image_caption, image_width, image_height, image_size_bytes,
+        content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+IMAGE_FACE_UPDATE_SQL = '''
+    UPDATE images 
+    SET face_count = ?, detected_faces = ?, processed_date = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+
+IMAGE_SKIP_UPDATE_SQL = '''
+    UPDATE images 
+    SET face_count = 0, detected_faces = '[]', skip_reason = ?, processed_date = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+
+DETECTION_CACHE_INSERT_SQL = '''
+    INSERT OR REPLACE INTO face_detection_cache (
+        content_hash, detector_version, face_count, face_locations, encodings
+    ) VALUES (?, ?, ?, ?, ?)
+'''
+
+MANIFEST_UPSERT_SQL = '''
+    INSERT OR REPLACE INTO enrollment_manifest (
+        source_ref, person, content_hash, mtime, size_bytes, encoded, updated_date
+    ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+'''
+
+MANIFEST_DELETE_SQL = 'DELETE FROM enrollment_manifest WHERE source_ref = ?'
+
+FACE_ENCODING_DELETE_BY_SOURCE_SQL = 'DELETE FROM known_faces WHERE face_image_path = ?'
+
+DETECTED_FACE_DELETE_SQL = 'DELETE FROM detected_faces WHERE image_id = ?'
+
+DETECTED_FACE_INSERT_SQL = '''
+    INSERT INTO detected_faces (
+        image_id, face_index, box_top, box_right, box_bottom, box_left,
+        encoding, matched_name, confidence, known_face_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+DETECTED_FACE_MATCH_UPDATE_SQL = '''
+    UPDATE detected_faces
+    SET matched_name = ?, confidence = ?, known_face_id = ?
+    WHERE id = ?
+'''
+
+FACE_ENCODING_INSERT_SQL = '''
+    INSERT INTO known_faces (
+        name, encoding, profession, organization, political_party,
+        country, birth_date, death_date, wikipedia_url,
+        face_image_path, metadata
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+BLOB_REF_SQL = '''
+    INSERT INTO blobs (content_hash, blob_path, kind, size_bytes, ref_count)
+    VALUES (?, ?, ?, ?, 1)
+    ON CONFLICT(content_hash) DO UPDATE SET ref_count = ref_count + 1
+'''
+
+
+def _json_field(value):
+    """Lists are stored as JSON text; strings are assumed to be JSON already"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value if value is not None else [], ensure_ascii=False)
+
+
+def article_params(article_data):
+    return (
+        article_data.get('target_uri'),
+        article_data.get('title'),
+        article_data.get('cleaned_text'),
+        article_data.get('language'),
+        article_data.get('sentiment_label'),
+        article_data.get('sentiment_score'),
+        article_data.get('topic_category'),
+        _json_field(article_data.get('keywords', [])),
+        _json_field(article_data.get('person_entities', [])),
+        _json_field(article_data.get('org_entities', [])),
+        _json_field(article_data.get('location_entities', [])),
+        article_data.get('publication_date'),
+        article_data.get('source_domain'),
+        article_data.get('author'),
+        article_data.get('word_count'),
+        article_data.get('reading_time_minutes'),
+        article_data.get('content_hash')
+    )
+
+
+def image_params(article_id, image_path, image_metadata=None):
+    if image_metadata is None:
+        image_metadata = {}
+    return (
+        article_id, 
+        image_path,
+        image_metadata.get('url'),
+        image_metadata.get('alt_text'),
+        image_metadata.get('caption'),
+        image_metadata.get('width'),
+        image_metadata.get('height'),
+        image_metadata.get('size_bytes'),
+        BlobStore.hash_from_path(image_path)
+    )
+
+
+def face_encoding_params(name, encoding, face_metadata=None):
+    if face_metadata is None:
+        face_metadata = {}
+    return (
+        name, 
+        encode_face_encoding(encoding),
+        face_metadata.get('profession'),
+        face_metadata.get('organization'),
+        face_metadata.get('political_party'),
+        face_metadata.get('country'),
+        face_metadata.get('birth_date'),
+        face_metadata.get('death_date'),
+        face_metadata.get('wikipedia_url'),
+        face_metadata.get('face_image_path'),
+        json.dumps(face_metadata.get('additional_metadata', {}))
+    )
+
+
+def encode_face_encoding(encoding):
+    """Pack an encoding as little-endian float32 bytes (512 bytes for 128 dimensions)"""
+    return np.asarray(encoding, dtype='<f4').tobytes()
+
+
+def decode_face_encoding(value):
+    """Unpack a stored encoding; JSON text from databases not yet migrated is still accepted"""
+    if isinstance(value, (bytes, memoryview)):
+        return np.frombuffer(value, dtype='<f4')
+    return np.asarray(json.loads(value), dtype=np.float32)
+
+
+def detection_cache_params(content_hash, detector_version, face_locations, encodings):
+    """Row for face_detection_cache; all encodings of an image packed into one float32 BLOB"""
+    encodings = np.asarray(encodings, dtype='<f4').reshape(-1, 128)
+    return (
+        content_hash,
+        detector_version,
+        len(face_locations),
+        json.dumps([list(map(int, box)) for box in face_locations]),
+        encodings.tobytes()
+    )
+
+
+def detected_face_params(image_id, face_locations, encodings, matches):
+    """Rows for detected_faces: one per face with its box, encoding and FaceMatcher.match result"""
+    encodings = np.asarray(encodings, dtype='<f4').reshape(-1, 128)
+    return [
+        (image_id, face_index, int(top), int(right), int(bottom), int(left),
+         encoding.tobytes(), name, round(float(confidence), 3), face_id)
+        for face_index, ((top, right, bottom, left), encoding, (name, confidence, face_id))
+        in enumerate(zip(face_locations, encodings, matches))
+    ]
+
+
+def blob_ref_params(content_hash, blob_path, kind):
+    size_bytes = os.path.getsize(blob_path) if blob_path and os.path.exists(blob_path) else None
+    return (content_hash, blob_path, kind, size_bytes)
+
+
+# Databases whose schema was already initialized by this process
+_initialized_databases = set()
+_init_lock = threading.Lock()
 
 
 class DatabaseManager:
     def __init__(self, db_path=settings.DB_PATH):
         self.db_path = db_path
-        self.init_database()
+        self.pool = get_pool(db_path)
+        key = (os.getpid(), os.path.abspath(db_path))
+        with _init_lock:
+            # A failed init is retried by the next DatabaseManager instead of being remembered as done
+            if key not in _initialized_databases and self.init_database():
+                _initialized_databases.add(key)
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        # Pooled per-thread connection; close() hands it back instead of closing it
+        return self.pool.acquire()
+
+    def _checkout(self):
+        """Context manager yielding this thread's pooled connection, released even on errors"""
+        return self.pool.checkout()
+
+    def connection(self):
+        """Context manager yielding this thread's pooled connection, committed on exit"""
+        return self.pool.connection()
 
-    # Initialize tables for database
+    # Initialize tables for database; returns False if it failed
     def init_database(self):
 
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
 
-            # Articles table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS articles (
-                    article_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    target_uri TEXT,
-                    title TEXT,
-                    cleaned_text TEXT,
-                    language TEXT,
-                    sentiment_label TEXT,
-                    sentiment_score REAL,
-                    topic_category TEXT,
-                    keywords TEXT,
-                    person_entities TEXT,
-                    org_entities TEXT,
-                    location_entities TEXT,
-                    publication_date TEXT,
-                    source_domain TEXT,
-                    author TEXT,
-                    word_count INTEGER,
-                    reading_time_minutes REAL
-                )
-            ''')
+                # Articles table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS articles (
+                        article_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        target_uri TEXT,
+                        title TEXT,
+                        cleaned_text TEXT,
+                        language TEXT,
+                        sentiment_label TEXT,
+                        sentiment_score REAL,
+                        topic_category TEXT,
+                        keywords TEXT,
+                        person_entities TEXT,
+                        org_entities TEXT,
+                        location_entities TEXT,
+                        publication_date TEXT,
+                        source_domain TEXT,
+                        author TEXT,
+                        word_count INTEGER,
+                        reading_time_minutes REAL
+                    )
+                ''')
 
-            # Images table with face detection results
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS images (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    article_id INTEGER,
-                    image_path TEXT,
-                    face_count INTEGER DEFAULT 0,
-                    detected_faces TEXT DEFAULT '[]',
-                    image_url TEXT,
-                    image_alt_text TEXT,
-                    image_caption TEXT,
-                    image_width INTEGER,
-                    image_height INTEGER,
-                    image_size_bytes INTEGER,
-                    FOREIGN KEY(article_id) REFERENCES articles(article_id)
-                )
-            ''')
+                # Images table with face detection results
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS images (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        article_id INTEGER,
+                        image_path TEXT,
+                        face_count INTEGER DEFAULT 0,
+                        detected_faces TEXT DEFAULT '[]',
+                        image_url TEXT,
+                        image_alt_text TEXT,
+                        image_caption TEXT,
+                        image_width INTEGER,
+                        image_height INTEGER,
+                        image_size_bytes INTEGER,
+                        FOREIGN KEY(article_id) REFERENCES articles(article_id)
+                    )
+                ''')
 
-            # Enhanced known faces table with news metadata
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS known_faces (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    encoding TEXT,
-                    profession TEXT,
-                    organization TEXT,
-                    political_party TEXT,
-                    country TEXT,
-                    birth_date TEXT,
-                    death_date TEXT,
-                    wikipedia_url TEXT,
-                    news_mentions_count INTEGER DEFAULT 0,
-                    first_seen_date TEXT,
-                    last_seen_date TEXT,
-                    confidence_score REAL DEFAULT 0.0,
-                    face_image_path TEXT,
-                    metadata TEXT DEFAULT '{}'
-                )
-            ''')
+                # Enhanced known faces table with news metadata
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS known_faces (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT,
+                        encoding BLOB,
+                        profession TEXT,
+                        organization TEXT,
+                        political_party TEXT,
+                        country TEXT,
+                        birth_date TEXT,
+                        death_date TEXT,
+                        wikipedia_url TEXT,
+                        news_mentions_count INTEGER DEFAULT 0,
+                        first_seen_date TEXT,
+                        last_seen_date TEXT,
+                        confidence_score REAL DEFAULT 0.0,
+                        face_image_path TEXT,
+                        metadata TEXT DEFAULT '{}'
+                    )
+                ''')
 
-            # News sources table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS news_sources (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    domain TEXT UNIQUE,
-                    name TEXT,
-                    country TEXT,
-                    language TEXT,
-                    category TEXT,
-                    reliability_score REAL,
-                    political_bias TEXT,
-                    fact_checking_status TEXT
-                )
-            ''')
+                # News sources table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS news_sources (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        domain TEXT UNIQUE,
+                        name TEXT,
+                        country TEXT,
+                        language TEXT,
+                        category TEXT,
+                        reliability_score REAL,
+                        political_bias TEXT,
+                        fact_checking_status TEXT
+                    )
+                ''')
 
-            # Face recognition history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS face_recognition_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    face_id INTEGER,
-                    image_id INTEGER,
-                    article_id INTEGER,
-                    recognition_date TEXT,
-                    confidence_score REAL,
-                    context TEXT,
-                    FOREIGN KEY(face_id) REFERENCES known_faces(id),
-                    FOREIGN KEY(image_id) REFERENCES images(id),
-                    FOREIGN KEY(article_id) REFERENCES articles(article_id)
-                )
-            ''')
+                # Face recognition history table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS face_recognition_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        face_id INTEGER,
+                        image_id INTEGER,
+                        article_id INTEGER,
+                        recognition_date TEXT,
+                        confidence_score REAL,
+                        context TEXT,
+                        FOREIGN KEY(face_id) REFERENCES known_faces(id),
+                        FOREIGN KEY(image_id) REFERENCES images(id),
+                        FOREIGN KEY(article_id) REFERENCES articles(article_id)
+                    )
+                ''')
 
-            # News categories table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS news_categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE,
-                    description TEXT,
-                    parent_category TEXT,
-                    color_code TEXT
-                )
-            ''')
+                # News categories table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS news_categories (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT UNIQUE,
+                        description TEXT,
+                        parent_category TEXT,
+                        color_code TEXT
+                    )
+                ''')
 
-            conn.commit()
-            conn.close()
+                # Content-addressed HTML/image blobs and how many rows reference them
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS blobs (
+                        content_hash TEXT PRIMARY KEY,
+                        blob_path TEXT,
+                        kind TEXT,
+                        size_bytes INTEGER,
+                        ref_count INTEGER DEFAULT 0
+                    )
+                ''')
+
+                # Face boxes and encodings per image content and detector version
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS face_detection_cache (
+                        content_hash TEXT NOT NULL,
+                        detector_version TEXT NOT NULL,
+                        face_count INTEGER NOT NULL,
+                        face_locations TEXT,
+                        encodings BLOB,
+                        created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (content_hash, detector_version)
+                    )
+                ''')
+
+                # Source images behind known_faces, so re-enrollment only encodes what changed
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS enrollment_manifest (
+                        source_ref TEXT PRIMARY KEY,
+                        person TEXT NOT NULL,
+                        content_hash TEXT,
+                        mtime REAL,
+                        size_bytes INTEGER,
+                        encoded INTEGER DEFAULT 0,
+                        updated_date DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_known_faces_source ON known_faces(face_image_path)')
+
+                # Every face found in an image, kept so it can be re-matched without re-detecting
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS detected_faces (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        image_id INTEGER NOT NULL,
+                        face_index INTEGER NOT NULL,
+                        box_top INTEGER,
+                        box_right INTEGER,
+                        box_bottom INTEGER,
+                        box_left INTEGER,
+                        encoding BLOB NOT NULL,
+                        matched_name TEXT,
+                        confidence REAL,
+                        known_face_id INTEGER,
+                        FOREIGN KEY (image_id) REFERENCES images (id)
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_detected_faces_image ON detected_faces(image_id)')
+
+                # Compacted gallery: per-person centroid and prototypes with their own thresholds
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS face_prototypes (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        encoding BLOB NOT NULL,
+                        threshold REAL NOT NULL,
+                        source_count INTEGER,
+                        representative_face_id INTEGER,
+                        created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (representative_face_id) REFERENCES known_faces (id)
+                    )
+                ''')
+
+                # Columns added after the first release; older databases are migrated in place
+                self._ensure_columns(cursor, 'articles', {'content_hash': 'TEXT'})
+                added = self._ensure_columns(cursor, 'images', {
+                    'content_hash': 'TEXT', 'skip_reason': 'TEXT', 'processed_date': 'DATETIME'
+                })
+                if 'processed_date' in added:
+                    # Before the column existed only images with faces were known to be processed
+                    cursor.execute(
+                        "UPDATE images SET processed_date = CURRENT_TIMESTAMP "
+                        "WHERE face_count > 0 OR skip_reason IS NOT NULL"
+                    )
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_content_hash ON images(content_hash)')
+
+                conn.commit()
+                self.migrate_face_encodings(conn)
+            return True
         except Exception as e:
             print(f"Error initializing database: {e}")
             traceback.print_exc()
+            return False
+
+    def migrate_face_encodings(self, conn=None, batch_size=5000):
+        """Convert JSON text encodings in known_faces to packed float32 BLOBs"""
+        if conn is None:
+            with self._checkout() as conn:
+                return self.migrate_face_encodings(conn, batch_size)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM known_faces WHERE typeof(encoding) = 'text'")
+        remaining = cursor.fetchone()[0]
+        if remaining:
+            print(f"Migrating {remaining} face encodings from JSON to float32 BLOBs")
+        while True:
+            cursor.execute(
+                "SELECT id, encoding FROM known_faces WHERE typeof(encoding) = 'text' LIMIT ?",
+                (batch_size,)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                'UPDATE known_faces SET encoding = ? WHERE id = ?',
+                [(encode_face_encoding(json.loads(encoding)), face_id) for face_id, encoding in rows]
+            )
+            conn.commit()
+
+    def _ensure_columns(self, cursor, table, columns):
+        """Add any missing columns to an existing table; returns the names of the added ones"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        added = []
+        for column, column_type in columns.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+                added.append(column)
+        return added
+
+    def _add_blob_ref(self, cursor, content_hash, blob_path, kind):
+        """Register one more reference to a content-addressed blob"""
+        cursor.execute(BLOB_REF_SQL, blob_ref_params(content_hash, blob_path, kind))
+
+    def bulk_writer(self, batch_size=None, autoflush=True):
+        """Open a BulkWriter on this database; use it as a context manager"""
+        return BulkWriter(self, batch_size or settings.DB_BATCH_SIZE, autoflush)
 
     # Insert article into enhanced schema
     def insert_article(self, article_data):
 
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                INSERT INTO articles (
-                    target_uri, title, cleaned_text, language, sentiment_label,
-                    sentiment_score, topic_category, keywords,
-                    person_entities, org_entities, location_entities,
-                    publication_date, source_domain, author, word_count, reading_time_minutes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                article_data.get('target_uri'),
-                article_data.get('title'),
-                article_data.get('cleaned_text'),
-                article_data.get('language'),
-                article_data.get('sentiment_label'),
-                article_data.get('sentiment_score'),
-                article_data.get('topic_category'),
-                json.dumps(article_data.get('keywords', []), ensure_ascii=False)
-                    if not isinstance(article_data.get('keywords'), str)
-                    else article_data.get('keywords'),
-                json.dumps(article_data.get('person_entities', []), ensure_ascii=False)
-                    if not isinstance(article_data.get('person_entities'), str)
-                    else article_data.get('person_entities'),
-                json.dumps(article_data.get('org_entities', []), ensure_ascii=False)
-                    if not isinstance(article_data.get('org_entities'), str)
-                    else article_data.get('org_entities'),
-                json.dumps(article_data.get('location_entities', []), ensure_ascii=False)
-                    if not isinstance(article_data.get('location_entities'), str)
-                    else article_data.get('location_entities'),
-                article_data.get('publication_date'),
-                article_data.get('source_domain'),
-                article_data.get('author'),
-                article_data.get('word_count'),
-                article_data.get('reading_time_minutes')
-            ))
-
-            article_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+                cursor.execute(ARTICLE_INSERT_SQL, article_params(article_data))
+
+                article_id = cursor.lastrowid
+                if article_data.get('content_hash'):
+                    self._add_blob_ref(cursor, article_data['content_hash'], article_data.get('html_path'), 'html')
+                conn.commit()
             return article_id
 
         except Exception as e:
@@ -187,30 +489,16 @@ class DatabaseManager:
     def insert_image(self, article_id, image_path, image_metadata=None):
         """Insert image with enhanced metadata"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            
-            if image_metadata is None:
-                image_metadata = {}
+            with self._checkout() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO images (
-                    article_id, image_path, image_url, image_alt_text, 
-                    image_caption, image_width, image_height, image_size_bytes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                article_id, 
-                image_path,
-                image_metadata.get('url'),
-                image_metadata.get('alt_text'),
-                image_metadata.get('caption'),
-                image_metadata.get('width'),
-                image_metadata.get('height'),
-                image_metadata.get('size_bytes')
-            ))
+                params = image_params(article_id, image_path, image_metadata)
+                cursor.execute(IMAGE_INSERT_SQL, params)
+                content_hash = params[-1]
+                if content_hash:
+                    self._add_blob_ref(cursor, content_hash, image_path, 'image')
             
-            conn.commit()
-            conn.close()
+                conn.commit()
             return True
         except Exception as e:
             print(f"Error inserting image: {e}")
@@ -220,114 +508,343 @@ class DatabaseManager:
     def update_image_face_detection(self, image_id, face_count, detected_faces):
         """Update image with face detection results"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE images 
-                SET face_count = ?, detected_faces = ?
-                WHERE id = ?
-            ''', (face_count, json.dumps(detected_faces), image_id))
-            conn.commit()
-            conn.close()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute(IMAGE_FACE_UPDATE_SQL, (face_count, json.dumps(detected_faces), image_id))
+                conn.commit()
             return True
         except Exception as e:
             print(f"Error updating image face detection: {e}")
             traceback.print_exc()
             return False
 
+    def mark_image_skipped(self, image_id, reason):
+        """Record that an image was rejected before face detection, and why"""
+        try:
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute(IMAGE_SKIP_UPDATE_SQL, (reason, image_id))
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error marking image as skipped: {e}")
+            traceback.print_exc()
+            return False
+
     def get_image_by_id(self, image_id):
         """Get image record by ID"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, article_id, image_path, face_count, detected_faces,
-                       image_url, image_alt_text, image_caption, image_width, image_height
-                FROM images WHERE id = ?
-            ''', (image_id,))
-            result = cursor.fetchone()
-            conn.close()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, article_id, image_path, face_count, detected_faces,
+                           image_url, image_alt_text, image_caption, image_width, image_height
+                    FROM images WHERE id = ?
+                ''', (image_id,))
+                result = cursor.fetchone()
             return result
         except Exception as e:
             print(f"Error getting image: {e}")
             traceback.print_exc()
             return None
 
+    def get_unprocessed_images(self, article_ids=None, chunk_size=500):
+        """
+        Return (id, image_path, content_hash) of images never run through face
+        detection and not rejected by triage, optionally only those of some articles
+        """
+        query = '''
+            SELECT id, image_path, content_hash FROM images
+            WHERE processed_date IS NULL AND skip_reason IS NULL
+        '''
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            if article_ids is None:
+                cursor.execute(query)
+                rows = cursor.fetchall()
+            else:
+                article_ids = list(article_ids)
+                rows = []
+                for start in range(0, len(article_ids), chunk_size):
+                    chunk = article_ids[start:start + chunk_size]
+                    cursor.execute(query + f" AND article_id IN ({', '.join('?' * len(chunk))})", chunk)
+                    rows.extend(cursor.fetchall())
+        return rows
+
+    def get_cached_detections(self, content_hashes, detector_version, chunk_size=500):
+        """
+        Look up cached detections for many images at once.
+
+        Returns:
+            Dict mapping content_hash to (face_locations, encodings) for the
+            hashes found; encodings is a float32 matrix with one row per face
+        """
+        content_hashes = list(content_hashes)
+        cached = {}
+        try:
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(content_hashes), chunk_size):
+                    chunk = content_hashes[start:start + chunk_size]
+                    cursor.execute(f'''
+                        SELECT content_hash, face_locations, encodings FROM face_detection_cache
+                        WHERE detector_version = ? AND content_hash IN ({', '.join('?' * len(chunk))})
+                    ''', [detector_version] + chunk)
+                    for content_hash, locations, encodings in cursor.fetchall():
+                        cached[content_hash] = (
+                            [tuple(box) for box in json.loads(locations or '[]')],
+                            np.frombuffer(encodings or b'', dtype='<f4').reshape(-1, 128)
+                        )
+        except Exception as e:
+            print(f"Error reading detection cache: {e}")
+        return cached
+
+    def cache_detection(self, content_hash, detector_version, face_locations, encodings):
+        """Store the boxes and encodings found in an image"""
+        try:
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute(DETECTION_CACHE_INSERT_SQL,
+                               detection_cache_params(content_hash, detector_version, face_locations, encodings))
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error caching face detection: {e}")
+            traceback.print_exc()
+            return False
+
+    def iter_detected_faces(self, batch_size=5000):
+        """
+        Yield stored faces in id order, one batch at a time.
+
+        Yields:
+            Tuple of (row_ids, image_ids, encodings, names, confidences) where
+            encodings is a float32 matrix with one row per face
+        """
+        last_id = 0
+        while True:
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, image_id, encoding, matched_name, confidence FROM detected_faces
+                    WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, batch_size))
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield (
+                [row[0] for row in rows],
+                [row[1] for row in rows],
+                np.frombuffer(b''.join(row[2] for row in rows), dtype='<f4').reshape(len(rows), 128),
+                [row[3] for row in rows],
+                [row[4] for row in rows]
+            )
+
+    def get_detected_faces(self, image_ids, chunk_size=500):
+        """Return {image_id: [{'name', 'confidence'}, ...]} in face order, as stored in images.detected_faces"""
+        image_ids = list(image_ids)
+        faces = {image_id: [] for image_id in image_ids}
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(image_ids), chunk_size):
+                chunk = image_ids[start:start + chunk_size]
+                cursor.execute(f'''
+                    SELECT image_id, matched_name, confidence FROM detected_faces
+                    WHERE image_id IN ({', '.join('?' * len(chunk))})
+                    ORDER BY image_id, face_index
+                ''', chunk)
+                for image_id, name, confidence in cursor.fetchall():
+                    faces[image_id].append({"name": name, "confidence": confidence})
+        return faces
+
     def insert_face_encoding(self, name, encoding, face_metadata=None):
         """Insert face encoding with enhanced metadata"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
             
-            if face_metadata is None:
-                face_metadata = {}
+                cursor.execute(FACE_ENCODING_INSERT_SQL, face_encoding_params(name, encoding, face_metadata))
+                face_id = cursor.lastrowid
             
-            cursor.execute('''
-                INSERT INTO known_faces (
-                    name, encoding, profession, organization, political_party,
-                    country, birth_date, death_date, wikipedia_url,
-                    face_image_path, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                name, 
-                json.dumps(encoding),
-                face_metadata.get('profession'),
-                face_metadata.get('organization'),
-                face_metadata.get('political_party'),
-                face_metadata.get('country'),
-                face_metadata.get('birth_date'),
-                face_metadata.get('death_date'),
-                face_metadata.get('wikipedia_url'),
-                face_metadata.get('face_image_path'),
-                json.dumps(face_metadata.get('additional_metadata', {}))
-            ))
-            
-            conn.commit()
-            conn.close()
+                conn.commit()
+            # Keep a persisted approximate index in step without rebuilding it
+            FaceIndexStore(self.db_path).append([face_id], [encoding])
             return True
         except Exception as e:
             print(f"Error inserting face encoding: {e}")
             traceback.print_exc()
             return False
 
+    def load_gallery(self):
+        """
+        Load every known face encoding in one query.
+
+        Returns:
+            Tuple of (face_ids, names, encodings) where encodings is a
+            contiguous float32 matrix with one row per known face
+        """
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, name, encoding FROM known_faces ORDER BY id')
+            rows = cursor.fetchall()
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), [], np.empty((0, 128), dtype=np.float32)
+
+        face_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        names = [row[1] for row in rows]
+        if all(isinstance(row[2], bytes) for row in rows):
+            encodings = np.frombuffer(b''.join(row[2] for row in rows), dtype='<f4').reshape(len(rows), -1)
+        else:
+            encodings = np.vstack([decode_face_encoding(row[2]) for row in rows])
+        return face_ids, names, np.ascontiguousarray(encodings, dtype=np.float32)
+
+    def replace_face_prototypes(self, prototypes):
+        """
+        Replace the compacted gallery in one transaction.
+
+        Args:
+            prototypes: Dicts as returned by face_matching.compact_gallery
+        """
+        try:
+            with self.connection() as conn:
+                conn.execute('DELETE FROM face_prototypes')
+                conn.executemany(
+                    '''
+                    INSERT INTO face_prototypes (
+                        name, kind, encoding, threshold, source_count, representative_face_id
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    ''',
+                    [
+                        (p["name"], p["kind"], encode_face_encoding(p["encoding"]),
+                         float(p["threshold"]), p["source_count"], p["face_id"])
+                        for p in prototypes
+                    ]
+                )
+            return True
+        except Exception as e:
+            print(f"Error saving face prototypes: {e}")
+            traceback.print_exc()
+            return False
+
+    def load_face_prototypes(self):
+        """
+        Load the compacted gallery.
+
+        Returns:
+            Tuple of (representative_face_ids, names, encodings, thresholds,
+            is_stale) where is_stale means known_faces changed since the
+            prototypes were built
+        """
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT representative_face_id, name, encoding, threshold, kind, source_count
+                FROM face_prototypes ORDER BY id
+            ''')
+            rows = cursor.fetchall()
+            cursor.execute('SELECT COUNT(*) FROM known_faces')
+            known_count = cursor.fetchone()[0]
+
+        if not rows:
+            return (np.empty(0, dtype=np.int64), [], np.empty((0, 128), dtype=np.float32),
+                    np.empty(0, dtype=np.float32), known_count > 0)
+
+        face_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        names = [row[1] for row in rows]
+        encodings = np.vstack([decode_face_encoding(row[2]) for row in rows]).astype(np.float32)
+        thresholds = np.fromiter((row[3] for row in rows), dtype=np.float32, count=len(rows))
+        source_face_count = sum(row[5] or 0 for row in rows if row[4] == 'centroid')
+        return face_ids, names, encodings, thresholds, source_face_count != known_count
+
+    def get_enrollment_manifest(self):
+        """Return {source_ref: (content_hash, mtime, size_bytes, encoded)} for every enrolled source image"""
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT source_ref, content_hash, mtime, size_bytes, encoded FROM enrollment_manifest')
+            manifest = {row[0]: (row[1], row[2], row[3], bool(row[4])) for row in cursor.fetchall()}
+        return manifest
+
+    def rename_enrollment_sources(self, renames):
+        """Re-key manifest entries and the encodings enrolled from them, given {old_ref: new_ref}"""
+        try:
+            with self.connection() as conn:
+                pairs = [(new, old) for old, new in renames.items()]
+                conn.executemany('UPDATE OR REPLACE enrollment_manifest SET source_ref = ? WHERE source_ref = ?', pairs)
+                conn.executemany('UPDATE known_faces SET face_image_path = ? WHERE face_image_path = ?', pairs)
+            return True
+        except Exception as e:
+            print(f"Error renaming enrollment sources: {e}")
+            traceback.print_exc()
+            return False
+
+    def get_unmanifested_names(self):
+        """Names with encodings enrolled before the manifest existed (no source image recorded)"""
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT DISTINCT name FROM known_faces WHERE face_image_path IS NULL')
+            names = {row[0] for row in cursor.fetchall()}
+        return names
+
+    def delete_unmanifested_encodings(self, names):
+        """Drop pre-manifest encodings of the given people so they can be re-enrolled with their sources"""
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    'DELETE FROM known_faces WHERE name = ? AND face_image_path IS NULL',
+                    [(name,) for name in names]
+                )
+            return True
+        except Exception as e:
+            print(f"Error deleting face encodings: {e}")
+            traceback.print_exc()
+            return False
+
+    def get_person_encodings(self, person_name):
+        """Return all encodings of one person as a float32 matrix"""
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT encoding FROM known_faces WHERE name = ?', (person_name,))
+            rows = cursor.fetchall()
+        if not rows:
+            return np.empty((0, 128), dtype=np.float32)
+        return np.vstack([decode_face_encoding(row[0]) for row in rows])
+
     def get_article_count(self):
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM articles')
-        count = cursor.fetchone()[0]
-        conn.close()
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM articles')
+            count = cursor.fetchone()[0]
         return count
 
     def get_image_count(self):
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM images')
-        count = cursor.fetchone()[0]
-        conn.close()
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM images')
+            count = cursor.fetchone()[0]
         return count
 
     def get_known_faces_count(self):
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(DISTINCT name) FROM known_faces')
-        count = cursor.fetchone()[0]
-        conn.close()
+        with self._checkout() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(DISTINCT name) FROM known_faces')
+            count = cursor.fetchone()[0]
         return count
 
     def get_all_articles(self, limit=100, offset=0):
         """Get all articles with pagination"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT article_id, title, target_uri, publication_date, 
-                       source_domain, topic_category, sentiment_label, sentiment_score
-                FROM articles 
-                ORDER BY publication_date DESC 
-                LIMIT ? OFFSET ?
-            ''', (limit, offset))
-            results = cursor.fetchall()
-            conn.close()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT article_id, title, target_uri, publication_date, 
+                           source_domain, topic_category, sentiment_label, sentiment_score
+                    FROM articles 
+                    ORDER BY publication_date DESC 
+                    LIMIT ? OFFSET ?
+                ''', (limit, offset))
+                results = cursor.fetchall()
             return results
         except Exception as e:
             print(f"Error getting articles: {e}")
@@ -336,18 +853,17 @@ class DatabaseManager:
     def get_all_images(self, limit=100, offset=0):
         """Get all images with pagination"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT i.id, i.image_path, i.face_count, i.detected_faces,
-                       a.title as article_title, a.source_domain
-                FROM images i
-                JOIN articles a ON i.article_id = a.article_id
-                ORDER BY i.id DESC 
-                LIMIT ? OFFSET ?
-            ''', (limit, offset))
-            results = cursor.fetchall()
-            conn.close()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT i.id, i.image_path, i.face_count, i.detected_faces,
+                           a.title as article_title, a.source_domain
+                    FROM images i
+                    JOIN articles a ON i.article_id = a.article_id
+                    ORDER BY i.id DESC 
+                    LIMIT ? OFFSET ?
+                ''', (limit, offset))
+                results = cursor.fetchall()
             return results
         except Exception as e:
             print(f"Error getting images: {e}")
@@ -356,17 +872,16 @@ class DatabaseManager:
     def get_all_known_faces(self, limit=100, offset=0):
         """Get all known faces with pagination"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, name, profession, organization, country, 
-                       news_mentions_count, confidence_score
-                FROM known_faces 
-                ORDER BY news_mentions_count DESC 
-                LIMIT ? OFFSET ?
-            ''', (limit, offset))
-            results = cursor.fetchall()
-            conn.close()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, name, profession, organization, country, 
+                           news_mentions_count, confidence_score
+                    FROM known_faces 
+                    ORDER BY news_mentions_count DESC 
+                    LIMIT ? OFFSET ?
+                ''', (limit, offset))
+                results = cursor.fetchall()
             return results
         except Exception as e:
             print(f"Error getting known faces: {e}")
@@ -375,18 +890,17 @@ class DatabaseManager:
     def search_articles(self, query, limit=50):
         """Search articles by title or content"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT article_id, title, target_uri, publication_date, 
-                       source_domain, topic_category
-                FROM articles 
-                WHERE title LIKE ? OR cleaned_text LIKE ?
-                ORDER BY publication_date DESC 
-                LIMIT ?
-            ''', (f'%{query}%', f'%{query}%', limit))
-            results = cursor.fetchall()
-            conn.close()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT article_id, title, target_uri, publication_date, 
+                           source_domain, topic_category
+                    FROM articles 
+                    WHERE title LIKE ? OR cleaned_text LIKE ?
+                    ORDER BY publication_date DESC 
+                    LIMIT ?
+                ''', (f'%{query}%', f'%{query}%', limit))
+                results = cursor.fetchall()
             return results
         except Exception as e:
             print(f"Error searching articles: {e}")
@@ -395,36 +909,204 @@ class DatabaseManager:
     def get_face_recognition_history(self, face_id=None, limit=100):
         """Get face recognition history"""
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
+            with self._checkout() as conn:
+                cursor = conn.cursor()
             
-            if face_id:
-                cursor.execute('''
-                    SELECT fh.id, fh.recognition_date, fh.confidence_score,
-                           fh.context, a.title as article_title, i.image_path
-                    FROM face_recognition_history fh
-                    JOIN articles a ON fh.article_id = a.article_id
-                    JOIN images i ON fh.image_id = i.id
-                    WHERE fh.face_id = ?
-                    ORDER BY fh.recognition_date DESC
-                    LIMIT ?
-                ''', (face_id, limit))
-            else:
-                cursor.execute('''
-                    SELECT fh.id, fh.recognition_date, fh.confidence_score,
-                           fh.context, a.title as article_title, i.image_path,
-                           kf.name as face_name
-                    FROM face_recognition_history fh
-                    JOIN articles a ON fh.article_id = a.article_id
-                    JOIN images i ON fh.image_id = i.id
-                    JOIN known_faces kf ON fh.face_id = kf.id
-                    ORDER BY fh.recognition_date DESC
-                    LIMIT ?
-                ''', (limit,))
+                if face_id:
+                    cursor.execute('''
+                        SELECT fh.id, fh.recognition_date, fh.confidence_score,
+                               fh.context, a.title as article_title, i.image_path
+                        FROM face_recognition_history fh
+                        JOIN articles a ON fh.article_id = a.article_id
+                        JOIN images i ON fh.image_id = i.id
+                        WHERE fh.face_id = ?
+                        ORDER BY fh.recognition_date DESC
+                        LIMIT ?
+                    ''', (face_id, limit))
+                else:
+                    cursor.execute('''
+                        SELECT fh.id, fh.recognition_date, fh.confidence_score,
+                               fh.context, a.title as article_title, i.image_path,
+                               kf.name as face_name
+                        FROM face_recognition_history fh
+                        JOIN articles a ON fh.article_id = a.article_id
+                        JOIN images i ON fh.image_id = i.id
+                        JOIN known_faces kf ON fh.face_id = kf.id
+                        ORDER BY fh.recognition_date DESC
+                        LIMIT ?
+                    ''', (limit,))
             
-            results = cursor.fetchall()
-            conn.close()
+                results = cursor.fetchall()
             return results
         except Exception as e:
             print(f"Error getting face recognition history: {e}")
             return []
+
+
+class BulkWriter:
+    """
+    Batched writes over one persistent connection.
+
+    Rows are queued in call order and each run of rows for the same
+    statement is written with one executemany, so a delete queued before
+    an insert still runs before it. The transaction is committed once
+    every `batch_size` operations instead of once per row (with
+    autoflush=False only when flush() is called). Articles are inserted
+    immediately (inside the open transaction) because callers need their
+    article_id.
+
+    A flush that fails rolls back everything since the last commit,
+    including those articles, and re-raises: an article_id is only real
+    once the flush after it has returned.
+
+    Usage:
+        with db.bulk_writer() as writer:
+            article_id = writer.insert_article(article_data)
+            writer.insert_image(article_id, image_path)
+    """
+
+    def __init__(self, db, batch_size, autoflush=True):
+        self.db = db
+        self.batch_size = batch_size
+        self.autoflush = autoflush
+        self.conn = sqlite3.connect(db.db_path)
+        apply_pragmas(self.conn)
+        self.cursor = self.conn.cursor()
+        self._pending = []
+        self._pending_ops = 0
+        self._pending_articles = 0
+        self.rows_written = 0
+
+    def _add(self, sql, rows):
+        # A new segment starts whenever the statement changes
+        if self._pending and self._pending[-1][0] == sql:
+            self._pending[-1][1].extend(rows)
+        else:
+            self._pending.append((sql, list(rows)))
+
+    def _queue(self, sql, params):
+        self._add(sql, [params])
+        self._count()
+
+    def _count(self, ops=1):
+        self._pending_ops += ops
+        if self.autoflush and self._pending_ops >= self.batch_size:
+            self.flush()
+
+    def insert_article(self, article_data):
+        try:
+            self.cursor.execute(ARTICLE_INSERT_SQL, article_params(article_data))
+            article_id = self.cursor.lastrowid
+        except Exception as e:
+            print(f"Error inserting article: {e}")
+            traceback.print_exc()
+            return None
+        self._pending_articles += 1
+        if article_data.get('content_hash'):
+            self._add(BLOB_REF_SQL, [
+                blob_ref_params(article_data['content_hash'], article_data.get('html_path'), 'html')])
+        # Outside the try: a failed auto-flush rolled this article back and must propagate
+        self._count()
+        return article_id
+
+    def insert_image(self, article_id, image_path, image_metadata=None):
+        params = image_params(article_id, image_path, image_metadata)
+        content_hash = params[-1]
+        if content_hash:
+            self._add(BLOB_REF_SQL, [blob_ref_params(content_hash, image_path, 'image')])
+        self._queue(IMAGE_INSERT_SQL, params)
+        return True
+
+    def insert_face_encoding(self, name, encoding, face_metadata=None):
+        self._queue(FACE_ENCODING_INSERT_SQL, face_encoding_params(name, encoding, face_metadata))
+        return True
+
+    def update_image_face_detection(self, image_id, face_count, detected_faces):
+        self._queue(IMAGE_FACE_UPDATE_SQL, (face_count, json.dumps(detected_faces), image_id))
+        return True
+
+    def cache_detection(self, content_hash, detector_version, face_locations, encodings):
+        self._queue(DETECTION_CACHE_INSERT_SQL,
+                    detection_cache_params(content_hash, detector_version, face_locations, encodings))
+        return True
+
+    def record_enrollment(self, source_ref, person, content_hash, mtime, size_bytes, encoded):
+        self._queue(MANIFEST_UPSERT_SQL, (source_ref, person, content_hash, mtime, size_bytes, int(encoded)))
+        return True
+
+    def remove_enrollment(self, source_ref):
+        """Delete a source image's manifest entry and the encoding enrolled from it"""
+        self._queue(FACE_ENCODING_DELETE_BY_SOURCE_SQL, (source_ref,))
+        self._queue(MANIFEST_DELETE_SQL, (source_ref,))
+        return True
+
+    def replace_detected_faces(self, image_id, face_locations, encodings, matches):
+        self._queue(DETECTED_FACE_DELETE_SQL, (image_id,))
+        rows = detected_face_params(image_id, face_locations, encodings, matches)
+        if rows:
+            self._add(DETECTED_FACE_INSERT_SQL, rows)
+        return True
+
+    def update_detected_face_match(self, row_id, name, confidence, known_face_id):
+        self._queue(DETECTED_FACE_MATCH_UPDATE_SQL, (name, round(float(confidence), 3), known_face_id, row_id))
+        return True
+
+    def mark_image_skipped(self, image_id, reason):
+        self._queue(IMAGE_SKIP_UPDATE_SQL, (reason, image_id))
+        return True
+
+    def flush(self):
+        """
+        Write all queued rows and commit them as one transaction.
+
+        Raises:
+            Exception: whatever made the write or commit fail, after rolling back
+        """
+        new_faces = []
+        written = 0
+        try:
+            for sql, rows in self._pending:
+                if sql == FACE_ENCODING_INSERT_SQL:
+                    # Row by row (still one transaction) to learn the ids for the face index
+                    for params in rows:
+                        self.cursor.execute(sql, params)
+                        new_faces.append((self.cursor.lastrowid, params[1]))
+                else:
+                    self.cursor.executemany(sql, rows)
+                written += len(rows)
+            self.conn.commit()
+            self.rows_written += written + self._pending_articles
+        except Exception as e:
+            print(f"Error flushing batch of {self._pending_ops} operations: {e}")
+            self.conn.rollback()
+            raise
+        finally:
+            self._pending = []
+            self._pending_ops = 0
+            self._pending_articles = 0
+
+        if new_faces:
+            FaceIndexStore(self.db.db_path).append(
+                [face_id for face_id, _ in new_faces],
+                [decode_face_encoding(blob) for _, blob in new_faces]
+            )
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # Rows queued before an error are still written, like the per-row inserts
+        # were, but a failing flush must not hide the error that ended the block
+        try:
+            self.close()
+        except Exception:
+            pass
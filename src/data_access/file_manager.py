@@ -1,47 +1,236 @@
 # data_access/file_manager.py
 import os
 import json
+import time
+import uuid
 import logging
-import requests
 from urllib.parse import urlparse
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config import settings
+from src.data_access.image_downloader import ImageDownloader
+from src.data_access.blob_store import BlobStore
 
 class FileManager:
     def __init__(self):
-        pass
+        self._image_downloader = None
+        self._mappings_file = None
+        self._mappings_count = 0
+        self._run_id = None
+        # Pages and images are content-addressed, so duplicates are stored once
+        self.html_store = BlobStore(settings.HTML_SAVE_PATH)
+        self.image_store = BlobStore(settings.IMAGES_SAVE_PATH)
+
+    @property
+    def image_downloader(self):
+        # Created on first use so phases that only save HTML never start the thread pools
+        if self._image_downloader is None:
+            self._image_downloader = ImageDownloader()
+        return self._image_downloader
 
     def save_html(self, html_content, html_filename):
-        html_path = os.path.join(settings.HTML_SAVE_PATH, html_filename)
-        with open(html_path, "wb") as f:
-            f.write(html_content)
-        logging.info(f"Saved HTML: {html_path}")
+        _, html_path, created = self.html_store.put(html_content)
+        if created:
+            logging.info(f"Saved HTML: {html_path} ({html_filename})")
+        else:
+            logging.info(f"Duplicate HTML, reusing {html_path} ({html_filename})")
         return html_path
 
-    def download_images(self, image_urls, html_base_name):
-        saved_images = []
-        count = 0
-        for img_url in image_urls:
-            if count >= settings.MAX_IMAGES_PER_PAGE:
-                break
+    def save_image(self, content, img_url):
+        _, img_path, created = self.image_store.put(content)
+        if created:
+            logging.info(f"Downloaded image: {img_path}")
+        else:
+            logging.info(f"Duplicate image {img_url}, reusing {img_path}")
+        return img_path
+
+    def download_images(self, image_urls):
+        return [path for _, path in self.download_images_async(image_urls).result()]
+
+    def download_images_async(self, image_urls):
+        """Start downloading a page's images and return a Future of (url, path) pairs"""
+        return self.image_downloader.submit_page_images(
+            image_urls,
+            lambda content, url, index: self.save_image(content, url)
+        )
+
+    def close(self):
+        if self._image_downloader is not None:
+            self._image_downloader.close()
+            self._image_downloader = None
+
+    # ---- Page mappings: an append-only JSON Lines stream ----
+    #
+    # The first line of a stream is a {"run_id": ...} header. The .done marker
+    # holds the run id of the stream it completes, and the .consumed marker the
+    # run id of the last stream a following Phase 2 read to the end, so neither
+    # is ever mistaken for a marker of another run.
+
+    def start_mappings(self):
+        """
+        Start a new mappings stream, replacing the one from the previous run.
+
+        The new stream is a new file renamed over the old one instead of the
+        old file truncated in place, so a reader still on the previous
+        stream never reads from the middle of a line; it notices the swap
+        and moves to the new file.
+        """
+        if os.path.exists(self._mappings_done_path()):
+            os.remove(self._mappings_done_path())
+        self._run_id = uuid.uuid4().hex
+        new_path = f"{settings.MAPPINGS_PATH}.new{os.getpid()}"
+        self._mappings_file = open(new_path, "w", encoding="utf-8")
+        self._mappings_file.write(json.dumps({"run_id": self._run_id}) + "\n")
+        self._mappings_file.flush()
+        os.replace(new_path, settings.MAPPINGS_PATH)
+        self._mappings_count = 0
+
+    def append_mapping(self, mapping):
+        """Write one page's mapping and flush it, so a following Phase 2 sees it at once"""
+        if self._mappings_file is None:
+            self.start_mappings()
+        self._mappings_file.write(json.dumps(mapping) + "\n")
+        self._mappings_file.flush()
+        self._mappings_count += 1
+
+    def finish_mappings(self):
+        """Close the stream and mark it complete so readers stop waiting for more pages"""
+        if self._mappings_file is None:
+            self.start_mappings()
+        self._mappings_file.close()
+        self._mappings_file = None
+        self._write_marker(self._mappings_done_path(), self._run_id)
+        logging.info(f"Saved {os.path.basename(settings.MAPPINGS_PATH)} with {self._mappings_count} entries.")
+        return self._mappings_count
+
+    @staticmethod
+    def _mappings_done_path():
+        return settings.MAPPINGS_PATH + ".done"
+
+    @staticmethod
+    def _mappings_consumed_path():
+        return settings.MAPPINGS_PATH + ".consumed"
+
+    @staticmethod
+    def _write_marker(path, run_id):
+        # Renamed into place: a reader must never see the empty file, which means "complete" for older markers
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(run_id or "")
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_marker(path):
+        """Run id stored in a marker file; "" for the empty markers of older versions, None if absent"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _mappings_complete(self, run_id):
+        marker = self._read_marker(self._mappings_done_path())
+        return marker is not None and (marker == "" or marker == run_id)
+
+    @staticmethod
+    def _read_run_id(f):
+        """Run id from the header of a stream opened as `f`, or None (f rewound) for headerless streams"""
+        line = f.readline()
+        if line.endswith("\n"):
             try:
-                response = requests.get(img_url, timeout=settings.IMAGE_DOWNLOAD_TIMEOUT)
-                if response.status_code == 200:
-                    img_name = os.path.basename(urlparse(img_url).path) or f"image_{count}.jpg"
-                    img_path = os.path.join(settings.IMAGES_SAVE_PATH, f"{html_base_name}_{img_name}")
-                    with open(img_path, "wb") as f:
-                        f.write(response.content)
-                    saved_images.append(img_path)
-                    logging.info(f"Downloaded image: {img_path}")
-                    count += 1
-            except Exception as e:
-                logging.warning(f"Error downloading image {img_url}: {e}")
-        return saved_images
-
-    def save_mappings(self, mappings_data):
-        mapping_file = os.path.join(settings.EXTRACTED_DATA_PATH, "mappings.json")
-        with open(mapping_file, "w") as f:
-            json.dump(mappings_data, f, indent=2)
-        logging.info(f"Saved mappings.json with {len(mappings_data)} entries.")
+                header = json.loads(line)
+            except ValueError:
+                header = None
+            if isinstance(header, dict) and set(header) == {"run_id"}:
+                return header["run_id"]
+        f.seek(0)
+        return None
+
+    @staticmethod
+    def _mappings_replaced(f):
+        """True when a new Phase 1 run has put a new stream in place of the one open as `f`"""
+        try:
+            return os.stat(settings.MAPPINGS_PATH).st_ino != os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def has_mappings():
+        return os.path.exists(settings.MAPPINGS_PATH) or os.path.exists(settings.LEGACY_MAPPINGS_PATH)
+
+    def iter_mappings(self, follow=False, on_idle=None):
+        """
+        Yield page mappings one at a time, never holding the whole file in memory.
+
+        With follow=True the stream is tailed like `tail -f`: at the end of
+        the file the reader calls on_idle(), waits MAPPINGS_POLL_SECONDS and
+        reads again, until Phase 1 marks the stream complete or no page
+        arrives for MAPPINGS_IDLE_TIMEOUT seconds. If a new Phase 1 run
+        replaces the stream meanwhile, reading continues with the new one.
+        A complete stream a following reader has already read to the end
+        is the previous run's, so a follower waits for the next run's
+        stream instead of reading it again. A mappings.json from an older
+        run is read instead when there is no stream.
+        """
+        if not os.path.exists(settings.MAPPINGS_PATH) and os.path.exists(settings.LEGACY_MAPPINGS_PATH):
+            with open(settings.LEGACY_MAPPINGS_PATH, "r", encoding="utf-8") as f:
+                yield from json.load(f)
+            return
+
+        last_page = time.monotonic()
+        while not os.path.exists(settings.MAPPINGS_PATH):
+            if not follow or self._idle_timed_out(last_page, on_idle):
+                return
+
+        f = open(settings.MAPPINGS_PATH, "r", encoding="utf-8")
+        try:
+            run_id = self._read_run_id(f)
+            consumed = (follow and run_id is not None
+                        and self._read_marker(self._mappings_consumed_path()) == run_id)
+            if consumed:
+                logging.info("Mappings stream was already processed, waiting for Phase 1 to start a new one")
+            partial = ""
+            while True:
+                # Checked before reading, so every line written before the marker is still read
+                complete = not follow or self._mappings_complete(run_id)
+                if not consumed:
+                    for line in iter(f.readline, ""):
+                        partial += line
+                        if not partial.endswith("\n"):
+                            # The writer is mid-line; the rest arrives on a later read
+                            break
+                        if partial.strip():
+                            yield json.loads(partial)
+                        partial = ""
+                        last_page = time.monotonic()
+                    if complete:
+                        if partial.strip():
+                            logging.warning("Ignoring truncated last line of the mappings stream")
+                        if follow:
+                            self._write_marker(self._mappings_consumed_path(), run_id)
+                        return
+                if self._mappings_replaced(f):
+                    # Nothing more is written to the old stream once a new run has replaced it
+                    logging.info("Phase 1 started a new mappings stream, following it")
+                    f.close()
+                    f = open(settings.MAPPINGS_PATH, "r", encoding="utf-8")
+                    run_id = self._read_run_id(f)
+                    consumed = False
+                    partial = ""
+                    continue
+                if self._idle_timed_out(last_page, on_idle):
+                    logging.warning(f"No new pages for {settings.MAPPINGS_IDLE_TIMEOUT}s, stopped following mappings")
+                    return
+        finally:
+            f.close()
+
+    @staticmethod
+    def _idle_timed_out(last_page, on_idle):
+        """Call on_idle, then sleep one poll interval; True once the idle timeout has passed"""
+        if on_idle is not None:
+            on_idle()
+        if settings.MAPPINGS_IDLE_TIMEOUT and time.monotonic() - last_page > settings.MAPPINGS_IDLE_TIMEOUT:
+            return True
+        time.sleep(settings.MAPPINGS_POLL_SECONDS)
+        return False
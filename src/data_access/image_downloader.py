@@ -0,0 +1,134 @@
+# Concurrent image downloads
+# data_access/image_downloader.py
+import os
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import settings
+
+
+class ImageDownloader:
+    """Pooled image fetcher shared by every page of a Phase 1 run.
+
+    One keep-alive requests.Session is reused for all downloads. Requests
+    wait in a queue per host and are only handed to a fetch thread once
+    their host is below `max_per_host` connections, so a slow host never
+    ties up threads that other hosts could use. At most `max_workers`
+    requests are in flight at once.
+    """
+
+    def __init__(self, max_workers=settings.IMAGE_DOWNLOAD_WORKERS,
+                 max_per_host=settings.IMAGE_DOWNLOAD_PER_HOST,
+                 timeout=settings.IMAGE_DOWNLOAD_TIMEOUT):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._fetch_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="img-fetch")
+        # Page jobs only wait on fetch futures, so they get their own pool to avoid deadlocks
+        self._page_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="img-page")
+        # host -> deque of (url, future) not started yet; hosts are served round-robin
+        self._waiting = OrderedDict()
+        self._active = {}
+        self._inflight = 0
+        self._schedule_lock = threading.Lock()
+
+    def fetch(self, url):
+        """Fetch one URL and return its body, or None on failure"""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.content
+            logging.warning(f"Error downloading image {url}: HTTP {response.status_code}")
+        except Exception as e:
+            logging.warning(f"Error downloading image {url}: {e}")
+        return None
+
+    def fetch_async(self, url):
+        """Queue a fetch behind its host's limit and return a Future of the body (None on failure)"""
+        future = Future()
+        host = urlparse(url).netloc
+        with self._schedule_lock:
+            self._waiting.setdefault(host, deque()).append((url, future))
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        # Called with _schedule_lock held: start waiting fetches while threads and host slots are free
+        while self._inflight < self.max_workers:
+            host = next((h for h in self._waiting if self._active.get(h, 0) < self.max_per_host), None)
+            if host is None:
+                return
+            url, future = self._waiting[host].popleft()
+            if self._waiting[host]:
+                self._waiting.move_to_end(host)
+            else:
+                del self._waiting[host]
+            self._active[host] = self._active.get(host, 0) + 1
+            self._inflight += 1
+            self._fetch_pool.submit(self._run_fetch, host, url, future)
+
+    def _run_fetch(self, host, url, future):
+        try:
+            content = self.fetch(url)
+        finally:
+            with self._schedule_lock:
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+                self._inflight -= 1
+                self._dispatch()
+        future.set_result(content)
+
+    def download_page_images(self, image_urls, save_image, limit=settings.MAX_IMAGES_PER_PAGE):
+        """
+        Download up to `limit` images for one page.
+
+        URLs are tried in order. Each round fetches as many candidates as are
+        still missing, so failed downloads are replaced by the next URLs just
+        like the sequential loop did.
+
+        Args:
+            image_urls: Candidate image URLs in page order
+            save_image: Callable (content, url, index) -> saved path
+            limit: Maximum number of images to keep
+
+        Returns:
+            List of (image_url, saved_path) tuples in page order
+        """
+        candidates = list(image_urls)
+        saved = []
+        position = 0
+        while len(saved) < limit and position < len(candidates):
+            batch = candidates[position:position + limit - len(saved)]
+            position += len(batch)
+            futures = [self.fetch_async(url) for url in batch]
+            wait(futures)
+            for url, future in zip(batch, futures):
+                content = future.result()
+                if content is None:
+                    continue
+                try:
+                    saved.append((url, save_image(content, url, len(saved))))
+                except Exception as e:
+                    logging.warning(f"Error saving image {url}: {e}")
+        return saved
+
+    def submit_page_images(self, image_urls, save_image, limit=settings.MAX_IMAGES_PER_PAGE):
+        """Schedule download_page_images in the background and return its Future"""
+        return self._page_pool.submit(self.download_page_images, image_urls, save_image, limit)
+
+    def close(self):
+        self._page_pool.shutdown(wait=True)
+        self._fetch_pool.shutdown(wait=True)
+        self.session.close()
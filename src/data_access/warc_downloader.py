@@ -1,18 +1,111 @@
 # Download WARC files
 # data_access/warc_downloader.py
 import os
+import re
 import requests
 import gzip
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config import settings
 
 
+class DownloadCancelled(Exception):
+    """Raised inside a download when its cancel event was set"""
+
+
+class WARCStream:
+    """
+    Read-only file object over an HTTP response body.
+
+    A background thread pulls chunks from the network into a bounded queue
+    while the consumer parses earlier ones. When the queue is full the
+    thread stops reading, so TCP flow control throttles the server.
+    """
+
+    _EOF = object()
+
+    def __init__(self, response, max_chunks=settings.WARC_STREAM_BUFFER_CHUNKS,
+                 chunk_size=settings.DOWNLOAD_CHUNK_SIZE):
+        self.response = response
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._closed = threading.Event()
+        self._error = None
+        self._chunk = b""
+        self._pos = 0
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, args=(chunk_size,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self, chunk_size):
+        try:
+            for chunk in self.response.iter_content(chunk_size=chunk_size):
+                if not self._put(chunk):
+                    return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(self._EOF)
+            self.response.close()
+
+    def read(self, size=-1):
+        # Short reads are fine for ArchiveIterator; only b"" means end of stream
+        if self._pos >= len(self._chunk):
+            if self._eof:
+                return b""
+            item = self._queue.get()
+            if item is self._EOF:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+                return b""
+            self._chunk, self._pos = item, 0
+
+        if size is None or size < 0:
+            end = len(self._chunk)
+        else:
+            end = min(len(self._chunk), self._pos + size)
+        data = self._chunk[self._pos:end]
+        self._pos = end
+        return data
+
+    def close(self):
+        self._closed.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class WARCDownloader:
     def __init__(self, download_dir=settings.EXTRACTED_DATA_PATH):
         self.download_dir = download_dir
         os.makedirs(self.download_dir, exist_ok=True)
+        # requests.Session is not thread-safe and iter_warc_files downloads from several threads
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """This thread's keep-alive session"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
 
     def download_and_get_warc_paths(self):
         warc_paths_file = os.path.join(self.download_dir, "warc.paths.gz")
@@ -20,9 +113,10 @@ class WARCDownloader:
         # Download warc.paths.gz
         if not os.path.exists(warc_paths_file):
             print(f"Downloading WARC paths from {settings.COMMON_CRAWL_INDEX}")
-            response = requests.get(settings.COMMON_CRAWL_INDEX, stream=True)
-            with open(warc_paths_file, "wb") as f:
-                f.write(response.content)
+            part_filename = warc_paths_file + ".part"
+            total_size = self._fetch_to_file(settings.COMMON_CRAWL_INDEX, part_filename)
+            self._verify(part_filename, total_size, None)
+            os.replace(part_filename, warc_paths_file)
 
         # Extract first N warc file paths
         warc_urls = []
@@ -34,13 +128,145 @@ class WARCDownloader:
 
         return warc_urls
 
-    def download_warc_file(self, warc_url):
+    def download_warc_file(self, warc_url, cancel=None):
+        """
+        Download a WARC file, resuming an interrupted download if one exists.
+
+        Data is written to `<name>.part`, which is checked against the size
+        (and MD5, when the server's ETag is a plain digest) before it is
+        renamed, so only verified files ever appear under the final name.
+        Setting the `cancel` event stops the download between chunks and
+        keeps the part file for the next run to resume.
+
+        Returns:
+            Local path of the verified file, or None if the download failed
+        """
         local_filename = os.path.join(self.download_dir, os.path.basename(warc_url))
-        if not os.path.exists(local_filename):
-            print(f"Downloading WARC file: {warc_url}")
-            response = requests.get(warc_url, stream=True)
-            with open(local_filename, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
+        part_filename = local_filename + ".part"
+
+        expected_size, etag = self._remote_info(warc_url)
+        if os.path.exists(local_filename):
+            local_size = os.path.getsize(local_filename)
+            if expected_size is None or local_size == expected_size:
+                return local_filename
+            # Truncated file from an older run: keep its bytes and resume from them
+            print(f"Resuming truncated WARC file ({local_size}/{expected_size} bytes): {local_filename}")
+            os.replace(local_filename, part_filename)
+
+        for attempt in range(1, settings.DOWNLOAD_RETRIES + 1):
+            try:
+                total_size = self._fetch_to_file(warc_url, part_filename, resume=True, cancel=cancel)
+                expected_size = expected_size or total_size
+                self._verify(part_filename, expected_size, etag)
+                os.replace(part_filename, local_filename)
+                return local_filename
+            except DownloadCancelled:
+                print(f"Download cancelled: {warc_url}")
+                return None
+            except Exception as e:
+                print(f"Error downloading {warc_url} (attempt {attempt}/{settings.DOWNLOAD_RETRIES}): {e}")
+                if isinstance(e, ValueError) and os.path.exists(part_filename):
+                    if not expected_size or os.path.getsize(part_filename) >= expected_size:
+                        # The data is corrupt, start over
+                        os.remove(part_filename)
+                    # Otherwise the connection closed early: resume from what we have
+
+        return None
+
+    def open_warc_stream(self, warc_url):
+        """Open a WARC file for streaming ingest without writing it to disk"""
+        print(f"Streaming WARC file: {warc_url}")
+        response = self.session.get(warc_url, stream=True, timeout=60)
+        response.raise_for_status()
+        return WARCStream(response)
+
+    def iter_warc_files(self, warc_urls, max_workers=settings.WARC_DOWNLOAD_WORKERS, should_stop=None):
+        """
+        Yield (warc_url, local_path) in order while the next files download in the background.
+
+        At most `max_workers` files are fetched ahead of the consumer.
+        `should_stop()` is checked before waiting on each file, and once
+        the consumer stops or closes the generator the queued downloads
+        are cancelled and the running ones abort at their next chunk.
+        """
+        cancel = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = []
+            next_idx = 0
+            for idx, warc_url in enumerate(warc_urls):
+                if should_stop is not None and should_stop():
+                    return
+                while next_idx < len(warc_urls) and next_idx <= idx + max_workers - 1:
+                    futures.append(pool.submit(self.download_warc_file, warc_urls[next_idx], cancel))
+                    next_idx += 1
+                yield warc_url, futures[idx].result()
+        finally:
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _remote_info(self, url):
+        """Return (content_length, etag) from a HEAD request; either may be None"""
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=30)
+            if response.status_code != 200:
+                return None, None
+            length = response.headers.get("Content-Length")
+            return (int(length) if length else None), response.headers.get("ETag")
+        except Exception:
+            return None, None
+
+    def _fetch_to_file(self, url, filename, resume=False, cancel=None):
+        """
+        Stream `url` into `filename` without checking or renaming it.
+
+        With `resume`, an existing file is continued with an HTTP Range
+        request. Servers that ignore the range get a fresh download.
+
+        Returns:
+            Total size of the remote file when the server reports it, else None
+
+        Raises:
+            DownloadCancelled: if `cancel` was set before the body finished
+        """
+        offset = os.path.getsize(filename) if resume and os.path.exists(filename) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with self.session.get(url, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code == 416 and offset:
+                # Range past the end: the file already holds everything
+                return offset
+            response.raise_for_status()
+
+            total_size = None
+            if response.status_code == 206:
+                match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+                total_size = int(match.group(1)) if match else None
+                mode = "ab"
+            else:
+                length = response.headers.get("Content-Length")
+                total_size = int(length) if length else None
+                mode = "wb"
+
+            with open(filename, mode) as f:
+                for chunk in response.iter_content(chunk_size=settings.DOWNLOAD_CHUNK_SIZE):
+                    if cancel is not None and cancel.is_set():
+                        raise DownloadCancelled(url)
                     f.write(chunk)
-        return local_filename
 
+        return total_size
+
+    def _verify(self, local_filename, expected_size, etag):
+        actual_size = os.path.getsize(local_filename)
+        if expected_size is not None and actual_size != expected_size:
+            raise ValueError(f"size mismatch: got {actual_size} bytes, expected {expected_size}")
+
+        # Single-part S3 uploads use the MD5 of the body as ETag; multipart ones contain a '-'
+        digest = (etag or "").strip('"')
+        if settings.WARC_VERIFY_CHECKSUM and re.fullmatch(r"[0-9a-f]{32}", digest):
+            md5 = hashlib.md5()
+            with open(local_filename, "rb") as f:
+                for chunk in iter(lambda: f.read(settings.DOWNLOAD_CHUNK_SIZE), b""):
+                    md5.update(chunk)
+            if md5.hexdigest() != digest:
+                raise ValueError(f"MD5 mismatch: got {md5.hexdigest()}, expected {digest}")
@@ -0,0 +1,147 @@
+# Sidecar offset index for local WARC files
+# data_access/warc_index.py
+import os
+import gzip
+from collections import namedtuple
+from urllib.parse import urlparse
+from warcio.archiveiterator import ArchiveIterator
+
+IndexEntry = namedtuple("IndexEntry", ["offset", "length", "status", "mime", "uri"])
+
+INDEX_HEADER = " CDX offset length status mime uri"
+
+
+class WARCIndex:
+    """
+    CDX-style index of the response records in a WARC file.
+
+    The index is a gzipped text file next to the WARC (`<warc>.cdx.gz`) with
+    one line per response record. It is built once and rebuilt only when
+    the WARC is newer than the index. Records are then read by seeking to
+    their offset, which works because every record in a .warc.gz is its own
+    gzip member.
+    """
+
+    def index_path(self, warc_path):
+        return warc_path + ".cdx.gz"
+
+    def is_current(self, warc_path):
+        index_file = self.index_path(warc_path)
+        return os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(warc_path)
+
+    def build(self, warc_path):
+        """Scan a WARC once and write its index. Returns the entries."""
+        entries = []
+        for _ in self._scan(warc_path, entries):
+            pass
+        return entries
+
+    def _scan(self, warc_path, entries, wanted=None):
+        """
+        Read every response record of a WARC, appending its entry to `entries`.
+
+        Yields (entry, content) for the records `wanted(entry)` accepts, as
+        they are read, so a caller gets its first page without waiting for
+        the whole file. If the caller closes the generator early (Phase 1
+        stops at MAX_HTML_PAGES), the remaining records are still indexed,
+        without reading their bodies, so the index is always written.
+        """
+        with open(warc_path, "rb") as stream:
+            iterator = ArchiveIterator(stream)
+            for record in iterator:
+                if record.rec_type != "response":
+                    continue
+                uri = record.rec_headers.get_header("WARC-Target-URI") or ""
+                status = record.http_headers.get_statuscode() if record.http_headers else ""
+                mime = ""
+                if record.http_headers:
+                    mime = record.http_headers.get_header("Content-Type", "").split(";")[0].strip().lower()
+                # wanted() sees the entry before its position is known: asking
+                # the iterator for the offset reads the record to its end
+                entry = IndexEntry(None, None, status or "-", mime or "-", uri)
+                content = record.content_stream().read() if wanted is not None and wanted(entry) else None
+                iterator.read_to_end(record)
+                entry = entry._replace(offset=iterator.get_record_offset(), length=iterator.get_record_length())
+                entries.append(entry)
+                if content is not None:
+                    try:
+                        yield entry, content
+                    except GeneratorExit:
+                        # Nothing more is yielded; keep going only to finish the index
+                        wanted = None
+
+        self._write(warc_path, entries)
+
+    def _write(self, warc_path, entries):
+        index_file = self.index_path(warc_path)
+        part_file = index_file + ".part"
+        with gzip.open(part_file, "wt", encoding="utf-8") as f:
+            f.write(INDEX_HEADER + "\n")
+            for entry in entries:
+                # The URI goes last because it is the only field that may contain spaces
+                f.write(f"{entry.offset} {entry.length} {entry.status} {entry.mime} {entry.uri}\n")
+        os.replace(part_file, index_file)
+
+    def load(self, warc_path):
+        """Return the index entries, building the index first if it is missing or stale"""
+        if not self.is_current(warc_path):
+            return self.build(warc_path)
+
+        entries = []
+        with gzip.open(self.index_path(warc_path), "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(" CDX"):
+                    continue
+                offset, length, status, mime, uri = line.rstrip("\n").split(" ", 4)
+                entries.append(IndexEntry(int(offset), int(length), status, mime, uri))
+        return entries
+
+    @staticmethod
+    def _matches(entry, mime, domain, start_offset):
+        if start_offset and entry.offset < start_offset:
+            return False
+        if mime and mime not in entry.mime:
+            return False
+        if domain:
+            host = urlparse(entry.uri).netloc.lower()
+            if host != domain and not host.endswith("." + domain):
+                return False
+        return True
+
+    def find(self, warc_path, mime="text/html", domain=None, start_offset=0):
+        """
+        Select index entries by MIME type, domain and position.
+
+        Args:
+            mime: Substring the record's MIME type must contain (None for any)
+            domain: Keep only URIs on this host or its subdomains
+            start_offset: Skip records before this byte offset, for resuming
+        """
+        return [entry for entry in self.load(warc_path) if self._matches(entry, mime, domain, start_offset)]
+
+    def iter_html_records(self, warc_path, domain=None, start_offset=0):
+        """
+        Yield (url, html_content) for text/html records.
+
+        With a current index each record is read by seeking straight to it.
+        Otherwise the records are yielded while the index is being built; the
+        index is saved even when the caller stops early.
+        """
+        if not self.is_current(warc_path):
+            wanted = lambda entry: self._matches(entry, "text/html", domain, 0)
+            scan = self._scan(warc_path, [], wanted)
+            try:
+                for entry, content in scan:
+                    if entry.offset >= start_offset:
+                        yield entry.uri, content
+            finally:
+                # Closing the scan indexes the records the caller did not get to
+                scan.close()
+            return
+
+        entries = self.find(warc_path, domain=domain, start_offset=start_offset)
+        with open(warc_path, "rb") as stream:
+            for entry in entries:
+                stream.seek(entry.offset)
+                record = next(iter(ArchiveIterator(stream)))
+                yield entry.uri, record.content_stream().read()
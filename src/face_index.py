@@ -0,0 +1,284 @@
+# core/face_index.py
+import os
+import logging
+import shutil
+import threading
+import numpy as np
+from typing import Tuple
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+
+DIM = 128
+# One pending record: int64 face id followed by 128 float32 values
+PENDING_RECORD = np.dtype([('id', '<i8'), ('vec', '<f4', (DIM,))])
+
+
+def squared_distances(queries, vectors, vector_sq_norms=None):
+    """Squared Euclidean distances between two float32 matrices, shape (len(queries), len(vectors))"""
+    if vector_sq_norms is None:
+        vector_sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+    sq = np.einsum('ij,ij->i', queries, queries)[:, None] + vector_sq_norms[None, :]
+    sq -= 2.0 * (queries @ vectors.T)
+    np.maximum(sq, 0.0, out=sq)
+    return sq
+
+
+def nearest_centroid(data, centroids, chunk_size=8192):
+    """Index of the closest centroid for each row, computed in chunks to bound memory"""
+    centroid_sq = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        labels[start:start + chunk_size] = np.argmin(squared_distances(block, centroids, centroid_sq), axis=1)
+    return labels
+
+
+def kmeans(data, k, iterations=10, seed=0):
+    """
+    Plain Lloyd's k-means in NumPy.
+
+    Returns:
+        Tuple of (centroids, labels)
+    """
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    k = max(1, min(k, len(data)))
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    labels = np.zeros(len(data), dtype=np.int64)
+
+    for _ in range(iterations):
+        labels = nearest_centroid(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        # Sum each cluster's rows with one sort + reduceat instead of a scatter-add
+        order = np.argsort(labels, kind='stable')
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = np.add.reduceat(data[order], starts, axis=0) / counts[filled, None]
+        # Re-seed empty clusters on random points so k stays meaningful
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+
+    return centroids, labels
+
+
+class IVFIndex:
+    """
+    Inverted-file index: k-means cells over the encodings, search probes the closest cells.
+
+    Vectors are stored grouped by cell so a query only computes exact
+    distances for the `nprobe` cells nearest to it, roughly
+    nprobe / nlist of the gallery.
+    """
+
+    def __init__(self, nlist=None, nprobe=settings.FACE_IVF_NPROBE):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = None
+        self.cell_ids = []
+        self.cell_vectors = []
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.cell_ids)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, DIM)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+        # A sample is enough to place the cells; training on 1M rows would take minutes
+        sample_size = min(len(vectors), nlist * 32)
+        sample = vectors[np.random.default_rng(0).choice(len(vectors), size=sample_size, replace=False)]
+        self.centroids, _ = kmeans(sample, nlist)
+        self.nlist = len(self.centroids)
+        self.cell_ids = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self.cell_vectors = [np.empty((0, DIM), dtype=np.float32) for _ in range(self.nlist)]
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, DIM)
+        if len(ids) == 0:
+            return
+        cells = nearest_centroid(vectors, self.centroids)
+        for cell in np.unique(cells):
+            members = cells == cell
+            self.cell_ids[cell] = np.concatenate([self.cell_ids[cell], ids[members]])
+            self.cell_vectors[cell] = np.vstack([self.cell_vectors[cell], vectors[members]])
+
+    def search(self, queries) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (face_ids, distances) of the nearest indexed vector for each query (-1 if none found)"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, DIM)
+        nprobe = min(self.nprobe, self.nlist)
+        cell_sq = squared_distances(queries, self.centroids)
+        probes = np.argpartition(cell_sq, nprobe - 1, axis=1)[:, :nprobe]
+
+        result_ids = np.full(len(queries), -1, dtype=np.int64)
+        result_dist = np.full(len(queries), np.inf, dtype=np.float32)
+        for q, cells in enumerate(probes):
+            candidates = [c for c in cells if len(self.cell_ids[c])]
+            if not candidates:
+                continue
+            ids = np.concatenate([self.cell_ids[c] for c in candidates])
+            vectors = np.vstack([self.cell_vectors[c] for c in candidates])
+            sq = squared_distances(queries[q:q + 1], vectors)[0]
+            best = np.argmin(sq)
+            result_ids[q] = ids[best]
+            result_dist[q] = np.sqrt(sq[best])
+        return result_ids, result_dist
+
+    def save(self, path):
+        """Write the index as a directory of .npy files, replacing any index already at `path`"""
+        arrays = {
+            "centroids": self.centroids,
+            "offsets": np.cumsum([0] + [len(ids) for ids in self.cell_ids]),
+            "ids": np.concatenate(self.cell_ids) if self.cell_ids else np.empty(0, dtype=np.int64),
+            "vectors": np.vstack(self.cell_vectors) if self.cell_vectors else np.empty((0, DIM), dtype=np.float32)
+        }
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, name + ".npy"), array)
+        # A directory cannot be renamed over a non-empty one: move the old index aside first
+        old_path = None
+        if os.path.exists(path):
+            old_path = f"{path}.old{os.getpid()}"
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        if old_path is not None:
+            # Processes that mapped the old files keep reading them until they let go
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a saved index with its arrays memory-mapped, so processes
+        loading the same index share its pages instead of each reading a copy
+        """
+        def array(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+        index = cls(nprobe=settings.FACE_IVF_NPROBE)
+        index.centroids = array("centroids")
+        index.nlist = len(index.centroids)
+        offsets = array("offsets")
+        ids, vectors = array("ids"), array("vectors")
+        index.cell_ids = [ids[offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+        index.cell_vectors = [vectors[offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+        return index
+
+
+def load_face_index(face_ids, encodings, db_path=settings.DB_PATH, backend=None):
+    """
+    Return the search index selected by FACE_SEARCH_BACKEND for a gallery.
+
+    'exact' returns None: FaceMatcher then scans the whole gallery, which is
+    fastest for small galleries. 'ivf' loads (or builds) the persisted
+    IVFIndex.
+    """
+    backend = backend or settings.FACE_SEARCH_BACKEND
+    if backend == "exact" or len(face_ids) == 0:
+        return None
+    if backend == "ivf":
+        return FaceIndexStore(db_path).load(face_ids, encodings)
+    raise ValueError(f"Unknown face search backend '{backend}', expected 'exact' or 'ivf'")
+
+
+class FaceIndexStore:
+    """
+    Persists an approximate index next to the database.
+
+    `<db>.faces.ivf/` holds the trained index as memory-mapped .npy files
+    (see IVFIndex.save). Encodings inserted later are
+    appended to `<db>.faces.pending` (520 bytes each) by the database layer,
+    so enrolment never rewrites the index. Pending records are merged on
+    load and folded into the saved index once they grow past a fraction of
+    it.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, db_path=settings.DB_PATH):
+        base = os.path.splitext(db_path)[0]
+        self.index_path = base + ".faces.ivf"
+        # Single-file index written by older versions; replaced by the next save
+        self.legacy_path = base + ".faces.npz"
+        self.pending_path = base + ".faces.pending"
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    def append(self, face_ids, encodings):
+        """Record newly inserted encodings; a no-op until an index has been built"""
+        if not self.exists():
+            return
+        records = np.empty(len(face_ids), dtype=PENDING_RECORD)
+        records['id'] = face_ids
+        records['vec'] = np.asarray(encodings, dtype=np.float32).reshape(-1, DIM)
+        with self._lock, open(self.pending_path, "ab") as f:
+            f.write(records.tobytes())
+
+    def invalidate(self):
+        """Drop the persisted index, e.g. after encodings were deleted; it is rebuilt on next load"""
+        if os.path.isdir(self.index_path):
+            shutil.rmtree(self.index_path)
+        for path in (self.legacy_path, self.pending_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _read_pending(self):
+        if not os.path.exists(self.pending_path):
+            return np.empty(0, dtype=PENDING_RECORD)
+        raw = open(self.pending_path, "rb").read()
+        # Ignore a torn trailing record from a crash mid-append
+        usable = len(raw) - len(raw) % PENDING_RECORD.itemsize
+        return np.frombuffer(raw[:usable], dtype=PENDING_RECORD)
+
+    def load(self, face_ids, encodings):
+        """
+        Return an IVF index covering exactly the given gallery.
+
+        The saved index plus pending records are used when they match the
+        gallery; otherwise the index is retrained from scratch and saved.
+        """
+        face_ids = np.asarray(face_ids, dtype=np.int64)
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, DIM)
+        with self._lock:
+            index = None
+            pending = np.empty(0, dtype=PENDING_RECORD)
+            if self.exists():
+                try:
+                    index = IVFIndex.load(self.index_path)
+                    pending = self._read_pending()
+                    index.add(pending['id'], pending['vec'])
+                except Exception as e:
+                    logging.warning(f"Could not load face index {self.index_path}: {e}")
+                    index = None
+
+            if index is not None:
+                indexed = np.concatenate(index.cell_ids)
+                if not np.isin(indexed, face_ids).all():
+                    # Encodings were deleted outside the store: the cells are stale
+                    index = None
+                else:
+                    # Rows inserted without going through the store (e.g. direct SQL)
+                    missing = np.isin(face_ids, indexed, invert=True)
+                    if missing.any():
+                        index.add(face_ids[missing], encodings[missing])
+                    if missing.any() or len(pending) > 0.1 * len(face_ids):
+                        self._save(index)
+
+            if index is None:
+                index = IVFIndex()
+                index.train(encodings)
+                index.add(face_ids, encodings)
+                self._save(index)
+            return index
+
+    def _save(self, index):
+        index.save(self.index_path)
+        for path in (self.legacy_path, self.pending_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,204 @@
+# core/face_matching.py
+import json
+import numpy as np
+from typing import List, Tuple
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+from src.face_index import IVFIndex, squared_distances, kmeans
+
+
+class FaceMatcher:
+    """
+    Matches face encodings against the known-faces gallery in one batched step.
+
+    The gallery is kept as a contiguous float32 matrix with precomputed
+    squared norms, so the distances from every face in an image to every
+    known face come from a single matrix product:
+        |q - g|^2 = |q|^2 + |g|^2 - 2 q.g
+    With an approximate index only the candidates it returns are scored.
+    """
+
+    def __init__(self, encodings, names, face_ids=None, tolerance=settings.FACE_MATCH_TOLERANCE, index=None,
+                 thresholds=None):
+        self.gallery = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self.names = list(names)
+        self.face_ids = np.asarray(face_ids if face_ids is not None else np.arange(len(self.names)), dtype=np.int64)
+        self.tolerance = tolerance
+        # Per-row match thresholds (compacted galleries); defaults to the global tolerance
+        self.thresholds = np.asarray(thresholds, dtype=np.float32) if thresholds is not None else None
+        # Optional approximate index (see face_index.load_face_index); None means exact search
+        self.index = index
+        self._sq_norms = np.einsum('ij,ij->i', self.gallery, self.gallery)
+        self._id_order = np.argsort(self.face_ids)
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances(self, queries) -> np.ndarray:
+        """Euclidean distances, shape (num_queries, gallery_size)"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        return np.sqrt(squared_distances(queries, self.gallery, self._sq_norms))
+
+    def nearest(self, queries) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (gallery_index, distance) of the closest known face for each query"""
+        if self.index is not None:
+            ids, dists = self.index.search(queries)
+            sorted_ids = self.face_ids[self._id_order]
+            positions = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+            best = self._id_order[positions]
+            # Ids the index returned that are not in this gallery count as no match
+            dists = np.where(sorted_ids[positions] == ids, dists, np.inf)
+            return best, dists
+        dists = self.distances(queries)
+        best = np.argmin(dists, axis=1)
+        return best, dists[np.arange(len(best)), best]
+
+    def match(self, queries) -> List[Tuple[str, float, int]]:
+        """
+        Identify each query encoding.
+
+        Returns:
+            One (name, confidence, face_id) tuple per query; faces farther
+            than the tolerance from every known face are ('unknown', 0.0, None)
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        if len(queries) == 0:
+            return []
+        if len(self) == 0:
+            return [("unknown", 0.0, None)] * len(queries)
+
+        best, best_dist = self.nearest(queries)
+        results = []
+        for idx, dist in zip(best, best_dist):
+            threshold = self.thresholds[idx] if self.thresholds is not None else self.tolerance
+            if dist <= threshold:
+                results.append((self.names[idx], float(1.0 - dist), int(self.face_ids[idx])))
+            else:
+                results.append(("unknown", 0.0, None))
+        return results
+
+
+def save_gallery_snapshot(matcher: FaceMatcher, directory: str):
+    """
+    Write a matcher's gallery to `directory` so worker processes can map it.
+
+    The float32 matrix goes to gallery.npy and is opened with mmap by
+    load_gallery_snapshot, so every worker shares the same page-cache
+    pages instead of holding its own copy. An approximate index is saved
+    alongside it and mapped the same way.
+    """
+    np.save(os.path.join(directory, "gallery.npy"), matcher.gallery)
+    np.save(os.path.join(directory, "face_ids.npy"), matcher.face_ids)
+    if matcher.thresholds is not None:
+        np.save(os.path.join(directory, "thresholds.npy"), matcher.thresholds)
+    if matcher.index is not None:
+        matcher.index.save(os.path.join(directory, "index"))
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"names": matcher.names, "tolerance": matcher.tolerance}, f)
+
+
+def load_gallery_snapshot(directory: str) -> FaceMatcher:
+    """Rebuild a FaceMatcher from save_gallery_snapshot output without copying the gallery"""
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    thresholds_path = os.path.join(directory, "thresholds.npy")
+    index_path = os.path.join(directory, "index")
+    return FaceMatcher(
+        np.load(os.path.join(directory, "gallery.npy"), mmap_mode="r"),
+        meta["names"],
+        np.load(os.path.join(directory, "face_ids.npy")),
+        tolerance=meta["tolerance"],
+        index=IVFIndex.load(index_path) if os.path.exists(index_path) else None,
+        thresholds=np.load(thresholds_path) if os.path.exists(thresholds_path) else None
+    )
+
+
+def compact_gallery(face_ids, names, encodings, prototypes_per_person=settings.FACE_PROTOTYPES_PER_PERSON,
+                    tolerance=settings.FACE_MATCH_TOLERANCE):
+    """
+    Reduce each person's encodings to a centroid plus a few k-means prototypes.
+
+    Each prototype gets its own threshold: the global tolerance widened by
+    half the 95th percentile distance from the person's encodings to their
+    nearest prototype, capped at FACE_PROTOTYPE_MAX_THRESHOLD. People whose
+    photos vary a lot stay matchable without loosening everyone else.
+
+    Returns:
+        List of dicts with name, kind ('centroid' or 'prototype'), encoding,
+        threshold, source_count and face_id (the closest real known_faces row)
+    """
+    face_ids = np.asarray(face_ids, dtype=np.int64)
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    names = np.asarray(names, dtype=object)
+
+    rows = []
+    for name in sorted(set(names)):
+        members = np.flatnonzero(names == name)
+        person = encodings[members]
+
+        centers = [person.mean(axis=0)]
+        kinds = ["centroid"]
+        if len(person) > 2 and prototypes_per_person > 0:
+            prototypes, _ = kmeans(person, min(prototypes_per_person, len(person) - 1))
+            centers.extend(prototypes)
+            kinds.extend(["prototype"] * len(prototypes))
+        centers = np.asarray(centers, dtype=np.float32)
+
+        dists = np.sqrt(squared_distances(person, centers))
+        spread = float(np.percentile(dists.min(axis=1), 95))
+        threshold = min(tolerance + 0.5 * spread, settings.FACE_PROTOTYPE_MAX_THRESHOLD)
+
+        for center_idx, (center, kind) in enumerate(zip(centers, kinds)):
+            closest = int(np.argmin(dists[:, center_idx]))
+            rows.append({
+                "name": name,
+                "kind": kind,
+                "encoding": center,
+                "threshold": threshold,
+                "source_count": len(person) if kind == "centroid" else int((dists.argmin(axis=1) == center_idx).sum()),
+                "face_id": int(face_ids[members[closest]])
+            })
+    return rows
+
+
+def evaluate_compaction(names, encodings, compact_matcher, tolerance=settings.FACE_MATCH_TOLERANCE,
+                        sample_size=2000, seed=0):
+    """
+    Measure how often the compacted gallery agrees with the full one.
+
+    A sample of enrolled encodings is matched leave-one-out against the full
+    gallery (so a face cannot match itself) and against the compacted
+    gallery. The compacted gallery was built with the sampled encodings in
+    it, so its numbers are slightly optimistic.
+
+    Returns:
+        Dict with sample size, full and compact identification rates and the
+        agreement between the two
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    names = list(names)
+    if len(names) == 0:
+        return {}
+
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(names), size=min(sample_size, len(names)), replace=False)
+    queries = encodings[sample]
+
+    full_sq = squared_distances(queries, encodings)
+    full_sq[np.arange(len(sample)), sample] = np.inf
+    full_best = np.argmin(full_sq, axis=1)
+    full_dist = np.sqrt(full_sq[np.arange(len(sample)), full_best])
+    full_names = [names[b] if d <= tolerance else "unknown" for b, d in zip(full_best, full_dist)]
+    compact_names = [name for name, _, _ in compact_matcher.match(queries)]
+    true_names = [names[i] for i in sample]
+
+    return {
+        "sample": len(sample),
+        "gallery_size": len(names),
+        "compact_size": len(compact_matcher),
+        "full_recall": float(np.mean([f == t for f, t in zip(full_names, true_names)])),
+        "compact_recall": float(np.mean([c == t for c, t in zip(compact_names, true_names)])),
+        "agreement": float(np.mean([c == f for c, f in zip(compact_names, full_names)]))
+    }
@@ -1,14 +1,134 @@
 # core/face_processing.py
 import face_recognition
 import numpy as np
-import json
+from PIL import Image
 from typing import List, Dict, Tuple, Optional
+import sys
+import os
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.face_matching import FaceMatcher
+from src.face_index import load_face_index
+from src.model_registry import registry
+from config import settings
+
+# face_recognition keeps one dlib detector, shape predictor and encoder per
+# process, and they are not safe to call from several threads at once
+_dlib_lock = threading.Lock()
+
+
+def _find_face_locations(image, model=None):
+    with _dlib_lock:
+        return face_recognition.face_locations(image, model=model or settings.FACE_DETECTOR_MODEL)
+
+
+def _encode_faces(image, known_face_locations):
+    with _dlib_lock:
+        return face_recognition.face_encodings(image, known_face_locations)
+
+
+def detector_version() -> str:
+    """
+    Identify everything that changes detection output.
+
+    Cached detections are keyed by image content hash plus this string, so
+    changing the model or the resize caps invalidates them automatically.
+    """
+    return (
+        f"face_recognition-{getattr(face_recognition, '__version__', 'unknown')}"
+        f":{settings.FACE_DETECTOR_MODEL}"
+        f":detect{settings.FACE_DETECT_MAX_SIDE}:decode{settings.FACE_DECODE_MAX_SIDE}"
+        ":original-boxes"
+    )
+
+
+def load_image_for_detection(image_path, decode_max_side=None, detect_max_side=None):
+    """
+    Decode an image cheaply and prepare a smaller copy for face detection.
+
+    JPEGs are decoded with Pillow's draft mode, which lets libjpeg scale by
+    1/2, 1/4 or 1/8 during decoding, so a 6000px photo never materialises
+    at full size. The result is capped at `decode_max_side` (encodings are
+    computed from 150px face chips, so more pixels add nothing) and a copy
+    capped at `detect_max_side` is made for HOG detection. A cap of 0
+    disables it.
+
+    Returns:
+        Tuple of (image, detection_image, scale, original_shape) where the
+        images are RGB uint8 arrays, scale maps image coordinates to
+        detection_image coordinates and original_shape is the file's
+        (height, width) before any reduction
+    """
+    decode_max_side = settings.FACE_DECODE_MAX_SIDE if decode_max_side is None else decode_max_side
+    detect_max_side = settings.FACE_DETECT_MAX_SIDE if detect_max_side is None else detect_max_side
+
+    with Image.open(image_path) as img:
+        original_shape = (img.height, img.width)
+        if decode_max_side and img.format == "JPEG" and max(img.size) > decode_max_side:
+            # draft() only reduces while both sides stay >= the requested size
+            ratio = decode_max_side / max(img.size)
+            img.draft("RGB", (int(img.width * ratio), int(img.height * ratio)))
+        img = img.convert("RGB")
+        if decode_max_side and max(img.size) > decode_max_side:
+            img.thumbnail((decode_max_side, decode_max_side), Image.BILINEAR)
+
+        scale = 1.0
+        detection_img = img
+        if detect_max_side and max(img.size) > detect_max_side:
+            scale = detect_max_side / max(img.size)
+            detection_img = img.resize(
+                (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                Image.BILINEAR
+            )
+        image = np.array(img)
+        detection_image = image if detection_img is img else np.array(detection_img)
+    return image, detection_image, scale, original_shape
+
+
+def scale_face_locations(face_locations, scale, image_shape):
+    """Map (top, right, bottom, left) boxes from a downscaled copy back onto the image of `image_shape`"""
+    if scale == 1.0:
+        return list(face_locations)
+    height, width = image_shape[:2]
+    return [
+        (
+            max(0, int(round(top / scale))),
+            min(width, int(round(right / scale))),
+            min(height, int(round(bottom / scale))),
+            max(0, int(round(left / scale)))
+        )
+        for top, right, bottom, left in face_locations
+    ]
+
 
 class FaceProcessor:
-    def __init__(self):
-        self.known_face_encodings = []
+    def __init__(self, matcher: Optional[FaceMatcher] = None):
+        """
+        Args:
+            matcher: Prebuilt gallery matcher (e.g. a worker's mmap snapshot);
+                     when omitted the gallery is loaded from the database
+                     the first time it is needed
+        """
+        self.known_face_ids = np.empty(0, dtype=np.int64)
+        self.known_face_encodings = np.empty((0, 128), dtype=np.float32)
         self.known_face_names = []
-        self.load_known_faces()
+        self._matcher = None
+        if matcher is not None:
+            self._matcher = matcher
+            self.known_face_ids = matcher.face_ids
+            self.known_face_encodings = matcher.gallery
+            self.known_face_names = matcher.names
+
+    @property
+    def matcher(self) -> FaceMatcher:
+        """Gallery matcher, loaded on first use so encode-only callers (enrollment) never read the gallery"""
+        if self._matcher is None:
+            self.load_known_faces()
+        return self._matcher
+
+    def reset_gallery(self):
+        """Forget the loaded gallery after known_faces changed; it is reloaded on next use"""
+        self._matcher = None
 
     def load_known_faces(self):
         """Load known faces from database for comparison"""
@@ -19,117 +139,133 @@ class FaceProcessor:
             from src.data_access.database import DatabaseManager
             db = DatabaseManager()
             
-            conn = db._connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT name, encoding FROM known_faces')
-            results = cursor.fetchall()
-            
-            for name, encoding_str in results:
-                encoding = json.loads(encoding_str)
-                self.known_face_encodings.append(encoding)
-                self.known_face_names.append(name)
-            
-            conn.close()
+            if settings.FACE_GALLERY_MODE == "compact" and self._load_compact_gallery(db):
+                return
+
+            # One query and one buffer copy into a contiguous float32 matrix
+            self.known_face_ids, self.known_face_names, self.known_face_encodings = db.load_gallery()
+            index = load_face_index(self.known_face_ids, self.known_face_encodings, db.db_path)
+            self._matcher = FaceMatcher(
+                self.known_face_encodings, self.known_face_names, self.known_face_ids, index=index
+            )
             print(f"Loaded {len(self.known_face_names)} known faces")
         except Exception as e:
             print(f"Error loading known faces: {e}")
-            # Initialize empty lists if database is not available
-            self.known_face_encodings = []
+            # Initialize empty gallery if database is not available
+            self.known_face_ids = np.empty(0, dtype=np.int64)
+            self.known_face_encodings = np.empty((0, 128), dtype=np.float32)
             self.known_face_names = []
+            self._matcher = FaceMatcher(self.known_face_encodings, self.known_face_names, self.known_face_ids)
+
+    def _load_compact_gallery(self, db) -> bool:
+        """Match against per-person prototypes; False if they are missing or older than known_faces"""
+        face_ids, names, encodings, thresholds, is_stale = db.load_face_prototypes()
+        if not names or is_stale:
+            print("Compact gallery missing or out of date, using full gallery (run compact_gallery to rebuild)")
+            return False
+
+        self.known_face_ids, self.known_face_names, self.known_face_encodings = face_ids, names, encodings
+        self._matcher = FaceMatcher(encodings, names, face_ids, thresholds=thresholds)
+        print(f"Loaded {len(names)} face prototypes for {len(set(names))} people")
+        return True
+
+    def locate_faces(self, image_path):
+        """
+        Detect faces on a downscaled copy of the image.
+
+        Returns:
+            Tuple of (image, face_locations, original_shape) with the boxes
+            in the decoded image's coordinates, ready for
+            face_recognition.face_encodings
+        """
+        image, detection_image, scale, original_shape = load_image_for_detection(image_path)
+        locations = _find_face_locations(detection_image)
+        return image, scale_face_locations(locations, scale, image.shape), original_shape
 
     def get_face_encoding(self, image_path):
         """Get face encoding for a single face (existing method)"""
         try:
-            image = face_recognition.load_image_file(image_path)
-
             # First detect all face locations
-            face_locations = face_recognition.face_locations(image)
+            image, face_locations, _ = self.locate_faces(image_path)
 
             if len(face_locations) == 0:
                 return None
 
             # Encode faces using the detected locations
-            encodings = face_recognition.face_encodings(image, face_locations)
+            encodings = _encode_faces(image, face_locations)
 
             if len(encodings) > 0:
-                # Convert numpy array to list for JSON storage
-                return encodings[0].tolist()
+                # Stored as a packed float32 BLOB by the database layer
+                return encodings[0]
 
             return None
         except Exception as e:
             print(f"Error processing image {image_path}: {e}")
             return None
 
-    def detect_and_recognize_faces(self, image_path: str) -> Tuple[int, List[Dict]]:
+    def match_encodings(self, face_encodings) -> List[Dict]:
+        """Match all encodings from one image against the gallery in a single batch"""
+        return self.format_matches(self.matcher.match(face_encodings))
+
+    @staticmethod
+    def format_matches(matches) -> List[Dict]:
+        """Turn FaceMatcher.match results into images.detected_faces entries"""
+        return [{"name": name, "confidence": round(confidence, 3)} for name, confidence, _ in matches]
+
+    def detect_faces(self, image_path: str) -> Optional[Tuple[List[Tuple[int, int, int, int]], np.ndarray]]:
         """
-        Detect faces in image and recognize them against known faces
-        
+        Detect and encode every face in an image, without matching.
+
         Returns:
-            Tuple of (face_count, detected_faces_list)
-            detected_faces_list contains dicts with 'name' and 'confidence'
+            Tuple of (face_locations, encodings) with one (top, right, bottom,
+            left) box in the original image's pixels and one float32 row per
+            face, or None if the image could not be processed
         """
         try:
-            image = face_recognition.load_image_file(image_path)
-            
-            # Detect face locations
-            face_locations = face_recognition.face_locations(image)
+            # Detect face locations on a downscaled copy, mapped back to the decoded image
+            image, face_locations, original_shape = self.locate_faces(image_path)
             
             if len(face_locations) == 0:
-                return 0, []
+                return [], np.empty((0, 128), dtype=np.float32)
             
             # Encode all detected faces
-            face_encodings = face_recognition.face_encodings(image, face_locations)
-            
-            detected_faces = []
-            
-            for face_encoding in face_encodings:
-                # Compare with known faces
-                if self.known_face_encodings:
-                    matches = face_recognition.compare_faces(
-                        self.known_face_encodings, 
-                        face_encoding,
-                        tolerance=0.6  # Adjust tolerance as needed
-                    )
-                    
-                    # Calculate face distances for confidence
-                    face_distances = face_recognition.face_distance(
-                        self.known_face_encodings, 
-                        face_encoding
-                    )
-                    
-                    if True in matches:
-                        # Find the best match
-                        best_match_index = np.argmin(face_distances)
-                        confidence = 1.0 - face_distances[best_match_index]
-                        name = self.known_face_names[best_match_index]
-                    else:
-                        name = "unknown"
-                        confidence = 0.0
-                else:
-                    name = "unknown"
-                    confidence = 0.0
-                
-                detected_faces.append({
-                    "name": name,
-                    "confidence": round(confidence, 3)
-                })
+            face_encodings = _encode_faces(image, face_locations)
+
+            # The decode may be capped below the file's size; boxes are stored in the file's own pixels
+            decode_scale = max(image.shape[:2]) / max(original_shape)
+            face_locations = scale_face_locations(face_locations, decode_scale, original_shape)
             
-            return len(face_locations), detected_faces
+            return face_locations, np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
             
         except Exception as e:
             print(f"Error processing image {image_path}: {e}")
+            return None
+
+    def detect_and_recognize_faces(self, image_path: str) -> Tuple[int, List[Dict]]:
+        """
+        Detect faces in image and recognize them against known faces
+        
+        Returns:
+            Tuple of (face_count, detected_faces_list)
+            detected_faces_list contains dicts with 'name' and 'confidence'
+        """
+        detection = self.detect_faces(image_path)
+        if detection is None:
             return 0, []
+        face_locations, face_encodings = detection
+        if len(face_locations) == 0:
+            return 0, []
+        return len(face_locations), self.match_encodings(face_encodings)
 
     def get_all_face_encodings(self, image_path: str) -> List[List[float]]:
         """Get all face encodings from an image"""
         try:
-            image = face_recognition.load_image_file(image_path)
-            face_locations = face_recognition.face_locations(image)
+            image, face_locations, _ = self.locate_faces(image_path)
             
             if len(face_locations) == 0:
                 return []
             
-            face_encodings = face_recognition.face_encodings(image, face_locations)
+            face_encodings = _encode_faces(image, face_locations)
             
             # Convert numpy arrays to lists for JSON storage
             return [encoding.tolist() for encoding in face_encodings]
@@ -138,33 +274,20 @@ class FaceProcessor:
             print(f"Error getting face encodings from {image_path}: {e}")
             return []
 
-    def get_person_encodings(self, person_name: str) -> List[List[float]]:
-        """Get all encodings for a specific person"""
+    def get_person_encodings(self, person_name: str) -> np.ndarray:
+        """Get all encodings for a specific person as a float32 matrix"""
         try:
             import sys
             import os
             sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
             from src.data_access.database import DatabaseManager
             db = DatabaseManager()
-            
-            conn = db._connect()
-            cursor = conn.cursor()
-            cursor.execute('SELECT encoding FROM known_faces WHERE name = ?', (person_name,))
-            results = cursor.fetchall()
-            conn.close()
-            
-            encodings = []
-            for encoding_str, in results:
-                try:
-                    encoding = json.loads(encoding_str)
-                    encodings.append(encoding)
-                except:
-                    continue
-            
-            return encodings
+            return db.get_person_encodings(person_name)
             
         except Exception as e:
             print(f"Error getting encodings for {person_name}: {e}")
-            return []
+            return np.empty((0, 128), dtype=np.float32)
 
 
+# One shared processor (and gallery) per process, e.g. for Phase 3, Phase 4 and the dashboard
+registry.register("face_processor", FaceProcessor)
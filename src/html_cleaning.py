@@ -0,0 +1,199 @@
+# core/html_cleaning.py
+import logging
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+
+# Tags whose text is never article content
+REMOVED_TAGS = ("script", "style", "nav", "header", "footer", "aside", "form", "noscript", "iframe", "svg")
+
+# Whole class/id tokens of common boilerplate blocks (cookie banners, share bars, related links, ...).
+# Tokens are compared exactly, so "has-sidebar" or "comments-enabled-story" never match.
+BOILERPLATE_TOKENS = frozenset({
+    "cookie", "cookies", "cookie-banner", "cookie-consent", "cookie-notice", "consent", "consent-banner",
+    "banner", "share", "shares", "sharing", "share-bar", "share-buttons", "social", "social-share",
+    "social-links", "related", "related-articles", "related-posts", "comment", "comments", "subscribe",
+    "newsletter", "advert", "advertisement", "ad", "ads", "promo", "sidebar", "menu", "breadcrumb",
+    "breadcrumbs", "popup", "modal",
+})
+
+# Containers that are never dropped, even if a class matches (e.g. <body class="menu">)
+PROTECTED_TAGS = {"html", "head", "body", "main", "article"}
+
+# Where the article text lives, most specific first; it and its ancestors are never dropped
+MAIN_CONTENT_SELECTORS = ("article", "main", '[role="main"]', '[itemprop="articleBody"]')
+MAIN_CONTENT_XPATHS = ("//article", "//main", '//*[@role="main"]', '//*[@itemprop="articleBody"]')
+
+
+def _is_boilerplate(tag, class_attr, id_attr):
+    if tag in PROTECTED_TAGS:
+        return False
+    tokens = (class_attr or "").split() + (id_attr or "").split()
+    return any(token.lower() in BOILERPLATE_TOKENS for token in tokens)
+
+
+def normalize_result(title, text):
+    # str.split() collapses all whitespace runs, like re.sub(r'\s+', ' ', ...) but faster
+    return {"title": " ".join((title or "").split()), "cleaned_text": " ".join(text.split())}
+
+
+def to_bytes(html_content):
+    return html_content.encode("utf-8", errors="ignore") if isinstance(html_content, str) else html_content
+
+
+def clean_with_selectolax(html_content):
+    """lexbor (C) parser: fastest, drops boilerplate blocks in one CSS pass"""
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(to_bytes(html_content).decode("utf-8", errors="ignore"))
+    title_node = tree.css_first("title")
+    title = title_node.text() if title_node else ""
+    return normalize_result(title, selectolax_tree_text(tree))
+
+
+def selectolax_tree_text(tree):
+    """Drop non-content tags and boilerplate from a parsed lexbor tree and return its text"""
+    tree.strip_tags(list(REMOVED_TAGS))
+    if settings.HTML_REMOVE_BOILERPLATE:
+        keep = set()
+        main = next((n for n in (tree.css_first(sel) for sel in MAIN_CONTENT_SELECTORS) if n is not None), None)
+        while main is not None:
+            keep.add(main.mem_id)
+            main = main.parent
+        for node in tree.css("[class], [id]"):
+            if node.mem_id in keep:
+                continue
+            if _is_boilerplate(node.tag, node.attributes.get("class"), node.attributes.get("id")):
+                node.decompose()
+    root = tree.root
+    return root.text(separator="\n") if root is not None else ""
+
+
+def clean_with_lxml(html_content):
+    """libxml2 (C) parser"""
+    root = parse_with_lxml(html_content)
+    if root is None:
+        return normalize_result("", "")
+    title_node = root.find(".//title")
+    title = title_node.text_content() if title_node is not None else ""
+    return normalize_result(title, lxml_tree_text(root))
+
+
+def parse_with_lxml(html_content):
+    """Parse a page into an lxml document, or None if it is empty or unparseable"""
+    import lxml.html
+    from lxml import etree
+    content = to_bytes(html_content)
+    if not content.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(content, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def lxml_tree_text(root):
+    """Drop non-content tags and boilerplate from a parsed lxml document and return its text"""
+    from lxml import etree
+    etree.strip_elements(root, *REMOVED_TAGS, etree.Comment, etree.ProcessingInstruction, with_tail=False)
+    if settings.HTML_REMOVE_BOILERPLATE:
+        keep = set()
+        for xpath in MAIN_CONTENT_XPATHS:
+            found = root.xpath(xpath)
+            if found:
+                keep = {found[0], *found[0].iterancestors()}
+                break
+        for node in root.xpath("//*[@class or @id]"):
+            if node in keep or node.getparent() is None:
+                continue
+            if _is_boilerplate(node.tag, node.get("class"), node.get("id")):
+                node.drop_tree()
+    return "\n".join(root.itertext())
+
+
+def clean_with_bs4(html_content):
+    """Pure-Python html.parser fallback; always available"""
+    soup = parse_with_bs4(html_content)
+    title_tag = soup.find("title")
+    title = title_tag.get_text() if title_tag else ""
+    return normalize_result(title, bs4_soup_text(soup))
+
+
+def parse_with_bs4(html_content):
+    from bs4 import BeautifulSoup
+    if isinstance(html_content, bytes):
+        html_content = html_content.decode("utf-8", errors="ignore")
+    return BeautifulSoup(html_content, "html.parser")
+
+
+def bs4_soup_text(soup):
+    """Drop non-content tags and boilerplate from a parsed BeautifulSoup document and return its text"""
+    for tag in soup(list(REMOVED_TAGS)):
+        tag.decompose()
+    if settings.HTML_REMOVE_BOILERPLATE:
+        keep = set()
+        main = next((n for n in (soup.select_one(sel) for sel in MAIN_CONTENT_SELECTORS) if n is not None), None)
+        if main is not None:
+            keep = {id(main), *(id(parent) for parent in main.parents)}
+        for tag in soup.find_all(lambda t: t.has_attr("class") or t.has_attr("id")):
+            if tag.decomposed or id(tag) in keep:
+                continue
+            class_attr = " ".join(tag.get("class") or [])
+            if _is_boilerplate(tag.name, class_attr, tag.get("id")):
+                tag.decompose()
+    return soup.get_text(separator="\n")
+
+
+CLEANERS = {
+    "selectolax": clean_with_selectolax,
+    "lxml": clean_with_lxml,
+    "bs4": clean_with_bs4,
+}
+
+_AUTO_ORDER = (("selectolax", "selectolax.lexbor"), ("lxml", "lxml.html"))
+_selected = {}
+
+
+def resolve_backend(name=None):
+    """
+    Return the parser backend a name stands for.
+
+    'auto' (the default from HTML_CLEANER) picks the first installed C
+    parser, selectolax then lxml, and falls back to BeautifulSoup.
+    """
+    name = name or settings.HTML_CLEANER
+    if name in _selected:
+        return _selected[name]
+    if name == "auto":
+        chosen = "bs4"
+        for backend, module in _AUTO_ORDER:
+            try:
+                __import__(module)
+                chosen = backend
+                break
+            except ImportError:
+                continue
+        logging.info(f"Using '{chosen}' HTML parser")
+    elif name in CLEANERS:
+        chosen = name
+    else:
+        raise ValueError(f"Unknown HTML cleaner '{name}', expected one of {sorted(CLEANERS)} or 'auto'")
+    _selected[name] = chosen
+    return chosen
+
+
+def get_cleaner(name=None):
+    """Return the cleaning function for a backend name (see resolve_backend)"""
+    return CLEANERS[resolve_backend(name)]
+
+
+def clean_html(html_content, backend=None):
+    """Extract title and cleaned text with the configured backend, falling back to BeautifulSoup on errors"""
+    cleaner = get_cleaner(backend)
+    try:
+        return cleaner(html_content)
+    except Exception as e:
+        if cleaner is clean_with_bs4:
+            raise
+        logging.warning(f"HTML cleaner failed ({e}), falling back to BeautifulSoup")
+        return clean_with_bs4(html_content)
@@ -0,0 +1,77 @@
+# core/image_triage.py
+import os
+import logging
+from typing import Optional
+import numpy as np
+from PIL import Image
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+
+# Formats that are almost never news photos: animations, sprites, icons, vector art
+NON_PHOTO_FORMATS = {"GIF", "ICO", "CUR", "XBM", "PCX"}
+NON_PHOTO_EXTENSIONS = {".svg", ".svgz", ".gif", ".ico"}
+
+_cascade = None
+_cascade_unavailable = False
+
+
+def _get_cascade():
+    """Load OpenCV's frontal-face Haar cascade once; None if OpenCV is not installed"""
+    global _cascade, _cascade_unavailable
+    if _cascade is None and not _cascade_unavailable:
+        try:
+            import cv2
+            _cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        except Exception as e:
+            logging.warning(f"Cascade pre-filter disabled, OpenCV not available: {e}")
+            _cascade_unavailable = True
+    return _cascade
+
+
+def _cascade_finds_face(img) -> bool:
+    """Run the Haar cascade on a small grayscale copy of an opened image"""
+    cascade = _get_cascade()
+    if cascade is None:
+        return True
+    gray = img.convert("L")
+    gray.thumbnail((settings.FACE_TRIAGE_CASCADE_SIDE, settings.FACE_TRIAGE_CASCADE_SIDE))
+    faces = cascade.detectMultiScale(np.asarray(gray), scaleFactor=1.2, minNeighbors=3, minSize=(20, 20))
+    return len(faces) > 0
+
+
+def triage_image(image_path: str) -> Optional[str]:
+    """
+    Decide cheaply whether an image is worth running face detection on.
+
+    Only the file header is read for the size, aspect ratio and format
+    checks. The optional Haar cascade (FACE_TRIAGE_CASCADE) decodes a small
+    grayscale copy and is much cheaper than HOG, but it misses some faces
+    HOG would find, so it is off by default.
+
+    Returns:
+        None if the image should be processed, otherwise the skip reason
+        ('non_photo_format', 'unreadable', 'too_small', 'extreme_aspect_ratio'
+        or 'no_face_cascade')
+    """
+    if os.path.splitext(image_path)[1].lower() in NON_PHOTO_EXTENSIONS:
+        return "non_photo_format"
+
+    try:
+        with Image.open(image_path) as img:
+            if img.format in NON_PHOTO_FORMATS:
+                return "non_photo_format"
+
+            width, height = img.size
+            if min(width, height) < settings.FACE_TRIAGE_MIN_SIDE:
+                return "too_small"
+            if max(width, height) / max(1, min(width, height)) > settings.FACE_TRIAGE_MAX_ASPECT_RATIO:
+                return "extreme_aspect_ratio"
+
+            if settings.FACE_TRIAGE_CASCADE and not _cascade_finds_face(img):
+                return "no_face_cascade"
+    except Exception:
+        # Not an image Pillow can read (HTML error page, SVG saved as .jpg, truncated file)
+        return "unreadable"
+
+    return None
@@ -0,0 +1,76 @@
+# core/model_registry.py
+import logging
+import threading
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of expensive models, each loaded on first use.
+
+    Modules register a loader per model name; nothing is imported or
+    loaded until get() is first called for that name, so a phase that never
+    touches spaCy never pays for importing it. A model that fails to load
+    is cached as None, and callers fall back exactly as they did when the
+    load failed in their constructor; callers that cannot work without the
+    model pass required=True and get the load error instead. Each model has
+    its own lock, so loading a slow model never blocks getting another.
+
+    The cache is per process: worker pools use spawn, so each worker that
+    needs a model loads its own copy.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._errors = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def register(self, name, loader):
+        """Register a zero-argument callable that builds the model"""
+        self._loaders[name] = loader
+
+    def _lock_for(self, name):
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name, required=False):
+        """
+        Return the model, loading it on first use.
+
+        Raises:
+            KeyError: if no loader is registered under `name`
+            RuntimeError: if `required` and the model failed to load
+        """
+        if name not in self._models:
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under '{name}'")
+            with self._lock_for(name):
+                if name not in self._models:
+                    try:
+                        logging.info(f"Loading model '{name}'")
+                        self._models[name] = self._loaders[name]()
+                        self._errors.pop(name, None)
+                    except Exception as e:
+                        logging.warning(f"Could not load model '{name}': {e}")
+                        self._errors[name] = e
+                        self._models[name] = None
+
+        model = self._models[name]
+        if model is None and required:
+            error = self._errors.get(name)
+            raise RuntimeError(f"Model '{name}' could not be loaded: {error}") from error
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def unload(self, name=None):
+        """Drop one cached model, or all of them, so the next get() reloads"""
+        for key in list(self._models) if name is None else [name]:
+            with self._lock_for(key):
+                self._models.pop(key, None)
+                self._errors.pop(key, None)
+
+
+registry = ModelRegistry()
@@ -8,5 +8,5 @@ from src.services.warc_service import WARCService
 def run_phase1():
     print("=== Phase 1: Downloading and extracting HTML + images ===")
     service = WARCService()
-    mappings = service.process_warc_files()
-    print(f"Phase 1 complete. {len(mappings)} pages processed.")
+    page_count = service.process_warc_files()
+    print(f"Phase 1 complete. {page_count} pages processed.")
@@ -1,9 +1,11 @@
 # Phase 3 workflow
 # phases/phase3.py
 from ..services.face_service import FaceService
+from config import settings
 
 def run_phase3():
     print("=== Phase 3: Enrolling faces from LFW dataset ===")
     service = FaceService()
     service.enroll_faces()
-
+    if settings.FACE_GALLERY_MODE == "compact":
+        service.compact_gallery()
@@ -10,15 +10,19 @@ def run_phase4():
     # Process all images for face detection and recognition
     service.process_all_images()
     
-    # Display statistics
+    print_face_statistics(service)
+    
+    print("Phase 4 complete.")
+
+
+def print_face_statistics(service):
     stats = service.get_face_statistics()
     if stats:
         print("\n=== Face Detection Statistics ===")
         print(f"Total images: {stats['total_images']}")
         print(f"Images with faces: {stats['images_with_faces']}")
+        print(f"Images skipped by pre-filter: {stats['images_skipped']}")
         print(f"Total faces detected: {stats['total_faces_detected']}")
         print(f"Known faces recognized: {stats['known_faces_recognized']}")
         print(f"Unknown faces: {stats['unknown_faces']}")
         print("=" * 50)
-    
-    print("Phase 4 complete.")
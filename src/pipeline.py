@@ -0,0 +1,245 @@
+# core/pipeline.py
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from contextlib import ExitStack
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+
+# Put once per downstream worker when a stage has finished
+_END = object()
+
+
+class StageStats:
+    """Items and time split of one stage, summed over its workers"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.wall_seconds = 0.0
+        self.wait_input_seconds = 0.0
+        self.wait_output_seconds = 0.0
+        self.failed_workers = 0
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for field, amount in amounts.items():
+                setattr(self, field, getattr(self, field) + amount)
+
+    @property
+    def busy_seconds(self):
+        """Worker time spent doing the stage's own work, not waiting on a neighbour"""
+        return max(0.0, self.wall_seconds - self.wait_input_seconds - self.wait_output_seconds)
+
+
+class StageInput:
+    """
+    One worker's view of a stage's input queue, ending at the upstream's end marker.
+
+    iter(on_idle) calls on_idle() before blocking on an empty queue, which
+    lets a batching stage store a partial batch instead of holding it while
+    the upstream is slow.
+    """
+
+    def __init__(self, input_queue, stats):
+        self._queue = input_queue
+        self._stats = stats
+        self.finished = input_queue is None
+
+    def __iter__(self):
+        return self.iter()
+
+    def iter(self, on_idle=None):
+        while not self.finished:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                if on_idle is not None:
+                    on_idle()
+                start = time.perf_counter()
+                item = self._queue.get()
+                self._stats.add(wait_input_seconds=time.perf_counter() - start)
+            if item is _END:
+                self.finished = True
+                return
+            self._stats.add(items_in=1)
+            yield item
+
+
+class Pipeline:
+    """
+    Stages joined by bounded queues, each run by its own pool of threads.
+
+    A stage is a function worker(inputs, emit): it iterates `inputs` (empty
+    for the first stage) and passes results downstream with emit(item),
+    which blocks while the next queue is full. The stages overlap, so the
+    run takes about as long as the slowest stage rather than the sum of
+    all of them. The stages release the GIL where it matters: network I/O,
+    SQLite, the NLP libraries and the detection process pool.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.stages = []
+
+    def add_stage(self, name, worker, workers=1):
+        self.stages.append((name, worker, max(1, workers)))
+        return self
+
+    def run(self):
+        """Run every stage to completion and return their StageStats"""
+        queues = [None] + [queue.Queue(maxsize=self.queue_size) for _ in self.stages[1:]] + [None]
+        stats = [StageStats(name, workers) for name, _, workers in self.stages]
+        threads = []
+        for index, (name, worker, workers) in enumerate(self.stages):
+            remaining = [workers]
+            lock = threading.Lock()
+            for n in range(workers):
+                thread = threading.Thread(
+                    target=self._run_worker,
+                    args=(worker, queues[index], queues[index + 1], stats[index], remaining, lock,
+                          self.stages[index + 1][2] if index + 1 < len(self.stages) else 0),
+                    name=f"{name}-{n + 1}",
+                    daemon=True
+                )
+                threads.append(thread)
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.log_summary(stats, time.perf_counter() - start)
+        return stats
+
+    @staticmethod
+    def _run_worker(worker, input_queue, output_queue, stats, remaining, lock, downstream_workers):
+        inputs = StageInput(input_queue, stats)
+
+        def emit(item):
+            stats.add(items_out=1)
+            if output_queue is None:
+                return
+            start = time.perf_counter()
+            output_queue.put(item)
+            stats.add(wait_output_seconds=time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            worker(inputs, emit)
+        except Exception as e:
+            logging.error(f"Pipeline worker {threading.current_thread().name} failed: {e}", exc_info=True)
+            stats.add(failed_workers=1)
+        finally:
+            # Keep consuming so the upstream never blocks on a queue nobody reads
+            for _ in inputs:
+                pass
+            stats.add(wall_seconds=time.perf_counter() - start)
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and output_queue is not None:
+                for _ in range(downstream_workers):
+                    output_queue.put(_END)
+
+    @staticmethod
+    def log_summary(stats, elapsed):
+        logging.info("=== Pipeline summary ===")
+        for stage in stats:
+            logging.info(
+                f"{stage.name:<8} workers={stage.workers} in={stage.items_in} out={stage.items_out} "
+                f"busy={stage.busy_seconds / stage.workers:.1f}s/worker "
+                f"waiting input={stage.wait_input_seconds:.1f}s output={stage.wait_output_seconds:.1f}s"
+                + (f" FAILED workers={stage.failed_workers}" if stage.failed_workers else "")
+            )
+        logging.info(f"Pipeline wall time: {elapsed:.1f}s")
+
+
+def run_pipeline():
+    """
+    Run Phases 1-4 overlapped instead of one after another.
+
+    ingest (Phase 1) passes each page's mapping to text (Phase 2) as soon
+    as its images are downloaded; text passes the article ids of every
+    committed batch to faces (Phase 4), which detects and matches the faces
+    in just those articles' images. Phase 3 enrollment runs alongside the
+    ingest, and the face stage starts matching once it has finished.
+    """
+    from src.phases.phase4 import print_face_statistics
+    from src.services.face_service import FaceService
+
+    logging.info("=== Starting pipelined run ===")
+    # Forking a process while stage threads hold locks copies them locked,
+    # so every pool started during the run (enrollment, parallel WARC scan,
+    # HTML cleaning, face detection, spaCy n_process) uses spawn instead
+    start_method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method("spawn", force=True)
+    try:
+        _run_stages()
+    finally:
+        multiprocessing.set_start_method(start_method, force=True)
+
+    # Images no batch reached: left over from earlier runs, or dropped by a failed worker
+    service = FaceService()
+    service.process_all_images()
+    print_face_statistics(service)
+    logging.info("=== Pipelined run complete ===")
+
+
+def _run_stages():
+    from src.phases.phase3 import run_phase3
+    from src.services.warc_service import WARCService
+    from src.services.text_service import TextService
+    from src.services.face_service import FaceService
+
+    enrollment = threading.Thread(target=run_phase3, name="enroll", daemon=True)
+    enrollment.start()
+
+    shared = {}
+    shared_lock = threading.Lock()
+
+    with ExitStack() as stack:
+        def detection_pool(service):
+            """One detection process pool for all face workers, built once the gallery is final"""
+            with shared_lock:
+                if "pool" not in shared:
+                    shared["pool"] = None
+                    if settings.FACE_DETECT_WORKERS > 1:
+                        shared["pool"] = stack.enter_context(service.detection_pool())
+                    else:
+                        service.processor.matcher  # load the gallery once, not once per thread
+                return shared["pool"]
+
+        def ingest(inputs, emit):
+            WARCService(on_mapping=emit).process_warc_files()
+
+        def text(inputs, emit):
+            TextService().process_html_files(mapping_source=inputs.iter, on_batch_stored=emit)
+
+        def faces(inputs, emit):
+            service = FaceService()
+            enrollment.join()
+            executor = detection_pool(service)
+            for article_ids in inputs:
+                images = service.db.get_unprocessed_images(article_ids)
+                service.process_all_images(images, executor=executor)
+                emit(len(images))
+
+        # Without a detection pool every face thread shares one dlib lock, so a
+        # second thread would only wait on it while counting as busy
+        face_workers = settings.PIPELINE_FACE_WORKERS if settings.FACE_DETECT_WORKERS > 1 else 1
+
+        Pipeline() \
+            .add_stage("ingest", ingest) \
+            .add_stage("text", text, settings.PIPELINE_TEXT_WORKERS) \
+            .add_stage("faces", faces, face_workers) \
+            .run()
+
+    enrollment.join()
@@ -1,38 +1,134 @@
 # services/face_service.py
+import io
 import os
 import zipfile
 import logging
 import json
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict
+import numpy as np
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.face_processing import FaceProcessor
+from src.face_processing import FaceProcessor, detector_version
+from src.data_access.blob_store import BlobStore
+from src.image_triage import triage_image
+from src.face_matching import (
+    FaceMatcher, compact_gallery, evaluate_compaction, save_gallery_snapshot, load_gallery_snapshot
+)
 from src.data_access.database import DatabaseManager
+from src.face_index import FaceIndexStore
+from src.model_registry import registry
 from config import settings
 
+
+# Per-process detector used by the Phase 4 worker pool
+_worker_processor = None
+
+
+def _init_detection_worker(snapshot_dir):
+    """Build the worker's FaceProcessor on the mmap'd gallery snapshot, once per process"""
+    global _worker_processor
+    _worker_processor = FaceProcessor(matcher=load_gallery_snapshot(snapshot_dir))
+
+
+def _detect_and_match(processor, image_path):
+    """Return (detection, matches): FaceProcessor.detect_faces output and FaceMatcher.match results"""
+    detection = processor.detect_faces(image_path)
+    if detection is None:
+        return None, []
+    return detection, processor.matcher.match(detection[1])
+
+
+def _detect_chunk(jobs):
+    """Run detection and matching for a chunk of (image_id, image_path, content_hash) jobs"""
+    return [(job,) + _detect_and_match(_worker_processor, job[1]) for job in jobs]
+
+
+# LFW image refs inside a zip are "<zip path>!/<member name>"
+ZIP_MEMBER_SEPARATOR = "!/"
+_zip_files = {}
+
+
+def _read_lfw_image(ref):
+    """Return the bytes of an LFW image ref: a file path, or a member of the zip"""
+    if ZIP_MEMBER_SEPARATOR not in ref:
+        with open(ref, "rb") as f:
+            return f.read()
+    zip_path, member = ref.split(ZIP_MEMBER_SEPARATOR, 1)
+    # One handle per process: a ZipFile inherited across fork shares its file offset
+    key = (os.getpid(), zip_path)
+    if key not in _zip_files:
+        _zip_files[key] = zipfile.ZipFile(zip_path)
+    return _zip_files[key].read(member)
+
+
+def _source_key(ref):
+    """
+    Identity of an LFW image independent of where the dataset lives: its
+    person directory and file name, the same for a zip member and an
+    extracted copy
+    """
+    path = ref.split(ZIP_MEMBER_SEPARATOR, 1)[-1].replace(os.sep, "/")
+    return "/".join(path.split("/")[-2:])
+
+
+def _fingerprint_lfw_images(refs):
+    """Return {ref: (mtime, size_bytes)} from file stats or the zip directory, without reading any image"""
+    fingerprints = {}
+    zips = {}
+    try:
+        for ref in refs:
+            if ZIP_MEMBER_SEPARATOR in ref:
+                zip_path, member = ref.split(ZIP_MEMBER_SEPARATOR, 1)
+                if zip_path not in zips:
+                    zips[zip_path] = zipfile.ZipFile(zip_path)
+                info = zips[zip_path].getinfo(member)
+                fingerprints[ref] = (time.mktime(info.date_time + (0, 0, -1)), info.file_size)
+            else:
+                stat = os.stat(ref)
+                fingerprints[ref] = (stat.st_mtime, stat.st_size)
+    finally:
+        for zip_ref in zips.values():
+            zip_ref.close()
+    return fingerprints
+
+
+def _encode_images(processor, refs):
+    """Return [(ref, encoding or None, content_hash)] for a person's images"""
+    results = []
+    for ref in refs:
+        content = _read_lfw_image(ref)
+        results.append((ref, processor.get_face_encoding(io.BytesIO(content)), BlobStore.content_hash(content)))
+    return results
+
+
+def _init_enrollment_worker():
+    """Enrollment workers only encode, so they get an empty gallery instead of loading the database"""
+    global _worker_processor
+    _worker_processor = FaceProcessor(matcher=FaceMatcher(np.empty((0, 128), dtype=np.float32), []))
+
+
+def _encode_person(person, refs):
+    return person, _encode_images(_worker_processor, refs)
+
+
 class FaceService:
     def __init__(self):
-        self.processor = FaceProcessor()
+        self.processor = registry.get("face_processor", required=True)
         self.db = DatabaseManager()
 
-    # Extract any LFW zip found in datasets dir if not yet extr
-    def _extract_lfw_zip_if_needed(self):
-
-        if os.path.exists(settings.LFW_DATASET_PATH) and any(os.scandir(settings.LFW_DATASET_PATH)):
-            logging.info("LFW dataset already extracted.")
-            return
-
+    # Returns the first LFW zip in the datasets dir, or None
+    def _find_lfw_zip(self):
         datasets_dir = os.path.dirname(settings.LFW_DATASET_PATH)
-        for file in os.listdir(datasets_dir):
+        for file in sorted(os.listdir(datasets_dir)):
             if file.lower().endswith(".zip"):
-                zip_path = os.path.join(datasets_dir, file)
-                logging.info(f"Extracting LFW dataset from {zip_path} ...")
-                with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                    zip_ref.extractall(settings.LFW_DATASET_PATH)
-                logging.info("LFW dataset extraction complete.")
-                return
+                return os.path.join(datasets_dir, file)
+        return None
 
     # Returns the folder that contains the person subdirectories.
     def _find_people_root(self):
@@ -49,76 +145,226 @@ class FaceService:
 
         return root
 
-    def enroll_faces(self):
-        logging.info("=== Phase 3: Enrolling faces from LFW dataset ===")
+    def _list_lfw_images(self):
+        """
+        Map each LFW person directory name to its image refs.
+
+        An extracted dataset is walked on disk; otherwise the images are read
+        straight out of the zip, so the archive never has to be extracted.
+        """
+        people_images = {}
+        if os.path.exists(settings.LFW_DATASET_PATH) and any(os.scandir(settings.LFW_DATASET_PATH)):
+            people_root = self._find_people_root()
+            for person in os.listdir(people_root):
+                person_dir = os.path.join(people_root, person)
+                if not os.path.isdir(person_dir):
+                    continue
+                people_images[person] = sorted(
+                    os.path.join(root, file)
+                    for root, _, files in os.walk(person_dir)
+                    for file in files
+                    if file.lower().endswith((".jpg", ".jpeg", ".png"))
+                )
+            return people_images
 
-        self._extract_lfw_zip_if_needed()
+        zip_path = self._find_lfw_zip()
+        if zip_path is None:
+            return people_images
+        logging.info(f"Reading LFW dataset directly from {zip_path}")
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            for member in zip_ref.namelist():
+                parts = member.split("/")
+                if len(parts) >= 2 and member.lower().endswith((".jpg", ".jpeg", ".png")):
+                    people_images.setdefault(parts[-2], []).append(zip_path + ZIP_MEMBER_SEPARATOR + member)
+        for refs in people_images.values():
+            refs.sort()
+        return people_images
+
+    def _encode_people(self, people, people_images):
+        """
+        Yield (person, [(ref, encoding or None)]) for each person.
 
-        people_root = self._find_people_root()
-        if not os.path.exists(people_root):
-            logging.error("LFW dataset not found after extraction.")
+        With FACE_ENROLL_WORKERS > 1 each person's directory is encoded in a
+        process pool; results arrive in completion order.
+        """
+        workers = settings.FACE_ENROLL_WORKERS
+        if workers <= 1 or len(people) <= 1:
+            for person in people:
+                yield person, _encode_images(self.processor, people_images[person])
             return
 
-        people = sorted([
-            d for d in os.listdir(people_root)
-            if os.path.isdir(os.path.join(people_root, d))
-        ])[:settings.MAX_PEOPLE]
+        logging.info(f"Encoding {len(people)} people with {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_enrollment_worker) as executor:
+            futures = [executor.submit(_encode_person, person, people_images[person]) for person in people]
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logging.error(f"Enrollment worker failed: {e}")
+
+    def enroll_faces(self):
+        """
+        Enroll LFW people, encoding only source images that are new or changed.
+
+        Every enrolled image is recorded in the enrollment manifest under its
+        source key (person/file, so reading the zip or an extracted copy
+        makes no difference) with its content hash, mtime and size. A re-run
+        compares the dataset with the manifest: images with the same mtime
+        and size are skipped, images whose stats changed but whose content
+        hash did not only have their manifest entry refreshed, changed images
+        replace their old encoding, and images that disappeared from the
+        dataset have their encodings deleted.
+        """
+        logging.info("=== Phase 3: Enrolling faces from LFW dataset ===")
+
+        people_images = self._list_lfw_images()
+        if not people_images:
+            logging.error("LFW dataset not found.")
+            return
 
+        people = sorted(people_images)[:settings.MAX_PEOPLE]
         logging.info(f"Found {len(people)} people in LFW dataset.")
 
-        enrolled_count = 0
-        failed_count = 0
+        manifest = self.db.get_enrollment_manifest()
+        # Manifests written before source keys recorded full paths
+        legacy_refs = {ref: _source_key(ref) for ref in manifest if _source_key(ref) != ref}
+        if legacy_refs and self.db.rename_enrollment_sources(legacy_refs):
+            manifest = self.db.get_enrollment_manifest()
+        all_keys = {_source_key(ref) for refs in people_images.values() for ref in refs}
+        removed_keys = [key for key in manifest if key not in all_keys]
+
+        # Encodings from before the manifest cannot be matched to their source images
+        legacy_names = self.db.get_unmanifested_names() & {p.replace("_", " ") for p in people}
+        if legacy_names:
+            logging.info(f"Re-enrolling {len(legacy_names)} people enrolled before the manifest existed.")
+            self.db.delete_unmanifested_encodings(legacy_names)
 
+        fingerprints = _fingerprint_lfw_images(ref for person in people for ref in people_images[person])
+        pending_images = {}
+        changed_keys = []
+        touched = []
         for person in people:
-            person_dir = os.path.join(people_root, person)
-            image_files = []
-            for root, _, files in os.walk(person_dir):
-                for file in files:
-                    if file.lower().endswith((".jpg", ".jpeg", ".png")):
-                        image_files.append(os.path.join(root, file))
-
-            if not image_files:
+            if not people_images[person]:
                 logging.warning(f"No images found for {person}")
-                continue
-
-            person_encodings = []
-            for img_path in image_files:
-                encoding = self.processor.get_face_encoding(img_path)
-                if encoding is not None:
-                    #  to ens Store one encoding at a time
-                    self.db.insert_face_encoding(person.replace("_", " "), encoding)
-                    person_encodings.append(encoding)
-
-            if person_encodings:
-                enrolled_count += 1
-                logging.info(f"✓ Enrolled {person} with {len(person_encodings)} encodings")
-            else:
-                failed_count += 1
-                logging.warning(f"✗ No valid encodings found for {person}")
+            for ref in people_images[person]:
+                key = _source_key(ref)
+                previous = manifest.get(key)
+                if previous is not None and previous[1:3] == fingerprints[ref]:
+                    continue
+                if previous is not None:
+                    # New stats do not mean new pixels (touched files, zip vs extracted copy)
+                    content_hash = BlobStore.content_hash(_read_lfw_image(ref))
+                    if content_hash == previous[0]:
+                        touched.append((key, person, content_hash, fingerprints[ref], previous[3]))
+                        continue
+                    changed_keys.append(key)
+                pending_images.setdefault(person, []).append(ref)
+
+        logging.info(
+            f"{sum(len(refs) for refs in pending_images.values())} new or changed images, "
+            f"{len(touched)} unchanged with new file stats, {len(removed_keys)} removed."
+        )
+
+        enrolled_count = 0
+        failed_count = 0
+
+        # Encodings are queued and committed in batches rather than one transaction each
+        with self.db.bulk_writer() as writer:
+            # Old encodings go first so a replaced image never briefly has two
+            for key in removed_keys + changed_keys:
+                writer.remove_enrollment(key)
+            for key, person, content_hash, (mtime, size_bytes), encoded in touched:
+                writer.record_enrollment(key, person.replace("_", " "), content_hash, mtime, size_bytes, encoded)
+            writer.flush()
+
+            for person, results in self._encode_people(list(pending_images), pending_images):
+                name = person.replace("_", " ")
+                person_encodings = 0
+                for ref, encoding, content_hash in results:
+                    key = _source_key(ref)
+                    if encoding is not None:
+                        writer.insert_face_encoding(name, encoding, {"face_image_path": key})
+                        person_encodings += 1
+                    mtime, size_bytes = fingerprints[ref]
+                    writer.record_enrollment(key, name, content_hash, mtime, size_bytes, encoding is not None)
+
+                if person_encodings:
+                    enrolled_count += 1
+                    logging.info(f"✓ Enrolled {person} with {person_encodings} encodings")
+                else:
+                    failed_count += 1
+                    logging.warning(f"✗ No valid encodings found for {person}")
+
+        if removed_keys or changed_keys or legacy_names:
+            # Deleted rows cannot be removed from the approximate index or the prototypes in place
+            FaceIndexStore(self.db.db_path).invalidate()
+            self.db.replace_face_prototypes([])
+        if enrolled_count or removed_keys or changed_keys or legacy_names:
+            self.processor.reset_gallery()
 
         logging.info("=" * 50)
         logging.info(f"Enrollment complete: {enrolled_count} people enrolled, {failed_count} failed.")
         logging.info("=" * 50)
 
-    def process_image_faces(self, image_path: str, image_id: int) -> bool:
+    def compact_gallery(self) -> Dict:
+        """
+        Rebuild the per-person centroid/prototype gallery from known_faces.
+
+        Returns:
+            Recall report comparing the compacted gallery with the full one
+        """
+        logging.info("=== Compacting face gallery ===")
+        face_ids, names, encodings = self.db.load_gallery()
+        if len(names) == 0:
+            logging.warning("No known faces to compact.")
+            return {}
+
+        prototypes = compact_gallery(face_ids, names, encodings)
+        if not self.db.replace_face_prototypes(prototypes):
+            return {}
+        self.processor.reset_gallery()
+
+        compact_matcher = FaceMatcher(
+            [p["encoding"] for p in prototypes],
+            [p["name"] for p in prototypes],
+            [p["face_id"] for p in prototypes],
+            thresholds=[p["threshold"] for p in prototypes]
+        )
+        report = evaluate_compaction(names, encodings, compact_matcher)
+        logging.info(
+            f"Compacted {report['gallery_size']} encodings into {report['compact_size']} prototypes "
+            f"for {len(set(names))} people"
+        )
+        logging.info(
+            f"Recall on {report['sample']} sampled faces: full {report['full_recall']:.3f}, "
+            f"compact {report['compact_recall']:.3f}, agreement {report['agreement']:.3f}"
+        )
+        return report
+
+    def process_image_faces(self, image_path: str, image_id: int, known_result=None, writer=None) -> bool:
         """
         Process an image to detect and recognize faces, then store results in database
         
         Args:
             image_path: Path to the image file
             image_id: Database ID of the image record
+            known_result: Precomputed (face_count, detected_faces), stored instead of detecting again
+            writer: Optional BulkWriter to batch the update instead of committing it directly
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            logging.info(f"Processing faces in image: {image_path}")
-            
-            # Detect and recognize faces
-            face_count, detected_faces = self.processor.detect_and_recognize_faces(image_path)
+            if known_result is not None:
+                face_count, detected_faces = known_result
+            else:
+                logging.info(f"Processing faces in image: {image_path}")
+                
+                # Detect and recognize faces
+                face_count, detected_faces = self.processor.detect_and_recognize_faces(image_path)
             
             # Update database with results
-            success = self.db.update_image_face_detection(image_id, face_count, detected_faces)
+            success = (writer or self.db).update_image_face_detection(image_id, face_count, detected_faces)
             
             if success:
                 logging.info(f"✓ Processed image {image_id}: {face_count} faces detected")
@@ -134,24 +380,20 @@ class FaceService:
             logging.error(f"Error processing faces in image {image_path}: {e}")
             return False
 
-    def process_all_images(self):
+    def process_all_images(self, images=None, executor=None):
         """
         Process all images in the database for face detection and recognition
+
+        Args:
+            images: Optional (id, image_path, content_hash) rows to process
+                instead of every unprocessed image, e.g. one pipeline batch
+            executor: Optional detection_pool() executor shared across calls
         """
         logging.info("=== Processing all images for face detection ===")
         
         try:
-            conn = self.db._connect()
-            cursor = conn.cursor()
-            
-            # Get all images that haven't been processed yet (face_count = 0)
-            cursor.execute('''
-                SELECT id, image_path FROM images 
-                WHERE face_count = 0 OR face_count IS NULL
-            ''')
-            
-            unprocessed_images = cursor.fetchall()
-            conn.close()
+            # Images never run through detection (processed_date IS NULL) and not rejected by triage
+            unprocessed_images = self.db.get_unprocessed_images() if images is None else images
             
             if not unprocessed_images:
                 logging.info("No unprocessed images found.")
@@ -161,70 +403,226 @@ class FaceService:
             
             processed_count = 0
             failed_count = 0
+            skipped_count = 0
             
-            for image_id, image_path in unprocessed_images:
-                if os.path.exists(image_path):
-                    if self.process_image_faces(image_path, image_id):
-                        processed_count += 1
-                    else:
+            # Images are grouped by content so each distinct image is detected once
+            groups_by_hash = {}
+            
+            with self.db.bulk_writer() as writer:
+                for image_id, image_path, content_hash in unprocessed_images:
+                    if not os.path.exists(image_path):
+                        logging.warning(f"Image file not found: {image_path}")
                         failed_count += 1
-                else:
-                    logging.warning(f"Image file not found: {image_path}")
-                    failed_count += 1
+                        continue
+                    # Logos, pixels, icons and sprites never reach the HOG/CNN detector
+                    skip_reason = triage_image(image_path)
+                    if skip_reason:
+                        writer.mark_image_skipped(image_id, skip_reason)
+                        skipped_count += 1
+                        continue
+                    if not content_hash:
+                        # Images stored before content addressing
+                        with open(image_path, "rb") as f:
+                            content_hash = BlobStore.content_hash(f.read())
+                    groups_by_hash.setdefault(content_hash, []).append((image_id, image_path))
+                
+                # Cached boxes and encodings only need matching against the current gallery
+                version = detector_version()
+                cached = self.db.get_cached_detections(groups_by_hash.keys(), version)
+                logging.info(f"{len(cached)} of {len(groups_by_hash)} distinct images found in the detection cache.")
+                
+                to_detect = []
+                for content_hash, group in groups_by_hash.items():
+                    if content_hash in cached:
+                        face_locations, encodings = cached[content_hash]
+                        matches = self.processor.matcher.match(encodings)
+                        ok, failed = self._store_faces(group, face_locations, encodings, matches, writer)
+                        processed_count += ok
+                        failed_count += failed
+                    else:
+                        image_id, image_path = group[0]
+                        to_detect.append((image_id, image_path, content_hash))
+                
+                for (_, _, content_hash), detection, matches in self._detect_images(to_detect, executor):
+                    group = groups_by_hash[content_hash]
+                    if len(group) > 1:
+                        logging.info(f"Reusing face detection result for {len(group) - 1} duplicate image(s)")
+                    if detection is not None:
+                        face_locations, encodings = detection
+                        writer.cache_detection(content_hash, version, face_locations, encodings)
+                    else:
+                        face_locations, encodings = [], []
+                    ok, failed = self._store_faces(group, face_locations, encodings, matches, writer)
+                    processed_count += ok
+                    failed_count += failed
             
             logging.info("=" * 50)
-            logging.info(f"Face processing complete: {processed_count} processed, {failed_count} failed.")
+            logging.info(
+                f"Face processing complete: {processed_count} processed, {skipped_count} skipped, "
+                f"{failed_count} failed."
+            )
             logging.info("=" * 50)
             
         except Exception as e:
             logging.error(f"Error processing all images: {e}")
 
+    def _store_faces(self, group, face_locations, encodings, matches, writer):
+        """
+        Write one detection result to every image in a group of identical images.
+
+        The per-face boxes and encodings go to detected_faces so the faces
+        can be re-identified later without detecting them again.
+
+        Returns:
+            Tuple of (processed_count, failed_count)
+        """
+        result = (len(face_locations), FaceProcessor.format_matches(matches))
+        processed, failed = 0, 0
+        for image_id, image_path in group:
+            if self.process_image_faces(image_path, image_id, result, writer):
+                writer.replace_detected_faces(image_id, face_locations, encodings, matches)
+                processed += 1
+            else:
+                failed += 1
+        return processed, failed
+
+    def reidentify_faces(self, batch_size=settings.FACE_REIDENTIFY_BATCH_SIZE):
+        """
+        Re-match every stored face against the current gallery without detecting again.
+
+        Run after enrolling new people: stored encodings are read from
+        detected_faces in batches, matched in one matrix step per batch, and
+        only images whose names or confidences changed are rewritten.
+
+        Returns:
+            Number of images whose detected_faces changed
+        """
+        logging.info("=== Re-identifying stored faces against the current gallery ===")
+        self.processor.load_known_faces()
+
+        changed_images = set()
+        faces_seen = 0
+        with self.db.bulk_writer() as writer:
+            for row_ids, image_ids, encodings, old_names, old_confidences in self.db.iter_detected_faces(batch_size):
+                matches = self.processor.matcher.match(encodings)
+                for row_id, image_id, old_name, old_confidence, (name, confidence, face_id) in zip(
+                    row_ids, image_ids, old_names, old_confidences, matches
+                ):
+                    if name != old_name or round(confidence, 3) != old_confidence:
+                        writer.update_detected_face_match(row_id, name, confidence, face_id)
+                        changed_images.add(image_id)
+                faces_seen += len(row_ids)
+                logging.info(f"Re-matched {faces_seen} faces, {len(changed_images)} images changed so far")
+            writer.flush()
+
+            # Rebuild the per-image JSON summary from the updated rows
+            for image_id, faces in self.db.get_detected_faces(changed_images).items():
+                writer.update_image_face_detection(image_id, len(faces), faces)
+
+        logging.info(f"Re-identification complete: {faces_seen} faces, {len(changed_images)} images updated.")
+        return len(changed_images)
+
+    @contextmanager
+    def detection_pool(self, workers=None, mp_context=None):
+        """
+        Process pool whose workers load the current gallery once from an
+        mmap'd snapshot. Keep it open to reuse it across process_all_images calls.
+        """
+        workers = workers or settings.FACE_DETECT_WORKERS
+        snapshot_root = os.path.dirname(self.db.db_path) or None
+        with tempfile.TemporaryDirectory(prefix="gallery-", dir=snapshot_root) as snapshot_dir:
+            save_gallery_snapshot(self.processor.matcher, snapshot_dir)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=mp_context,
+                initializer=_init_detection_worker,
+                initargs=(snapshot_dir,)
+            ) as executor:
+                yield executor
+
+    def _detect_images(self, jobs, executor=None):
+        """
+        Yield (job, detection, matches) for each (image_id, image_path, content_hash) job.
+
+        With FACE_DETECT_WORKERS > 1 (or a detection_pool executor) the jobs
+        are split into chunks of FACE_DETECT_CHUNK_SIZE and run in a process
+        pool. Results come back here so the caller's single BulkWriter does
+        all the database writes.
+        """
+        if not jobs:
+            return
+        workers = settings.FACE_DETECT_WORKERS
+        chunk_size = max(1, settings.FACE_DETECT_CHUNK_SIZE)
+        if executor is None and (workers <= 1 or len(jobs) <= chunk_size):
+            for job in jobs:
+                logging.info(f"Processing faces in image: {job[1]}")
+                yield (job,) + _detect_and_match(self.processor, job[1])
+            return
+
+        if executor is None:
+            with self.detection_pool(workers) as executor:
+                yield from self._detect_images(jobs, executor)
+            return
+
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        logging.info(f"Detecting faces in {len(jobs)} images in the worker pool")
+        futures = [executor.submit(_detect_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            try:
+                yield from future.result()
+            except Exception as e:
+                logging.error(f"Face detection worker failed: {e}")
+
     def get_face_statistics(self) -> Dict:
         """
         Get statistics about face detection results
         """
         try:
-            conn = self.db._connect()
-            cursor = conn.cursor()
+            with self.db._checkout() as conn:
+                cursor = conn.cursor()
             
-            # Total images
-            cursor.execute('SELECT COUNT(*) FROM images')
-            total_images = cursor.fetchone()[0]
+                # Total images
+                cursor.execute('SELECT COUNT(*) FROM images')
+                total_images = cursor.fetchone()[0]
             
-            # Images with faces
-            cursor.execute('SELECT COUNT(*) FROM images WHERE face_count > 0')
-            images_with_faces = cursor.fetchone()[0]
+                # Images with faces
+                cursor.execute('SELECT COUNT(*) FROM images WHERE face_count > 0')
+                images_with_faces = cursor.fetchone()[0]
             
-            # Total faces detected
-            cursor.execute('SELECT SUM(face_count) FROM images WHERE face_count > 0')
-            total_faces = cursor.fetchone()[0] or 0
+                # Images rejected before detection
+                cursor.execute('SELECT COUNT(*) FROM images WHERE skip_reason IS NOT NULL')
+                images_skipped = cursor.fetchone()[0]
             
-            # Known vs unknown faces
-            cursor.execute('''
-                SELECT detected_faces FROM images 
-                WHERE face_count > 0 AND detected_faces IS NOT NULL
-            ''')
-            all_detected_faces = cursor.fetchall()
+                # Total faces detected
+                cursor.execute('SELECT SUM(face_count) FROM images WHERE face_count > 0')
+                total_faces = cursor.fetchone()[0] or 0
             
-            known_faces = 0
-            unknown_faces = 0
+                # Known vs unknown faces
+                cursor.execute('''
+                    SELECT detected_faces FROM images 
+                    WHERE face_count > 0 AND detected_faces IS NOT NULL
+                ''')
+                all_detected_faces = cursor.fetchall()
             
-            for (detected_faces_str,) in all_detected_faces:
-                try:
-                    detected_faces = json.loads(detected_faces_str)
-                    for face in detected_faces:
-                        if face['name'] == 'unknown':
-                            unknown_faces += 1
-                        else:
-                            known_faces += 1
-                except:
-                    continue
+                known_faces = 0
+                unknown_faces = 0
+            
+                for (detected_faces_str,) in all_detected_faces:
+                    try:
+                        detected_faces = json.loads(detected_faces_str)
+                        for face in detected_faces:
+                            if face['name'] == 'unknown':
+                                unknown_faces += 1
+                            else:
+                                known_faces += 1
+                    except:
+                        continue
             
-            conn.close()
             
             return {
                 'total_images': total_images,
                 'images_with_faces': images_with_faces,
+                'images_skipped': images_skipped,
                 'total_faces_detected': total_faces,
                 'known_faces_recognized': known_faces,
                 'unknown_faces': unknown_faces
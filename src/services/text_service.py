@@ -1,11 +1,13 @@
 import os
-import json
 import logging
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.text_processing import TextMetadataExtractor
+from src.warc_processing import source_domain
 from src.data_access.database import DatabaseManager
+from src.data_access.blob_store import BlobStore
+from src.data_access.file_manager import FileManager
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -15,46 +17,137 @@ class TextService:
     def __init__(self):
         self.extractor = TextMetadataExtractor()
         self.db = DatabaseManager()
+        self.file_manager = FileManager()
 
-    def process_html_files(self):
-        logging.info("=== Starting Phase 2: Text metadata extraction ===")
-        mappings_file = os.path.join(settings.EXTRACTED_DATA_PATH, "mappings.json")
+    def process_html_files(self, follow=None, mapping_source=None, on_batch_stored=None):
+        """
+        Run Phase 2 over the pages Phase 1 recorded.
 
-        if not os.path.exists(mappings_file):
-            logging.error("No mappings.json found. Run Phase 1 first.")
-            return
+        Mappings are streamed one line at a time. With follow=True (default
+        TEXT_FOLLOW_MAPPINGS) the stream is tailed while Phase 1 is still
+        writing it, and the pending batch is stored whenever Phase 2 catches
+        up, so no page waits for a full batch.
 
-        with open(mappings_file, "r", encoding="utf-8") as f:
-            mappings = json.load(f)
+        Args:
+            follow: Tail mappings.jsonl instead of stopping at its end
+            mapping_source: Optional callable(on_idle) returning the mappings
+                to process instead of reading mappings.jsonl (pipeline mode)
+            on_batch_stored: Optional callable receiving the article ids of
+                each batch once it is committed
+        """
+        logging.info("=== Starting Phase 2: Text metadata extraction ===")
+        follow = settings.TEXT_FOLLOW_MAPPINGS if follow is None else follow
 
-        logging.info(f"Processing {len(mappings)} HTML files from mappings.json")
-        processed = 0
+        if mapping_source is None:
+            if not follow and not self.file_manager.has_mappings():
+                logging.error("No mappings found. Run Phase 1 first.")
+                return
+            mapping_source = lambda on_idle: self.file_manager.iter_mappings(follow, on_idle=on_idle)
 
-        for idx, mapping in enumerate(mappings, start=1):
-            html_path = os.path.join(settings.BASE_DATA_PATH, mapping.get("html_path", ""))
-            if not os.path.exists(html_path):
-                logging.warning(f"[{idx}] HTML file not found: {html_path}")
-                continue
+        processed = 0
+        batch = []
 
-            try:
-                with open(html_path, "rb") as fh:
-                    html_content = fh.read()
-            except Exception as e:
-                logging.warning(f"[{idx}] Error reading HTML file {html_path}: {e}")
-                continue
+        # One connection and one committed transaction per batch instead of a commit
+        # per row; batches are committed before the next one goes through the NLP models
+        with self.db.bulk_writer(autoflush=False) as writer:
+            def store_pending():
+                nonlocal processed
+                if not batch:
+                    return
+                article_ids = self._store_batch(batch, writer)
+                batch.clear()
+                processed += len(article_ids)
+                if on_batch_stored is not None:
+                    on_batch_stored(article_ids)
 
-            meta = {"target_uri": mapping.get("url") or mapping.get("target_uri")}
-            article_data = self.extractor.process_text_metadata(html_content, meta)
+            for idx, mapping in enumerate(mapping_source(store_pending), start=1):
+                html_path = os.path.join(settings.BASE_DATA_PATH, mapping.get("html_path", ""))
+                html_content = None
+                if not mapping.get("page"):
+                    # Mappings from older Phase 1 runs carry no extracted text: parse the HTML here
+                    if not os.path.exists(html_path):
+                        logging.warning(f"[{idx}] HTML file not found: {html_path}")
+                        continue
 
-            article_id = self.db.insert_article(article_data)
-            if article_id:
-                for img_rel in mapping.get("images", []):
-                    img_full = os.path.join(settings.BASE_DATA_PATH, img_rel)
-                    self.db.insert_image(article_id, img_full)
+                    try:
+                        with open(html_path, "rb") as fh:
+                            html_content = fh.read()
+                    except Exception as e:
+                        logging.warning(f"[{idx}] Error reading HTML file {html_path}: {e}")
+                        continue
 
-                processed += 1
-                logging.info(f"[{idx}] Stored article_id={article_id} title={article_data['title'][:80]} images={len(mapping.get('images', []))}")
-            else:
-                logging.error(f"[{idx}] Failed to store article for {meta.get('target_uri')}")
+                # Pages are queued so the NLP models see a whole batch at once
+                batch.append((idx, mapping, html_path, html_content))
+                if len(batch) >= settings.TEXT_BATCH_SIZE:
+                    store_pending()
+            store_pending()
+        self.extractor.close()
 
         logging.info(f"=== Phase 2 complete: {processed} articles processed ===")
+
+    def _store_batch(self, batch, writer):
+        """
+        Extract metadata for a batch of (idx, mapping, html_path, html_content) and commit it.
+
+        Pages Phase 1 already extracted (mapping["page"]) skip cleaning; the
+        rest have their HTML in html_content and are cleaned here. If the
+        batch fails to commit it is rolled back and its articles are retried
+        one at a time, so a single bad row only loses itself.
+
+        Returns:
+            List of the committed article ids
+        """
+        metas = [{"target_uri": mapping.get("url") or mapping.get("target_uri")} for _, mapping, _, _ in batch]
+        raw_pages = [html_content for _, mapping, _, html_content in batch if not mapping.get("page")]
+        cleaned_raw = iter(self.extractor.clean_html_batch(raw_pages) if raw_pages else [])
+        pages = [mapping.get("page") or next(cleaned_raw) for _, mapping, _, _ in batch]
+        articles = self.extractor.analyze_pages(pages, metas)
+
+        rows = []
+        for (idx, mapping, html_path, _), meta, page, article_data in zip(batch, metas, pages, articles):
+            article_data["content_hash"] = BlobStore.hash_from_path(html_path)
+            article_data["html_path"] = html_path
+            for key in ("publication_date", "author"):
+                article_data[key] = page.get(key)
+            article_data["source_domain"] = page.get("source_domain") or source_domain(meta["target_uri"])
+            rows.append((idx, mapping, meta["target_uri"], article_data))
+
+        try:
+            stored = self._write_articles(rows, writer)
+        except Exception as e:
+            logging.warning(f"Batch of {len(rows)} articles rolled back ({e}); storing them one at a time")
+            stored = []
+            for row in rows:
+                try:
+                    stored.extend(self._write_articles([row], writer))
+                except Exception as e:
+                    logging.error(f"[{row[0]}] Failed to store article for {row[2]}: {e}")
+
+        # Only now are the ids committed and safe to report
+        for idx, mapping, article_id, article_data in stored:
+            logging.info(f"[{idx}] Stored article_id={article_id} title={article_data['title'][:80]} images={len(mapping.get('images', []))}")
+        return [article_id for _, _, article_id, _ in stored]
+
+    def _write_articles(self, rows, writer):
+        """
+        Insert (idx, mapping, target_uri, article_data) rows with their images and commit.
+
+        Returns:
+            List of (idx, mapping, article_id, article_data) for the stored rows
+
+        Raises:
+            Exception: if the commit failed; nothing from `rows` was kept
+        """
+        stored = []
+        for idx, mapping, target_uri, article_data in rows:
+            article_id = writer.insert_article(article_data)
+            if not article_id:
+                logging.error(f"[{idx}] Failed to store article for {target_uri}")
+                continue
+            image_metadata = mapping.get("image_metadata", {})
+            for img_rel in mapping.get("images", []):
+                img_full = os.path.join(settings.BASE_DATA_PATH, img_rel)
+                writer.insert_image(article_id, img_full, image_metadata.get(img_rel))
+            stored.append((idx, mapping, article_id, article_data))
+        writer.flush()
+        return stored
@@ -1,6 +1,11 @@
 # services/warc_service.py
 import os
 import logging
+import multiprocessing
+import queue
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urlparse
 from warcio.archiveiterator import ArchiveIterator
 from warcio.exceptions import ArchiveLoadFailed
@@ -8,69 +13,294 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.data_access.warc_downloader import WARCDownloader
-from src.warc_processing import extract_image_urls
+from src.data_access.warc_index import WARCIndex
+from src.warc_processing import extract_page
 from src.data_access.file_manager import FileManager
 from config import settings
 
+
+def iter_html_records(stream):
+    """Yield (url, html_content) for every text/html response record in a WARC stream"""
+    for record in ArchiveIterator(stream):
+        if (
+            record.rec_type == "response"
+            and "text/html" in record.http_headers.get_header("Content-Type", "")
+        ):
+            url = record.rec_headers.get_header("WARC-Target-URI")
+            yield url, record.content_stream().read()
+
+
+class WARCUnavailable(Exception):
+    """Raised when a WARC file could not be downloaded"""
+
+
+def open_warc_source(downloader, warc_url, local_file=None, cancel=None):
+    """
+    Open a WARC for reading: the HTTP stream in streaming mode, else the local copy.
+
+    `local_file` is an already downloaded path; without it the file is
+    downloaded first, stopping early if the `cancel` event is set.
+    """
+    if settings.WARC_STREAMING:
+        return downloader.open_warc_stream(warc_url)
+    if local_file is None:
+        local_file = downloader.download_warc_file(warc_url, cancel)
+        if local_file is None:
+            raise WARCUnavailable("download failed")
+    return open(local_file, "rb")
+
+
+def iter_warc_html(downloader, warc_url, local_file=None, cancel=None):
+    """
+    Yield (url, html_content) for the HTML pages of one WARC.
+
+    Local files are read through their sidecar index when WARC_USE_INDEX is
+    set, so only the text/html records (optionally of WARC_DOMAIN_FILTER)
+    are touched. Streams and unindexed files are scanned record by record.
+    """
+    if settings.WARC_USE_INDEX and not settings.WARC_STREAMING:
+        if local_file is None:
+            local_file = downloader.download_warc_file(warc_url, cancel)
+            if local_file is None:
+                raise WARCUnavailable("download failed")
+        yield from WARCIndex().iter_html_records(local_file, domain=settings.WARC_DOMAIN_FILTER)
+        return
+
+    with open_warc_source(downloader, warc_url, local_file, cancel) as stream:
+        yield from iter_html_records(stream)
+
+
+# Set in pool workers by _init_scan_worker: the parent sets the event once it has
+# enough pages and reads page chunks from the queue
+_stop_event = None
+_page_queue = None
+
+
+def _init_scan_worker(stop_event, page_queue):
+    global _stop_event, _page_queue
+    _stop_event = stop_event
+    _page_queue = page_queue
+    # Chunks still buffered when the parent stopped reading are not needed; never block exit on them
+    page_queue.cancel_join_thread()
+
+
+def _send(message):
+    """Put a message on the page queue, giving up once the parent has stopped the scan"""
+    while not _stop_event.is_set():
+        try:
+            _page_queue.put(message, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def scan_warc_file(warc_url, max_pages):
+    """
+    Process pool worker: download one WARC and stream its HTML pages to the parent.
+
+    Pages go back through the bounded page queue as ("pages", warc_url,
+    records) messages of WARC_SCAN_CHUNK_PAGES, followed by ("done",
+    warc_url, count), so the parent stores them while the scan goes on and
+    a full queue pauses the worker. Nothing is written here: the parent
+    saves the HTML of the pages it accepts and downloads their images
+    through its shared session, so pages dropped at MAX_HTML_PAGES leave no
+    files behind. The scan ends early once the parent sets the stop event.
+
+    Returns:
+        Number of pages scanned
+    """
+    downloader = WARCDownloader()
+    chunk = []
+    count = 0
+
+    try:
+        # closing(): stopping early must still let the WARC index finish
+        with closing(iter_warc_html(downloader, warc_url, cancel=_stop_event)) as records:
+            for url, html_content in records:
+                if count >= max_pages or _stop_event.is_set():
+                    break
+                chunk.append({"url": url, "html_content": html_content, "page": extract_page(html_content, url)})
+                count += 1
+                if len(chunk) >= settings.WARC_SCAN_CHUNK_PAGES:
+                    if not _send(("pages", warc_url, chunk)):
+                        return count
+                    chunk = []
+    except ArchiveLoadFailed as e:
+        logging.warning(f"Skipping file {os.path.basename(warc_url)} - not a valid WARC: {e}")
+    except WARCUnavailable as e:
+        logging.warning(f"Skipping {warc_url} - {e}")
+
+    if chunk and not _send(("pages", warc_url, chunk)):
+        return count
+    _send(("done", warc_url, count))
+    return count
+
+
 class WARCService:
-    def __init__(self):
+    def __init__(self, on_mapping=None):
+        """on_mapping: optional callable receiving each mapping once it is written (pipeline mode)"""
+        self.on_mapping = on_mapping
         self.downloader = WARCDownloader()
         self.file_manager = FileManager()
-        self.mappings = []
+        # Pages whose images are still downloading, in the order they were read
+        self._pending_pages = deque()
+        self.page_count = 0
 
     def process_warc_files(self):
+        """
+        Run Phase 1 and return the number of pages stored.
+
+        Each page's mapping is appended to mappings.jsonl as soon as its
+        images are in, so Phase 2 can start on it while later WARC files are
+        still being read.
+        """
         logging.info("=== Starting Phase 1: WARC processing ===")
-        warc_urls = self.downloader.download_and_get_warc_paths()
+        # Before anything slow, so a following Phase 2 does not take the previous run's stream for this one
+        self.file_manager.start_mappings()
+        warc_urls = self.downloader.download_and_get_warc_paths()[:settings.MAX_WARC_FILES]
 
-        html_count = 0
-        warc_count = 0
-        total_warc_files = min(len(warc_urls), settings.MAX_WARC_FILES)
+        if settings.WARC_PROCESS_WORKERS > 1 and len(warc_urls) > 1:
+            self._scan_parallel(warc_urls)
+        else:
+            self._scan_serial(warc_urls)
 
-        for idx, warc_url in enumerate(warc_urls, start=1):
-            if warc_count >= settings.MAX_WARC_FILES:
-                break
+        self._write_ready_mappings(wait=True)
+        self.file_manager.close()
+
+        self.file_manager.finish_mappings()
+        logging.info(f"=== Phase 1 complete: {self.page_count} HTML pages processed ===")
+        return self.page_count
+
+    def _store_page(self, url, html_content, page):
+        """Save an accepted page's HTML, start its image downloads and queue its mapping"""
+        html_filename = os.path.basename(urlparse(url).path) or f"page_{self.page_count}.html"
+        html_path = self.file_manager.save_html(html_content, html_filename)
+        # Images download in the background while the next records are parsed
+        images_future = self.file_manager.download_images_async([image["url"] for image in page["images"]])
+        self._queue_page(url, html_path, page, images_future)
+
+    def _queue_page(self, url, html_path, page, images_future):
+        self._pending_pages.append((url, html_path, page, images_future))
+        self.page_count += 1
+        self._write_ready_mappings()
+
+    def _write_ready_mappings(self, wait=False):
+        """Append the mappings of finished pages, keeping the order pages were read in"""
+        while self._pending_pages and (wait or self._pending_pages[0][3].done()):
+            url, html_path, page, images_future = self._pending_pages.popleft()
+            mapping = self._build_mapping(url, html_path, page, images_future.result())
+            self.file_manager.append_mapping(mapping)
+            if self.on_mapping is not None:
+                self.on_mapping(mapping)
 
-            local_file = self.downloader.download_warc_file(warc_url)
-            warc_count += 1
+    @staticmethod
+    def _build_mapping(url, html_path, page, saved_images):
+        """
+        Mapping entry for one page. The extracted text and metadata travel
+        with it so Phase 2 does not have to read and parse the HTML again.
+        """
+        image_info = {image["url"]: image for image in page["images"]}
+        images, image_metadata = [], {}
+        for image_url, image_path in saved_images:
+            rel_path = os.path.relpath(image_path, start=settings.BASE_DATA_PATH)
+            images.append(rel_path)
+            info = image_info.get(image_url, {})
+            image_metadata[rel_path] = {
+                "url": image_url,
+                "alt_text": info.get("alt_text"),
+                "caption": info.get("caption")
+            }
+        return {
+            "url": url,
+            "html_path": os.path.relpath(html_path, start=settings.BASE_DATA_PATH),
+            "images": images,
+            "image_metadata": image_metadata,
+            "page": {key: value for key, value in page.items() if key != "images"}
+        }
 
-            logging.info(f"[{idx}/{total_warc_files}] Processing WARC file: {os.path.basename(local_file)}")
+    def _scan_serial(self, warc_urls):
+        total_warc_files = len(warc_urls)
+
+        if settings.WARC_STREAMING:
+            # Records are parsed as the bytes arrive; nothing is written to disk
+            sources = ((warc_url, None) for warc_url in warc_urls)
+        else:
+            # The next WARC files download in the background while this one is parsed
+            sources = self.downloader.iter_warc_files(
+                warc_urls, should_stop=lambda: self.page_count >= settings.MAX_HTML_PAGES
+            )
+
+        for idx, (warc_url, local_file) in enumerate(sources, start=1):
+            if self.page_count >= settings.MAX_HTML_PAGES:
+                break
+            if local_file is None and not settings.WARC_STREAMING:
+                logging.warning(f"Skipping {warc_url} - download failed")
+                continue
+
+            warc_name = os.path.basename(local_file or warc_url)
+            logging.info(f"[{idx}/{total_warc_files}] Processing WARC file: {warc_name}")
 
             try:
-                with open(local_file, "rb") as stream:
-                    for record in ArchiveIterator(stream):
-                        if html_count >= settings.MAX_HTML_PAGES:
+                # closing(): stopping early must still let the WARC index finish
+                with closing(iter_warc_html(self.downloader, warc_url, local_file)) as records:
+                    for url, html_content in records:
+                        if self.page_count >= settings.MAX_HTML_PAGES:
                             break
-                        if (
-                            record.rec_type == "response"
-                            and "text/html" in record.http_headers.get_header("Content-Type", "")
-                        ):
-                            url = record.rec_headers.get_header("WARC-Target-URI")
-                            html_content = record.content_stream().read()
-
-                            html_filename = os.path.basename(urlparse(url).path) or f"page_{html_count}.html"
-                            html_path = self.file_manager.save_html(html_content, html_filename)
-
-                            image_urls = extract_image_urls(html_content, url)
-                            saved_images = self.file_manager.download_images(
-                                image_urls,
-                                os.path.splitext(html_filename)[0]
-                            )
-
-                            # Store paths in js
-                            self.mappings.append({
-                                "url": url,
-                                "html_path": os.path.relpath(html_path, start=settings.BASE_DATA_PATH),
-                                "images": [os.path.relpath(img, start=settings.BASE_DATA_PATH) for img in saved_images]
-                            })
-
-                            html_count += 1
+
+                        # One parse gives the text, metadata and image URLs
+                        self._store_page(url, html_content, extract_page(html_content, url))
             except ArchiveLoadFailed as e:
-                logging.warning(f"Skipping file {os.path.basename(local_file)} - not a valid WARC: {e}")
+                logging.warning(f"Skipping file {warc_name} - not a valid WARC: {e}")
                 continue
             except Exception as e:
-                logging.error(f"Error processing {os.path.basename(local_file)}: {e}", exc_info=True)
+                logging.error(f"Error processing {warc_name}: {e}", exc_info=True)
                 continue
 
-        self.file_manager.save_mappings(self.mappings)
-        logging.info(f"=== Phase 1 complete: {len(self.mappings)} HTML pages processed ===")
-        return self.mappings
+    def _scan_parallel(self, warc_urls):
+        """Fan WARC files out to a process pool and store their pages as they stream in, up to MAX_HTML_PAGES"""
+        workers = min(settings.WARC_PROCESS_WORKERS, len(warc_urls))
+        logging.info(f"Scanning {len(warc_urls)} WARC files with {workers} worker processes")
+
+        context = multiprocessing.get_context()
+        stop_event = context.Event()
+        page_queue = context.Queue(maxsize=settings.WARC_SCAN_QUEUE_CHUNKS)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_scan_worker,
+                                 initargs=(stop_event, page_queue)) as pool:
+            futures = {
+                pool.submit(scan_warc_file, warc_url, settings.MAX_HTML_PAGES): warc_url
+                for warc_url in warc_urls
+            }
+            finished = set()
+            while len(finished) < len(futures):
+                try:
+                    kind, warc_url, payload = page_queue.get(timeout=0.5)
+                except queue.Empty:
+                    # Failed, cancelled and stopped scans send no "done" message
+                    for future, warc_url in futures.items():
+                        if warc_url in finished or not future.done():
+                            continue
+                        if future.cancelled() or stop_event.is_set():
+                            finished.add(warc_url)
+                        elif future.exception() is not None:
+                            logging.error(f"Error processing {os.path.basename(warc_url)}: {future.exception()}")
+                            finished.add(warc_url)
+                    continue
+
+                if kind == "done":
+                    logging.info(f"Worker finished {os.path.basename(warc_url)}: {payload} HTML pages")
+                    finished.add(warc_url)
+                    continue
+
+                for page in payload:
+                    if self.page_count >= settings.MAX_HTML_PAGES:
+                        break
+                    self._store_page(page["url"], page["html_content"], page["page"])
+
+                if self.page_count >= settings.MAX_HTML_PAGES and not stop_event.is_set():
+                    # Enough pages: drop WARC files that have not started yet and make
+                    # the running workers return at their next record; what they
+                    # already queued is read and discarded until they are done
+                    stop_event.set()
+                    for pending in futures:
+                        pending.cancel()
@@ -1,28 +1,76 @@
-import re
 import json
-from bs4 import BeautifulSoup
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from langdetect import detect
-import spacy
-from keybert import KeyBERT
-from transformers import pipeline
 from sklearn.feature_extraction.text import TfidfVectorizer
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.model_registry import registry
+from src.html_cleaning import clean_html
+from config import settings
+
+
+# Heavy NLP libraries are imported inside their loaders, on first use only
+def _load_spacy():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+def _load_keybert():
+    from keybert import KeyBERT
+    return KeyBERT()
+
+
+def _load_sentiment():
+    from transformers import pipeline
+    return pipeline("sentiment-analysis")
+
+
+registry.register("spacy", _load_spacy)
+registry.register("keybert", _load_keybert)
+registry.register("sentiment", _load_sentiment)
+
+
+def clean_html_text(html_content):
+    """Extract title and cleaned text."""
+    return clean_html(html_content)
+
+
+def _dedup(seq):
+    seen, out = set(), []
+    for x in seq:
+        if x not in seen:
+            out.append(x)
+            seen.add(x)
+    return out
+
+
+def _entities_from_doc(doc):
+    persons, orgs, locations = [], [], []
+    for ent in doc.ents:
+        if ent.label_ == "PERSON":
+            persons.append(ent.text)
+        elif ent.label_ in ("ORG", "ORGANIZATION"):
+            orgs.append(ent.text)
+        elif ent.label_ in ("GPE", "LOC", "LOCATION"):
+            locations.append(ent.text)
+    return _dedup(persons), _dedup(orgs), _dedup(locations)
+
+
+def _sentiment_from_result(result):
+    label = result["label"].lower()
+    score = float(result["score"])
+    if label.startswith("pos"):
+        return "positive", score
+    elif label.startswith("neg"):
+        return "negative", score
+    return "neutral", score
 
 
 class TextMetadataExtractor:
     def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except Exception:
-            self.nlp = None
-        try:
-            self.kw_model = KeyBERT()
-        except Exception:
-            self.kw_model = None
-        try:
-            self.sentiment_analyzer = pipeline("sentiment-analysis")
-        except Exception:
-            self.sentiment_analyzer = None
-
+        # Models come from the process-wide registry, so every extractor shares one copy
+        self._clean_pool = None
         self.topic_keywords = {
             "politics": ["government", "election", "president", "minister", "policy", "vote"],
             "sports": ["game", "team", "player", "match", "score", "championship", "football"],
@@ -34,21 +82,21 @@ class TextMetadataExtractor:
             "education": ["school", "university", "student", "learning", "teacher"]
         }
 
-    def clean_html_text(self, html_content):
-        """Extract title and cleaned text."""
-        if isinstance(html_content, bytes):
-            html_content = html_content.decode("utf-8", errors="ignore")
+    @property
+    def nlp(self):
+        return registry.get("spacy")
 
-        soup = BeautifulSoup(html_content, "html.parser")
-        for tag in soup(["script", "style", "nav", "header", "footer", "aside", "form"]):
-            tag.decompose()
+    @property
+    def kw_model(self):
+        return registry.get("keybert")
 
-        title_tag = soup.find("title")
-        title = title_tag.get_text().strip() if title_tag else ""
+    @property
+    def sentiment_analyzer(self):
+        return registry.get("sentiment")
 
-        body_text = soup.get_text(separator="\n")
-        cleaned = re.sub(r'\s+', ' ', body_text).strip()
-        return {"title": title, "cleaned_text": cleaned}
+    def clean_html_text(self, html_content):
+        """Extract title and cleaned text."""
+        return clean_html_text(html_content)
 
     def detect_language(self, text):
         try:
@@ -59,25 +107,7 @@ class TextMetadataExtractor:
     def extract_named_entities(self, text):
         if not self.nlp or not text:
             return [], [], []
-        doc = self.nlp(text[:1000000])
-        persons, orgs, locations = [], [], []
-        for ent in doc.ents:
-            if ent.label_ == "PERSON":
-                persons.append(ent.text)
-            elif ent.label_ in ("ORG", "ORGANIZATION"):
-                orgs.append(ent.text)
-            elif ent.label_ in ("GPE", "LOC", "LOCATION"):
-                locations.append(ent.text)
-
-        def dedup(seq):
-            seen, out = set(), []
-            for x in seq:
-                if x not in seen:
-                    out.append(x)
-                    seen.add(x)
-            return out
-
-        return dedup(persons), dedup(orgs), dedup(locations)
+        return _entities_from_doc(self.nlp(text[:1000000]))
 
     def extract_keywords(self, text, num_keywords=8):
         if not text or len(text.strip()) < 50:
@@ -103,14 +133,7 @@ class TextMetadataExtractor:
             return "neutral", 0.0
         try:
             sample = text[:512]
-            result = self.sentiment_analyzer(sample)[0]
-            label = result["label"].lower()
-            score = float(result["score"])
-            if label.startswith("pos"):
-                return "positive", score
-            elif label.startswith("neg"):
-                return "negative", score
-            return "neutral", score
+            return _sentiment_from_result(self.sentiment_analyzer(sample)[0])
         except Exception:
             return "neutral", 0.0
 
@@ -124,27 +147,136 @@ class TextMetadataExtractor:
                 best, best_score = topic, score
         return best, best_score
 
+    def extract_keywords_batch(self, texts, num_keywords=8):
+        """Keywords for many documents; KeyBERT embeds all of them in one call"""
+        results = [[] for _ in texts]
+        eligible = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 50]
+        if not eligible:
+            return results
+        try:
+            if self.kw_model:
+                kws = self.kw_model.extract_keywords(
+                    [texts[i] for i in eligible],
+                    keyphrase_ngram_range=(1, 2), stop_words="english", top_n=num_keywords
+                )
+                # A single document comes back as a flat list of (keyword, score)
+                if kws and isinstance(kws[0], tuple):
+                    kws = [kws]
+                for i, doc_kws in zip(eligible, kws):
+                    results[i] = [k[0] for k in doc_kws]
+                return results
+        except Exception:
+            pass
+        for i in eligible:
+            results[i] = self.extract_keywords(texts[i], num_keywords)
+        return results
+
+    def extract_named_entities_batch(self, texts):
+        """Entities for many documents, streamed through nlp.pipe"""
+        results = [([], [], []) for _ in texts]
+        eligible = [i for i, text in enumerate(texts) if text]
+        if not self.nlp or not eligible:
+            return results
+        try:
+            docs = self.nlp.pipe(
+                (texts[i][:1000000] for i in eligible),
+                batch_size=settings.NLP_PIPE_BATCH_SIZE,
+                n_process=settings.NLP_PIPE_PROCESSES
+            )
+            for i, doc in zip(eligible, docs):
+                results[i] = _entities_from_doc(doc)
+        except Exception as e:
+            # One bad document fails the whole pipe; redo them one by one so only it is lost
+            print(f"spaCy batch failed ({e}), extracting entities per document")
+            for i in eligible:
+                try:
+                    results[i] = self.extract_named_entities(texts[i])
+                except Exception:
+                    results[i] = ([], [], [])
+        return results
+
+    def analyze_sentiment_batch(self, texts):
+        """Sentiment for many documents in padded batches"""
+        results = [("neutral", 0.0) for _ in texts]
+        eligible = [i for i, text in enumerate(texts) if text]
+        if not self.sentiment_analyzer or not eligible:
+            return results
+        try:
+            outputs = self.sentiment_analyzer(
+                [texts[i][:512] for i in eligible],
+                batch_size=settings.SENTIMENT_BATCH_SIZE,
+                truncation=True
+            )
+            for i, result in zip(eligible, outputs):
+                results[i] = _sentiment_from_result(result)
+        except Exception:
+            for i in eligible:
+                results[i] = self.analyze_sentiment(texts[i])
+        return results
+
+    def clean_html_batch(self, html_list):
+        """Clean many pages, in a process pool when TEXT_CLEAN_WORKERS > 1"""
+        if settings.TEXT_CLEAN_WORKERS <= 1 or len(html_list) <= 1:
+            return [clean_html_text(html) for html in html_list]
+        if self._clean_pool is None:
+            self._clean_pool = ProcessPoolExecutor(max_workers=settings.TEXT_CLEAN_WORKERS)
+        return list(self._clean_pool.map(clean_html_text, html_list, chunksize=4))
+
+    def process_batch(self, html_list, metadata_list=None):
+        """
+        Extract metadata for many pages at once.
+
+        Cleaning runs in parallel, and each model sees the whole batch:
+        spaCy through nlp.pipe, sentiment in padded batches and KeyBERT with
+        one multi-document embedding, which is several times faster than
+        calling process_text_metadata page by page.
+
+        Returns:
+            One article dict per page, as process_text_metadata returns
+        """
+        return self.analyze_pages(self.clean_html_batch(html_list), metadata_list)
+
+    def analyze_pages(self, cleaned, metadata_list=None):
+        """
+        Run the NLP models over pages that are already cleaned.
+
+        Args:
+            cleaned: List of {"title", "cleaned_text"} dicts, e.g. the page
+                extraction Phase 1 stored in the mappings
+            metadata_list: Optional list of metadata dicts, one per page
+        """
+        metadata_list = metadata_list or [None] * len(cleaned)
+        texts = [c["cleaned_text"] for c in cleaned]
+
+        keywords = self.extract_keywords_batch(texts)
+        entities = self.extract_named_entities_batch(texts)
+        sentiments = self.analyze_sentiment_batch(texts)
+
+        results = []
+        for page, text, metadata, kws, (persons, orgs, locations), (sentiment_label, sentiment_score) in zip(
+            cleaned, texts, metadata_list, keywords, entities, sentiments
+        ):
+            title = page["title"]
+            topic_category, _ = self.classify_topic(text, title)
+            results.append({
+                "target_uri": metadata.get("target_uri") if metadata else None,
+                "title": title,
+                "cleaned_text": text,
+                "language": self.detect_language(text),
+                "sentiment_label": sentiment_label,
+                "sentiment_score": sentiment_score,
+                "topic_category": topic_category,
+                "keywords": kws,
+                "person_entities": persons,
+                "org_entities": orgs,
+                "location_entities": locations
+            })
+        return results
+
     def process_text_metadata(self, html_content, metadata=None):
-        cleaned = self.clean_html_text(html_content)
-        title = cleaned["title"]
-        cleaned_text = cleaned["cleaned_text"]
-
-        language = self.detect_language(cleaned_text)
-        keywords = self.extract_keywords(cleaned_text)
-        persons, orgs, locations = self.extract_named_entities(cleaned_text)
-        sentiment_label, sentiment_score = self.analyze_sentiment(cleaned_text)
-        topic_category, _ = self.classify_topic(cleaned_text, title)
-
-        return {
-            "target_uri": metadata.get("target_uri") if metadata else None,
-            "title": title,
-            "cleaned_text": cleaned_text,
-            "language": language,
-            "sentiment_label": sentiment_label,
-            "sentiment_score": sentiment_score,
-            "topic_category": topic_category,
-            "keywords": keywords,
-            "person_entities": persons,
-            "org_entities": orgs,
-            "location_entities": locations
-        }
+        return self.process_batch([html_content], [metadata])[0]
+
+    def close(self):
+        if self._clean_pool is not None:
+            self._clean_pool.shutdown()
+            self._clean_pool = None
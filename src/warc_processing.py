@@ -0,0 +1,228 @@
+# core/warc_processing.py
+import json
+import logging
+import os
+import sys
+from urllib.parse import urljoin, urlparse
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
+from src.html_cleaning import (
+    normalize_result, parse_with_lxml, lxml_tree_text, parse_with_bs4, bs4_soup_text,
+    selectolax_tree_text, resolve_backend, to_bytes
+)
+
+# <meta> names/properties checked in order; the first non-empty one wins
+DATE_META_KEYS = (
+    "article:published_time", "og:published_time", "datepublished", "pubdate", "publishdate",
+    "publish-date", "date", "dc.date", "dc.date.issued", "dcterms.created", "sailthru.date",
+    "parsely-pub-date", "article.published",
+)
+AUTHOR_META_KEYS = ("author", "article:author", "byl", "dc.creator", "sailthru.author", "parsely-author")
+
+# Lazy-loading attributes some sites use instead of src
+IMAGE_SRC_ATTRS = ("src", "data-src", "data-original", "data-lazy-src")
+
+
+def _clean_value(value):
+    return " ".join(value.split()) if value else None
+
+
+def _clean_author(value):
+    value = _clean_value(value)
+    if not value or value.startswith(("http://", "https://")):
+        # article:author is often a profile URL rather than a name
+        return None
+    if value.lower().startswith("by "):
+        value = value[3:].strip()
+    return value or None
+
+
+def source_domain(url):
+    host = (urlparse(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else (host or None)
+
+
+def _image_url(base_url, attrs):
+    for attr in IMAGE_SRC_ATTRS:
+        src = (attrs.get(attr) or "").strip()
+        if src and not src.startswith("data:"):
+            absolute = urljoin(base_url or "", src)
+            if absolute.startswith(("http://", "https://")):
+                return absolute
+    return None
+
+
+def _json_ld_metadata(scripts):
+    """Pull datePublished/author out of JSON-LD blocks (NewsArticle and friends)"""
+    date, author = None, None
+    for raw in scripts:
+        try:
+            data = json.loads(raw)
+        except (ValueError, TypeError):
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            published = item.get("datePublished")
+            if date is None and isinstance(published, str):
+                date = _clean_value(published)
+            if author is None:
+                value = item.get("author")
+                if isinstance(value, list) and value:
+                    value = value[0]
+                if isinstance(value, dict):
+                    value = value.get("name")
+                author = _clean_author(value) if isinstance(value, str) else None
+        if date and author:
+            break
+    return date, author
+
+
+def _page_result(url, title, text, meta, scripts, time_datetime, images):
+    ld_date, ld_author = _json_ld_metadata(scripts)
+    page = normalize_result(title, text)
+    page.update({
+        "publication_date": next((meta[k] for k in DATE_META_KEYS if meta.get(k)), None) or ld_date or time_datetime,
+        "author": next((a for a in (_clean_author(meta.get(k)) for k in AUTHOR_META_KEYS) if a), None) or ld_author,
+        "source_domain": source_domain(url),
+        "images": images,
+    })
+    return page
+
+
+def _add_image(images, seen, url, alt_text, caption):
+    if url and url not in seen:
+        seen.add(url)
+        images.append({"url": url, "alt_text": _clean_value(alt_text), "caption": _clean_value(caption)})
+
+
+def extract_page_selectolax(html_content, url):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(to_bytes(html_content).decode("utf-8", errors="ignore"))
+    title_node = tree.css_first("title")
+
+    meta = {}
+    for node in tree.css("meta[content]"):
+        key = (node.attributes.get("property") or node.attributes.get("name") or node.attributes.get("itemprop") or "").lower()
+        if key and key not in meta and node.attributes.get("content"):
+            meta[key] = _clean_value(node.attributes.get("content"))
+    scripts = [node.text() for node in tree.css('script[type="application/ld+json"]')]
+    time_node = tree.css_first("time[datetime]")
+
+    images, seen = [], set()
+    for node in tree.css("img"):
+        caption = None
+        parent = node.parent
+        while parent is not None and parent.tag != "figure":
+            parent = parent.parent
+        if parent is not None:
+            caption_node = parent.css_first("figcaption")
+            caption = caption_node.text(separator=" ") if caption_node else None
+        _add_image(images, seen, _image_url(url, node.attributes), node.attributes.get("alt"), caption)
+
+    return _page_result(
+        url, title_node.text() if title_node else "", selectolax_tree_text(tree), meta, scripts,
+        _clean_value(time_node.attributes.get("datetime")) if time_node else None, images
+    )
+
+
+def extract_page_lxml(html_content, url):
+    root = parse_with_lxml(html_content)
+    if root is None:
+        return _page_result(url, "", "", {}, [], None, [])
+    title_node = root.find(".//title")
+
+    meta = {}
+    for node in root.iter("meta"):
+        key = (node.get("property") or node.get("name") or node.get("itemprop") or "").lower()
+        if key and key not in meta and node.get("content"):
+            meta[key] = _clean_value(node.get("content"))
+    scripts = [node.text_content() for node in root.xpath('//script[@type="application/ld+json"]')]
+    time_nodes = root.xpath("//time[@datetime]")
+
+    images, seen = [], set()
+    for node in root.iter("img"):
+        caption = None
+        figure = next(node.iterancestors("figure"), None)
+        if figure is not None:
+            caption_node = figure.find(".//figcaption")
+            caption = caption_node.text_content() if caption_node is not None else None
+        _add_image(images, seen, _image_url(url, node.attrib), node.get("alt"), caption)
+
+    return _page_result(
+        url, title_node.text_content() if title_node is not None else "", lxml_tree_text(root), meta, scripts,
+        _clean_value(time_nodes[0].get("datetime")) if time_nodes else None, images
+    )
+
+
+def extract_page_bs4(html_content, url):
+    soup = parse_with_bs4(html_content)
+    title_node = soup.find("title")
+
+    meta = {}
+    for node in soup.find_all("meta", attrs={"content": True}):
+        key = (node.get("property") or node.get("name") or node.get("itemprop") or "").lower()
+        if key and key not in meta and node.get("content"):
+            meta[key] = _clean_value(node.get("content"))
+    scripts = [node.get_text() for node in soup.find_all("script", attrs={"type": "application/ld+json"})]
+    time_node = soup.find("time", attrs={"datetime": True})
+
+    images, seen = [], set()
+    for node in soup.find_all("img"):
+        caption = None
+        figure = node.find_parent("figure")
+        if figure is not None:
+            caption_node = figure.find("figcaption")
+            caption = caption_node.get_text(separator=" ") if caption_node is not None else None
+        _add_image(images, seen, _image_url(url, node.attrs), node.get("alt"), caption)
+
+    return _page_result(
+        url, title_node.get_text() if title_node is not None else "", bs4_soup_text(soup), meta, scripts,
+        _clean_value(time_node.get("datetime")) if time_node is not None else None, images
+    )
+
+
+EXTRACTORS = {
+    "selectolax": extract_page_selectolax,
+    "lxml": extract_page_lxml,
+    "bs4": extract_page_bs4,
+}
+
+_extractor = None
+
+
+def _get_extractor():
+    """The extractor for the parser HTML_CLEANER selects, so text cleaning and extraction always agree"""
+    global _extractor
+    if _extractor is None:
+        _extractor = EXTRACTORS[resolve_backend()]
+        logging.info(f"Using '{_extractor.__name__}' for page extraction")
+    return _extractor
+
+
+def extract_page(html_content, url):
+    """
+    Parse a page once and extract everything the pipeline needs from it.
+
+    Metadata and images are read first, then the same tree is stripped of
+    scripts and boilerplate for the text, so Phase 2 can use the result
+    without reading the HTML back from disk and parsing it again.
+
+    Returns:
+        Dict with title, cleaned_text, publication_date, author,
+        source_domain and images (list of {url, alt_text, caption})
+    """
+    extractor = _get_extractor()
+    try:
+        return extractor(html_content, url)
+    except Exception as e:
+        if extractor is extract_page_bs4:
+            raise
+        logging.warning(f"Page extraction failed for {url} ({e}), retrying with BeautifulSoup")
+        return extract_page_bs4(html_content, url)
+
+
+def extract_image_urls(html_content, url):
+    """Absolute URLs of the images on a page, in document order"""
+    return [image["url"] for image in extract_page(html_content, url)["images"]]
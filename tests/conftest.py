@@ -0,0 +1,148 @@
+# tests/conftest.py
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+class Route:
+    """
+    What the test server returns for one path.
+
+    head_status: status of HEAD requests (anything but 200 hides the size)
+    head_length: Content-Length reported by HEAD, defaults to len(body)
+    truncate_first: bytes sent by the first GET before the connection drops
+    delay: seconds each GET waits before answering
+    """
+
+    def __init__(self, body, content_type="application/octet-stream", head_status=200,
+                 head_length=None, etag=None, truncate_first=None, delay=0):
+        self.body = body
+        self.content_type = content_type
+        self.head_status = head_status
+        self.head_length = len(body) if head_length is None else head_length
+        self.etag = etag
+        self.truncate_first = truncate_first
+        self.delay = delay
+        self.requests = []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        route = self.server.routes.get(self.path)
+        if route is None or route.head_status != 200:
+            self.send_response(route.head_status if route else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(route.head_length))
+        if route.etag:
+            self.send_header("ETag", f'"{route.etag}"')
+        self.end_headers()
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            self._get()
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _get(self):
+        route = self.server.routes.get(self.path)
+        if route is None:
+            self.send_error(404)
+            return
+        route.requests.append(dict(self.headers))
+        time.sleep(route.delay)
+
+        body, start = route.body, 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", route.content_type)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+
+        if route.truncate_first is not None and len(route.requests) == 1:
+            self.wfile.write(body[start:route.truncate_first])
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+
+@pytest.fixture
+def http_server():
+    """
+    Local HTTP server with Range support; register paths in server.routes.
+
+    server.max_active records the most GET requests that were served at once.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.routes = {}
+    server.lock = threading.Lock()
+    server.active = 0
+    server.max_active = 0
+    server.url = lambda path: f"http://127.0.0.1:{server.server_address[1]}{path}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def write_warc(path, pages, image_every=0):
+    """
+    Write a gzipped WARC of text/html responses.
+
+    pages: list of (url, html_bytes)
+    image_every: also write an image/png response after every n-th page
+    """
+    import io
+    from warcio.statusandheaders import StatusAndHeaders
+    from warcio.warcwriter import WARCWriter
+
+    with open(path, "wb") as f:
+        writer = WARCWriter(f, gzip=True)
+        for n, (url, body) in enumerate(pages, start=1):
+            headers = StatusAndHeaders("200 OK", [("Content-Type", "text/html; charset=utf-8")], protocol="HTTP/1.1")
+            writer.write_record(writer.create_warc_record(
+                url, "response", payload=io.BytesIO(body), http_headers=headers))
+            if image_every and n % image_every == 0:
+                headers = StatusAndHeaders("200 OK", [("Content-Type", "image/png")], protocol="HTTP/1.1")
+                writer.write_record(writer.create_warc_record(
+                    url + ".png", "response", payload=io.BytesIO(b"png"), http_headers=headers))
+    return str(path)
+
+
+def html_pages(count, host="news.example.com"):
+    return [
+        (f"http://{host}/p{n}.html",
+         f"<html><head><title>T{n}</title></head><body><p>story {n}</p></body></html>".encode())
+        for n in range(count)
+    ]
@@ -0,0 +1,29 @@
+# tests/test_blob_store.py
+import os
+
+from src.data_access.blob_store import BlobStore
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path))
+    content_hash, path, created = store.put(b"same bytes")
+    again_hash, again_path, again_created = store.put(b"same bytes")
+
+    assert created and not again_created
+    assert again_hash == content_hash and again_path == path
+    assert path == os.path.join(str(tmp_path), content_hash[:2], content_hash[2:4], content_hash)
+    assert BlobStore.hash_from_path(path) == content_hash
+
+
+def test_blobs_stored_with_an_extension_are_reused(tmp_path):
+    store = BlobStore(str(tmp_path))
+    content_hash = BlobStore.content_hash(b"old image")
+    legacy = store.path_for(content_hash) + ".png"
+    os.makedirs(os.path.dirname(legacy))
+    with open(legacy, "wb") as f:
+        f.write(b"old image")
+
+    _, path, created = store.put(b"old image")
+
+    assert path == legacy and not created
+    assert BlobStore.hash_from_path(legacy) == content_hash
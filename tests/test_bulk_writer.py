@@ -0,0 +1,73 @@
+# tests/test_bulk_writer.py
+import sqlite3
+
+import pytest
+
+from src.data_access.database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    # Any image saved as "bad.jpg" makes the whole batch fail to write
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("CREATE TRIGGER reject_bad BEFORE INSERT ON images "
+                     "WHEN NEW.image_path LIKE '%bad.jpg' BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    return db
+
+
+def article(n):
+    return {"target_uri": f"http://example.com/{n}", "title": f"Page {n}", "cleaned_text": "text"}
+
+
+def count(db, table):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_failed_flush_rolls_back_the_batch_and_raises(db):
+    with db.bulk_writer(autoflush=False) as writer:
+        first = writer.insert_article(article(1))
+        writer.insert_image(first, "images/good.jpg")
+        writer.flush()
+
+        second = writer.insert_article(article(2))
+        writer.insert_image(second, "images/bad.jpg")
+        with pytest.raises(sqlite3.DatabaseError):
+            writer.flush()
+
+        # Nothing of the failed batch survives, the committed one is untouched
+        assert count(db, "articles") == 1
+        assert count(db, "images") == 1
+
+        # The writer is usable again afterwards
+        third = writer.insert_article(article(3))
+        writer.insert_image(third, "images/other.jpg")
+
+    assert count(db, "articles") == 2
+    assert writer.rows_written == 4
+
+
+def test_auto_flush_failure_propagates_from_insert(db):
+    with pytest.raises(sqlite3.DatabaseError):
+        with db.bulk_writer(batch_size=2) as writer:
+            article_id = writer.insert_article(article(1))
+            writer.insert_image(article_id, "images/bad.jpg")
+    assert count(db, "articles") == 0
+
+
+def test_manual_writer_commits_only_on_flush(db):
+    with db.bulk_writer(batch_size=1, autoflush=False) as writer:
+        for n in range(3):
+            writer.insert_image(writer.insert_article(article(n)), f"images/{n}.jpg")
+        assert count(db, "articles") == 0
+    assert count(db, "articles") == 3
+    assert count(db, "images") == 3
+
+
+def test_error_in_block_is_not_hidden_by_the_final_flush(db):
+    with pytest.raises(KeyError):
+        with db.bulk_writer() as writer:
+            writer.insert_image(writer.insert_article(article(1)), "images/bad.jpg")
+            raise KeyError("caller error")
+    assert count(db, "articles") == 0
@@ -0,0 +1,73 @@
+# tests/test_connection_pool.py
+import gc
+import threading
+import weakref
+
+import pytest
+
+from src.data_access.connection_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+    yield pool
+    pool.close_all()
+
+
+def names(pool):
+    with pool.checkout() as conn:
+        return [row[0] for row in conn.execute("SELECT name FROM items ORDER BY rowid")]
+
+
+def test_connections_of_finished_threads_are_closed(pool):
+    refs = []
+
+    def work():
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO items VALUES ('x')")
+            refs.append(weakref.ref(conn))
+
+    threads = [threading.Thread(target=work) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+
+    assert len(refs) == 50
+    assert all(ref() is None for ref in refs)
+    assert len(names(pool)) == 50
+
+
+def test_a_thread_reuses_its_connection(pool):
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        assert second is first
+
+
+def test_nested_commit_stays_in_the_outer_transaction(pool):
+    with pool.checkout() as outer:
+        outer.execute("INSERT INTO items VALUES ('outer')")
+        with pool.connection() as inner:
+            inner.execute("INSERT INTO items VALUES ('inner')")
+        # The nested commit did not commit the caller's work
+        assert outer.in_transaction
+        outer.rollback()
+    assert names(pool) == []
+
+
+def test_nested_rollback_only_undoes_its_own_work(pool):
+    with pool.connection() as outer:
+        outer.execute("INSERT INTO items VALUES ('outer')")
+        with pytest.raises(RuntimeError):
+            with pool.connection() as inner:
+                inner.execute("INSERT INTO items VALUES ('inner')")
+                raise RuntimeError("nested helper failed")
+        with pool.checkout() as unfinished:
+            # Released without commit: discarded like a real close would
+            unfinished.execute("INSERT INTO items VALUES ('uncommitted')")
+    assert names(pool) == ["outer"]
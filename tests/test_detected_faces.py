@@ -0,0 +1,87 @@
+# tests/test_detected_faces.py
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.data_access.database import DatabaseManager
+from src.face_matching import FaceMatcher
+
+DIM = 128
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "test.db"))
+
+
+def encoding(n):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[n] = 1.0
+    return vector
+
+
+def store_image(db, name, faces):
+    """Store image `name` whose faces have the given (encoding, name, confidence, face_id) matches"""
+    db.insert_image(db.insert_article({"target_uri": f"http://example.com/{name}", "title": name,
+                                       "cleaned_text": "text"}), f"images/{name}.jpg")
+    with sqlite3.connect(db.db_path) as conn:
+        image_id = conn.execute("SELECT id FROM images WHERE image_path = ?", (f"images/{name}.jpg",)).fetchone()[0]
+    with db.bulk_writer() as writer:
+        writer.replace_detected_faces(image_id, [(0, 10, 10, 0)] * len(faces),
+                                      [face[0] for face in faces], [face[1:] for face in faces])
+        writer.update_image_face_detection(image_id, len(faces),
+                                           [{"name": matched, "confidence": round(confidence, 3)}
+                                            for _, matched, confidence, _ in faces])
+    return image_id
+
+
+def image_summary(db, image_id):
+    with sqlite3.connect(db.db_path) as conn:
+        return json.loads(conn.execute("SELECT detected_faces FROM images WHERE id = ?",
+                                       (image_id,)).fetchone()[0])
+
+
+def test_stored_faces_round_trip_in_batches(db):
+    first = store_image(db, "first", [(encoding(0), "a", 0.9, 1), (encoding(1), "unknown", 0.0, None)])
+    second = store_image(db, "second", [(encoding(2), "b", 0.8, 2)])
+
+    batches = list(db.iter_detected_faces(batch_size=2))
+    assert [len(row_ids) for row_ids, *_ in batches] == [2, 1]
+    row_ids, image_ids, encodings, names, confidences = (sum((list(b[i]) for b in batches), []) for i in range(5))
+    assert image_ids == [first, first, second]
+    assert np.array_equal(np.vstack(encodings), np.vstack([encoding(0), encoding(1), encoding(2)]))
+    assert names == ["a", "unknown", "b"]
+    assert confidences == [0.9, 0.0, 0.8]
+
+
+def test_replacing_an_image_drops_its_old_faces(db):
+    image_id = store_image(db, "photo", [(encoding(0), "a", 0.9, 1), (encoding(1), "b", 0.9, 2)])
+    with db.bulk_writer() as writer:
+        writer.replace_detected_faces(image_id, [(0, 10, 10, 0)], [encoding(3)], [("c", 0.7, 3)])
+
+    assert db.get_detected_faces([image_id]) == {image_id: [{"name": "c", "confidence": 0.7}]}
+
+
+def test_reidentify_rewrites_only_changed_images(db):
+    face_service = pytest.importorskip("src.services.face_service")
+
+    unchanged = store_image(db, "unchanged", [(encoding(0), "a", 1.0, 1)])
+    newly_known = store_image(db, "newly_known", [(encoding(0), "a", 1.0, 1), (encoding(5), "unknown", 0.0, None)])
+
+    class Processor:
+        # The gallery now also knows whoever has encoding(5)
+        matcher = FaceMatcher(np.vstack([encoding(0), encoding(5)]), ["a", "e"], face_ids=[1, 5])
+
+        def load_known_faces(self):
+            pass
+
+    service = object.__new__(face_service.FaceService)
+    service.processor, service.db = Processor(), db
+
+    assert service.reidentify_faces(batch_size=2) == 1
+    assert image_summary(db, unchanged) == [{"name": "a", "confidence": 1.0}]
+    assert image_summary(db, newly_known) == [{"name": "a", "confidence": 1.0}, {"name": "e", "confidence": 1.0}]
+    with sqlite3.connect(db.db_path) as conn:
+        assert conn.execute("SELECT known_face_id FROM detected_faces WHERE matched_name = 'e'").fetchone() == (5,)
@@ -0,0 +1,114 @@
+# tests/test_enrollment.py
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from config import settings
+from src.data_access.database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "test.db"))
+
+
+def known_faces(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return sorted(conn.execute("SELECT name, face_image_path FROM known_faces").fetchall())
+
+
+def enroll(db, key, name):
+    with db.bulk_writer() as writer:
+        writer.insert_face_encoding(name, np.zeros(128), {"face_image_path": key})
+        writer.record_enrollment(key, name, "hash-" + key, 1.0, 10, True)
+
+
+def test_removing_an_enrollment_drops_its_encoding(db):
+    enroll(db, "Ann/Ann_0001.jpg", "Ann")
+    enroll(db, "Ann/Ann_0002.jpg", "Ann")
+    with db.bulk_writer() as writer:
+        writer.remove_enrollment("Ann/Ann_0001.jpg")
+
+    assert list(db.get_enrollment_manifest()) == ["Ann/Ann_0002.jpg"]
+    assert known_faces(db) == [("Ann", "Ann/Ann_0002.jpg")]
+
+
+def test_renaming_sources_rekeys_manifest_and_encodings(db):
+    enroll(db, "/data/lfw/Ann/Ann_0001.jpg", "Ann")
+    assert db.rename_enrollment_sources({"/data/lfw/Ann/Ann_0001.jpg": "Ann/Ann_0001.jpg"})
+
+    assert db.get_enrollment_manifest() == {"Ann/Ann_0001.jpg": ("hash-/data/lfw/Ann/Ann_0001.jpg", 1.0, 10, True)}
+    assert known_faces(db) == [("Ann", "Ann/Ann_0001.jpg")]
+
+
+def test_only_pre_manifest_encodings_are_deleted(db):
+    enroll(db, "Ann/Ann_0001.jpg", "Ann")
+    with db.bulk_writer() as writer:
+        writer.insert_face_encoding("Ann", np.zeros(128))
+        writer.insert_face_encoding("Bob", np.zeros(128))
+
+    assert db.get_unmanifested_names() == {"Ann", "Bob"}
+    assert db.delete_unmanifested_encodings({"Ann"})
+    assert known_faces(db) == [("Ann", "Ann/Ann_0001.jpg"), ("Bob", None)]
+
+
+class EncodingProcessor:
+    """Encodes an image as its first bytes, and records which images it was asked to encode"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def get_face_encoding(self, image):
+        content = image.read()
+        self.encoded.append(content)
+        encoding = np.zeros(128, dtype=np.float32)
+        encoding[:len(content)] = list(content[:128])
+        return encoding
+
+    def reset_gallery(self):
+        pass
+
+
+@pytest.fixture
+def service(db, tmp_path, monkeypatch):
+    face_service = pytest.importorskip("src.services.face_service")
+    monkeypatch.setattr(settings, "LFW_DATASET_PATH", str(tmp_path / "lfw"))
+    monkeypatch.setattr(settings, "FACE_ENROLL_WORKERS", 1)
+    service = object.__new__(face_service.FaceService)
+    service.processor, service.db = EncodingProcessor(), db
+    return service
+
+
+def write_image(tmp_path, key, content, mtime=1_000_000):
+    path = tmp_path / "lfw" / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+
+
+def test_re_enrollment_only_encodes_what_changed(service, tmp_path):
+    write_image(tmp_path, "Ann/Ann_0001.jpg", b"a1")
+    write_image(tmp_path, "Ann/Ann_0002.jpg", b"a2")
+    write_image(tmp_path, "Bob/Bob_0001.jpg", b"b1")
+    service.enroll_faces()
+    assert sorted(service.processor.encoded) == [b"a1", b"a2", b"b1"]
+
+    # Unchanged dataset: nothing is encoded again
+    service.processor.encoded = []
+    service.enroll_faces()
+    assert service.processor.encoded == []
+
+    # A touched file keeps its encoding, a changed one is re-encoded, a deleted one is dropped
+    write_image(tmp_path, "Ann/Ann_0001.jpg", b"a1", mtime=2_000_000)
+    write_image(tmp_path, "Ann/Ann_0002.jpg", b"A2", mtime=2_000_000)
+    os.remove(tmp_path / "lfw" / "Bob" / "Bob_0001.jpg")
+    service.enroll_faces()
+
+    assert service.processor.encoded == [b"A2"]
+    assert known_faces(service.db) == [("Ann", "Ann/Ann_0001.jpg"), ("Ann", "Ann/Ann_0002.jpg")]
+    manifest = service.db.get_enrollment_manifest()
+    assert sorted(manifest) == ["Ann/Ann_0001.jpg", "Ann/Ann_0002.jpg"]
+    assert manifest["Ann/Ann_0001.jpg"][1] == 2_000_000
+    assert service.db.get_person_encodings("Ann")[:, 0].tolist() == [ord("a"), ord("A")]
@@ -0,0 +1,84 @@
+# tests/test_face_index.py
+import numpy as np
+
+from src.face_index import DIM, FaceIndexStore, IVFIndex
+
+
+def gallery(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(1, count + 1, dtype=np.int64), rng.normal(size=(count, DIM)).astype(np.float32)
+
+
+def test_saved_index_is_memory_mapped_and_answers_the_same(tmp_path):
+    face_ids, encodings = gallery(300)
+    index = IVFIndex(nlist=8, nprobe=3)
+    index.train(encodings)
+    index.add(face_ids, encodings)
+    queries = encodings[:20] + 0.01
+
+    path = str(tmp_path / "index")
+    index.save(path)
+    loaded = IVFIndex.load(path)
+
+    assert all(isinstance(cell, np.memmap) for cell in loaded.cell_vectors if len(cell))
+    expected, loaded_result = index.search(queries), loaded.search(queries)
+    assert np.array_equal(expected[0], loaded_result[0])
+    assert np.allclose(expected[1], loaded_result[1])
+
+
+def test_store_replaces_a_saved_index_and_merges_pending_rows(tmp_path):
+    store = FaceIndexStore(str(tmp_path / "faces.db"))
+    face_ids, encodings = gallery(200)
+    store.load(face_ids[:150], encodings[:150])
+    store.append(face_ids[150:], encodings[150:])
+
+    index = store.load(face_ids, encodings)
+    assert len(index) == 200
+    # Pending rows past 10% of the gallery were folded into a new saved index
+    reloaded = FaceIndexStore(str(tmp_path / "faces.db")).load(face_ids, encodings)
+    assert len(reloaded) == 200
+    assert not (tmp_path / "faces.faces.pending").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["faces.faces.ivf"]
+
+
+def clustered(count, clusters=20, seed=0):
+    """Face-like data: tight groups of encodings around a few points"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=0.3, size=(clusters, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)]
+    vectors = vectors + rng.normal(scale=0.02, size=vectors.shape).astype(np.float32)
+    return np.arange(1, count + 1, dtype=np.int64), vectors
+
+
+def exact_nearest(face_ids, encodings, queries):
+    distances = np.linalg.norm(encodings[None, :, :] - queries[:, None, :], axis=2)
+    return face_ids[np.argmin(distances, axis=1)], distances.min(axis=1)
+
+
+def test_probing_every_cell_is_exact():
+    face_ids, encodings = clustered(500)
+    queries = clustered(40, seed=1)[1]
+    index = IVFIndex(nlist=16, nprobe=16)
+    index.train(encodings)
+    index.add(face_ids, encodings)
+
+    ids, distances = index.search(queries)
+    expected_ids, expected_distances = exact_nearest(face_ids, encodings, queries)
+    assert np.array_equal(ids, expected_ids)
+    assert np.allclose(distances, expected_distances, atol=1e-4)
+
+
+def test_default_probing_agrees_with_exact_search():
+    face_ids, encodings = clustered(2000, clusters=50)
+    # New photos of enrolled people: gallery encodings with a little noise
+    rng = np.random.default_rng(3)
+    queries = encodings[rng.choice(len(encodings), 200)] + rng.normal(scale=0.01, size=(200, DIM)).astype(np.float32)
+    index = IVFIndex()
+    index.train(encodings)
+    index.add(face_ids, encodings)
+
+    ids, distances = index.search(queries)
+    expected_ids, expected_distances = exact_nearest(face_ids, encodings, queries)
+    # The same nearest face, or one just as close in the same tight group
+    assert np.mean(np.isclose(distances, expected_distances, atol=0.05)) >= 0.98
+    assert np.mean(ids == expected_ids) >= 0.9
@@ -0,0 +1,101 @@
+# tests/test_face_matching.py
+import numpy as np
+
+from src.face_index import DIM
+from config import settings
+from src.face_matching import FaceMatcher, compact_gallery, evaluate_compaction
+
+
+def people(count, faces_each, spread=0.05, seed=0):
+    """Encodings of `count` people, `faces_each` noisy photos around one point each"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=0.3, size=(count, DIM)).astype(np.float32)
+    encodings = np.repeat(centers, faces_each, axis=0)
+    encodings += rng.normal(scale=spread / np.sqrt(DIM), size=encodings.shape).astype(np.float32)
+    names = [f"person{n}" for n in range(count) for _ in range(faces_each)]
+    return names, encodings, centers
+
+
+def test_batched_match_equals_the_per_face_loop():
+    names, gallery, centers = people(20, 3)
+    rng = np.random.default_rng(1)
+    queries = np.vstack([centers[:10], rng.normal(scale=0.3, size=(5, DIM))]).astype(np.float32)
+    matcher = FaceMatcher(gallery, names, face_ids=np.arange(100, 160), tolerance=0.6)
+
+    expected = []
+    for query in queries:
+        distances = np.linalg.norm(gallery - query, axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] <= 0.6:
+            expected.append((names[best], 1.0 - distances[best], 100 + best))
+        else:
+            expected.append(("unknown", 0.0, None))
+
+    result = matcher.match(queries)
+    assert [(name, face_id) for name, _, face_id in result] == [(name, face_id) for name, _, face_id in expected]
+    assert np.allclose([confidence for _, confidence, _ in result], [confidence for _, confidence, _ in expected],
+                       atol=1e-5)
+
+
+def test_per_row_thresholds_replace_the_tolerance():
+    gallery = np.zeros((2, DIM), dtype=np.float32)
+    gallery[1, 0] = 10.0
+    query = np.zeros((1, DIM), dtype=np.float32)
+    query[0, 0] = 0.7
+
+    assert FaceMatcher(gallery, ["a", "b"], tolerance=0.6).match(query)[0][0] == "unknown"
+    assert FaceMatcher(gallery, ["a", "b"], tolerance=0.6, thresholds=[0.8, 0.8]).match(query)[0][0] == "a"
+
+
+def test_empty_inputs():
+    assert FaceMatcher(np.empty((0, DIM)), []).match(np.zeros((2, DIM))) == [("unknown", 0.0, None)] * 2
+    assert FaceMatcher(np.zeros((1, DIM)), ["a"]).match(np.empty((0, DIM))) == []
+
+
+def compact_matcher(rows):
+    return FaceMatcher([row["encoding"] for row in rows], [row["name"] for row in rows],
+                       [row["face_id"] for row in rows], thresholds=[row["threshold"] for row in rows])
+
+
+def test_compaction_keeps_a_centroid_and_prototypes_per_person():
+    names, encodings, centers = people(10, 8)
+    face_ids = np.arange(1000, 1080)
+    rows = compact_gallery(face_ids, names, encodings, prototypes_per_person=3)
+
+    assert len(rows) == 10 * 4
+    for n in range(10):
+        person = [row for row in rows if row["name"] == f"person{n}"]
+        assert [row["kind"] for row in person] == ["centroid"] + ["prototype"] * 3
+        assert person[0]["source_count"] == 8
+        assert sum(row["source_count"] for row in person[1:]) == 8
+        assert np.allclose(person[0]["encoding"], encodings[n * 8:(n + 1) * 8].mean(axis=0), atol=1e-6)
+        # Representatives are real rows of that person
+        assert all(1000 + n * 8 <= row["face_id"] < 1000 + (n + 1) * 8 for row in person)
+
+
+def test_small_people_get_only_a_centroid():
+    names, encodings, _ = people(3, 2)
+    rows = compact_gallery(np.arange(6), names, encodings, prototypes_per_person=3)
+    assert [row["kind"] for row in rows] == ["centroid"] * 3
+
+
+def test_thresholds_widen_with_spread_up_to_the_cap():
+    tight_names, tight, _ = people(1, 10, spread=0.01)
+    loose_names, loose, _ = people(1, 10, spread=2.0, seed=1)
+    tight_row = compact_gallery(np.arange(10), tight_names, tight, tolerance=0.5)[0]
+    loose_row = compact_gallery(np.arange(10), loose_names, loose, tolerance=0.5)[0]
+
+    assert 0.5 <= tight_row["threshold"] < 0.51
+    assert loose_row["threshold"] == settings.FACE_PROTOTYPE_MAX_THRESHOLD
+
+
+def test_compact_gallery_agrees_with_the_full_one():
+    names, encodings, _ = people(30, 6)
+    rows = compact_gallery(np.arange(180), names, encodings)
+    report = evaluate_compaction(names, encodings, compact_matcher(rows))
+
+    assert report["gallery_size"] == 180
+    assert report["compact_size"] == len(rows) < 180
+    assert report["full_recall"] == 1.0
+    assert report["compact_recall"] == 1.0
+    assert report["agreement"] == 1.0
@@ -0,0 +1,104 @@
+# tests/test_file_manager.py
+import threading
+import time
+
+import pytest
+
+from config import settings
+from src.data_access.file_manager import FileManager
+
+
+@pytest.fixture
+def file_manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "MAPPINGS_PATH", str(tmp_path / "mappings.jsonl"))
+    monkeypatch.setattr(settings, "MAPPINGS_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "MAPPINGS_IDLE_TIMEOUT", 5)
+    return FileManager()
+
+
+def follow(file_manager):
+    """Tail the mappings in a thread; returns the list it fills and the thread"""
+    seen = []
+    thread = threading.Thread(
+        target=lambda: seen.extend(m["n"] for m in file_manager.iter_mappings(follow=True)), daemon=True)
+    thread.start()
+    return seen, thread
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_follower_reads_pages_as_they_are_written(file_manager):
+    writer = FileManager()
+    writer.start_mappings()
+    seen, thread = follow(file_manager)
+
+    writer.append_mapping({"n": 0})
+    wait_for(lambda: seen == [0])
+    # A line written in two parts is only read once it is complete
+    writer._mappings_file.write('{"n": ')
+    writer._mappings_file.flush()
+    time.sleep(0.05)
+    writer._mappings_file.write('1}\n')
+    writer.append_mapping({"n": 2})
+    writer.finish_mappings()
+
+    thread.join(5)
+    assert not thread.is_alive()
+    assert seen == [0, 1, 2]
+
+
+def test_follower_moves_to_the_stream_of_a_new_run(file_manager):
+    first_run = FileManager()
+    first_run.start_mappings()
+    for n in range(3):
+        first_run.append_mapping({"n": n})
+    seen, thread = follow(file_manager)
+    wait_for(lambda: seen == [0, 1, 2])
+
+    # The previous run is abandoned and a new one starts with fewer, shorter lines
+    second_run = FileManager()
+    second_run.start_mappings()
+    second_run.append_mapping({"n": 10})
+    second_run.finish_mappings()
+
+    thread.join(5)
+    assert not thread.is_alive()
+    assert seen == [0, 1, 2, 10]
+
+
+def test_follower_started_before_phase1_waits_for_the_new_run(file_manager):
+    previous = FileManager()
+    previous.start_mappings()
+    previous.append_mapping({"n": 0})
+    previous.finish_mappings()
+    assert [m["n"] for m in file_manager.iter_mappings(follow=True)] == [0]
+
+    # Phase 2 is started first; the finished stream it finds was already processed
+    seen, thread = follow(file_manager)
+    time.sleep(0.1)
+    assert thread.is_alive() and seen == []
+
+    current = FileManager()
+    current.start_mappings()
+    current.append_mapping({"n": 5})
+    current.finish_mappings()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert seen == [5]
+
+
+def test_plain_reads_skip_the_header_and_ignore_markers(file_manager):
+    writer = FileManager()
+    writer.start_mappings()
+    writer.append_mapping({"n": 1})
+    writer.finish_mappings()
+
+    assert [m["n"] for m in file_manager.iter_mappings(follow=True)] == [1]
+    # Without follow the stream is simply read again
+    assert [m["n"] for m in file_manager.iter_mappings()] == [1]
@@ -0,0 +1,69 @@
+# tests/test_image_downloader.py
+import time
+
+from conftest import Route
+from src.data_access.image_downloader import ImageDownloader
+
+
+def _save(saved):
+    def save_image(content, url, index):
+        saved[url] = content
+        return f"image_{index}"
+    return save_image
+
+
+def test_failed_images_are_replaced_in_page_order(http_server):
+    for name in ("a", "c", "d"):
+        http_server.routes[f"/{name}.jpg"] = Route(name.encode() * 10, content_type="image/jpeg")
+    urls = [http_server.url(f"/{name}.jpg") for name in ("a", "missing", "c", "d")]
+    downloader = ImageDownloader(max_workers=4)
+    saved = {}
+    try:
+        result = downloader.download_page_images(urls, _save(saved), limit=2)
+    finally:
+        downloader.close()
+
+    assert result == [(urls[0], "image_0"), (urls[2], "image_1")]
+    assert saved == {urls[0]: b"a" * 10, urls[2]: b"c" * 10}
+
+
+def test_requests_to_one_host_are_capped(http_server):
+    urls = []
+    for n in range(8):
+        http_server.routes[f"/{n}.jpg"] = Route(b"x", content_type="image/jpeg", delay=0.1)
+        urls.append(http_server.url(f"/{n}.jpg"))
+    downloader = ImageDownloader(max_workers=8, max_per_host=2)
+    try:
+        futures = [downloader.submit_page_images(urls[i:i + 2], _save({})) for i in range(0, 8, 2)]
+        results = [future.result() for future in futures]
+    finally:
+        downloader.close()
+
+    assert sum(len(result) for result in results) == 8
+    assert http_server.max_active <= 2
+
+
+
+def test_a_slow_host_does_not_hold_up_other_hosts(http_server):
+    slow = []
+    for n in range(6):
+        http_server.routes[f"/slow{n}.jpg"] = Route(b"x", content_type="image/jpeg", delay=0.3)
+        slow.append(http_server.url(f"/slow{n}.jpg"))
+    http_server.routes["/fast.jpg"] = Route(b"y", content_type="image/jpeg")
+    # Same server under another host name
+    fast = http_server.url("/fast.jpg").replace("127.0.0.1", "localhost")
+
+    downloader = ImageDownloader(max_workers=4, max_per_host=1)
+    try:
+        slow_page = downloader.submit_page_images(slow, _save({}), limit=6)
+        time.sleep(0.05)
+        start = time.perf_counter()
+        assert downloader.submit_page_images([fast], _save({})).result() == [(fast, "image_0")]
+        fast_seconds = time.perf_counter() - start
+        assert len(slow_page.result()) == 6
+    finally:
+        downloader.close()
+
+    # Waiting slow requests stay queued instead of occupying the other three threads
+    assert fast_seconds < 0.25
+    assert http_server.max_active <= 2
@@ -0,0 +1,72 @@
+# tests/test_pipeline.py
+import threading
+
+from src.pipeline import Pipeline
+
+
+def produce(count):
+    def worker(inputs, emit):
+        for n in range(count):
+            emit(n)
+    return worker
+
+
+def collect(into):
+    def worker(inputs, emit):
+        for item in inputs:
+            into.append(item)
+            emit(item)
+    return worker
+
+
+def run(pipeline):
+    # Daemon stage threads: a hang shows up as a failed join instead of a stuck test run
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(stats=pipeline.run()), daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "pipeline did not shut down"
+    return result["stats"]
+
+
+def test_every_worker_of_every_stage_sees_the_end():
+    seen = []
+    stats = run(Pipeline(queue_size=2)
+                .add_stage("source", produce(50))
+                .add_stage("middle", collect([]), 3)
+                .add_stage("sink", collect(seen), 2))
+
+    assert sorted(seen) == list(range(50))
+    assert [stage.items_out for stage in stats] == [50, 50, 50]
+    assert not any(stage.failed_workers for stage in stats)
+
+
+def test_a_failed_worker_does_not_block_its_upstream():
+    def fail_after_one(inputs, emit):
+        for item in inputs:
+            raise RuntimeError(f"failed on {item}")
+
+    seen = []
+    stats = run(Pipeline(queue_size=1)
+                .add_stage("source", produce(20))
+                .add_stage("broken", fail_after_one)
+                .add_stage("sink", collect(seen)))
+
+    # The source could emit everything although nobody processes it any more
+    assert stats[0].items_out == 20
+    assert stats[1].failed_workers == 1
+    assert seen == []
+
+
+def test_a_failed_source_still_ends_the_run():
+    def source(inputs, emit):
+        emit("first")
+        raise RuntimeError("source failed")
+
+    seen = []
+    stats = run(Pipeline()
+                .add_stage("source", source)
+                .add_stage("sink", collect(seen), 2))
+
+    assert seen == ["first"]
+    assert stats[0].failed_workers == 1
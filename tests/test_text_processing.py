@@ -0,0 +1,83 @@
+# tests/test_text_processing.py
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langdetect")
+pytest.importorskip("sklearn")
+
+from src.text_processing import TextMetadataExtractor
+
+
+class FakeNLP:
+    """spaCy stand-in: every capitalized word is a PERSON, words ending in 'Corp' are ORGs"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.pipe_calls = 0
+
+    def __call__(self, text):
+        if text == self.fail_on:
+            raise ValueError("bad document")
+        ents = [SimpleNamespace(text=word, label_="ORG" if word.endswith("Corp") else "PERSON")
+                for word in text.split() if word[0].isupper()]
+        return SimpleNamespace(ents=ents)
+
+    def pipe(self, texts, batch_size, n_process):
+        self.pipe_calls += 1
+        for text in texts:
+            yield self(text)
+
+
+class FakeKeyBERT:
+    def extract_keywords(self, docs, **kwargs):
+        keywords = [[(doc.split()[0], 1.0)] for doc in docs]
+        # KeyBERT returns a flat list for a single document
+        return keywords[0] if len(docs) == 1 else keywords
+
+
+def fake_sentiment(texts, **kwargs):
+    texts = [texts] if isinstance(texts, str) else texts
+    return [{"label": "NEGATIVE" if "bad" in text else "POSITIVE", "score": 0.9} for text in texts]
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    monkeypatch.setattr(TextMetadataExtractor, "nlp", FakeNLP())
+    monkeypatch.setattr(TextMetadataExtractor, "kw_model", FakeKeyBERT())
+    monkeypatch.setattr(TextMetadataExtractor, "sentiment_analyzer", staticmethod(fake_sentiment))
+    return TextMetadataExtractor()
+
+
+TEXTS = ["Alice met Bob at AcmeCorp today", "", "nothing named here", "Carol and Alice again with Alice"]
+
+
+def test_batched_entities_match_the_per_document_ones(extractor):
+    entities = extractor.extract_named_entities_batch(TEXTS)
+
+    assert entities == [extractor.extract_named_entities(text) for text in TEXTS]
+    assert entities[0] == (["Alice", "Bob"], ["AcmeCorp"], [])
+    assert entities[3] == (["Carol", "Alice"], [], [])
+    assert extractor.nlp.pipe_calls == 1
+
+
+def test_a_failing_document_only_loses_its_own_entities(extractor, monkeypatch):
+    monkeypatch.setattr(TextMetadataExtractor, "nlp", FakeNLP(fail_on=TEXTS[3]))
+
+    entities = extractor.extract_named_entities_batch(TEXTS)
+    assert entities == [(["Alice", "Bob"], ["AcmeCorp"], []), ([], [], []), ([], [], []), ([], [], [])]
+
+
+def test_keywords_handle_a_single_eligible_document(extractor):
+    texts = ["short", "Keywords " + "word " * 20]
+    assert extractor.extract_keywords_batch(texts) == [[], ["Keywords"]]
+
+
+def test_analyze_pages_keeps_page_order(extractor):
+    pages = [{"title": f"Page {n}", "cleaned_text": text} for n, text in enumerate(TEXTS)]
+    metas = [{"target_uri": f"http://example.com/{n}"} for n in range(len(TEXTS))]
+
+    results = extractor.analyze_pages(pages, metas)
+    assert [r["target_uri"] for r in results] == [m["target_uri"] for m in metas]
+    assert [r["person_entities"] for r in results] == [["Alice", "Bob"], [], [], ["Carol", "Alice"]]
+    assert [r["sentiment_label"] for r in results] == ["positive", "neutral", "positive", "positive"]
@@ -0,0 +1,70 @@
+# tests/test_text_service.py
+import sqlite3
+
+import pytest
+
+pytest.importorskip("langdetect")
+pytest.importorskip("sklearn")
+
+from src.data_access.database import DatabaseManager
+from src.services import text_service
+
+
+class FakeExtractor:
+    """Stands in for the NLP models; records how many rows were committed when each batch arrives"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.committed_at_batch = []
+
+    def clean_html_batch(self, raw_pages):
+        return [{"text": ""} for _ in raw_pages]
+
+    def analyze_pages(self, pages, metas):
+        with sqlite3.connect(self.db_path) as conn:
+            self.committed_at_batch.append(conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0])
+        return [{"target_uri": meta["target_uri"], "title": meta["target_uri"], "cleaned_text": "text"}
+                for meta in metas]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr(text_service, "DatabaseManager", lambda: DatabaseManager(db_path))
+    monkeypatch.setattr(text_service, "FileManager", lambda: None)
+    monkeypatch.setattr(text_service.settings, "TEXT_BATCH_SIZE", 3)
+    service = text_service.TextService()
+    service.extractor = FakeExtractor(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TRIGGER reject_bad BEFORE INSERT ON images "
+                     "WHEN NEW.image_path LIKE '%bad.jpg' BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    return service
+
+
+def mappings(count, bad=()):
+    return [{"url": f"http://example.com/{n}", "html_path": f"html/{n}.html", "page": {"text": "x"},
+             "images": [f"images/{'bad' if n in bad else n}.jpg"]}
+            for n in range(count)]
+
+
+def test_batches_are_committed_before_the_next_one_is_analyzed(service):
+    stored = []
+    service.process_html_files(mapping_source=lambda on_idle: mappings(7), on_batch_stored=stored.append)
+
+    assert service.extractor.committed_at_batch == [0, 3, 6]
+    assert [len(ids) for ids in stored] == [3, 3, 1]
+
+
+def test_a_failing_row_only_loses_itself(service):
+    stored = []
+    service.process_html_files(mapping_source=lambda on_idle: mappings(6, bad={4}),
+                               on_batch_stored=stored.append)
+
+    with sqlite3.connect(service.db.db_path) as conn:
+        committed = sorted(row[0] for row in conn.execute("SELECT article_id FROM articles"))
+    assert [len(ids) for ids in stored] == [3, 2]
+    # Every reported id exists, and nothing else does
+    assert sorted(i for ids in stored for i in ids) == committed
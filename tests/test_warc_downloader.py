@@ -0,0 +1,92 @@
+# tests/test_warc_downloader.py
+import hashlib
+import os
+import threading
+
+from conftest import Route
+from config import settings
+from src.data_access.warc_downloader import WARCDownloader
+
+BODY = os.urandom(64 * 1024)
+
+
+def _download(tmp_path, http_server, route, part=None):
+    http_server.routes["/crawl/sample.warc.gz"] = route
+    downloader = WARCDownloader(download_dir=str(tmp_path))
+    local = tmp_path / "sample.warc.gz"
+    if part is not None:
+        (tmp_path / "sample.warc.gz.part").write_bytes(part)
+    return downloader.download_warc_file(http_server.url("/crawl/sample.warc.gz")), local
+
+
+def test_resumes_part_file(tmp_path, http_server):
+    route = Route(BODY, etag=hashlib.md5(BODY).hexdigest())
+    result, local = _download(tmp_path, http_server, route, part=BODY[:1000])
+
+    assert result == str(local)
+    assert local.read_bytes() == BODY
+    assert not (tmp_path / "sample.warc.gz.part").exists()
+    assert route.requests[0]["Range"] == "bytes=1000-"
+
+
+def test_truncated_download_is_never_renamed(tmp_path, http_server, monkeypatch):
+    # HEAD fails, so only the GET's own length can reveal the truncation
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRIES", 1)
+    monkeypatch.setattr(settings, "DOWNLOAD_CHUNK_SIZE", 1000)
+    route = Route(BODY, head_status=500, truncate_first=5000)
+    result, local = _download(tmp_path, http_server, route)
+
+    assert result is None
+    assert not local.exists()
+    assert (tmp_path / "sample.warc.gz.part").read_bytes() == BODY[:5000]
+
+    # The next run resumes from the part file instead of reusing a short file
+    result, local = _download(tmp_path, http_server, route)
+    assert result == str(local)
+    assert local.read_bytes() == BODY
+    assert route.requests[-1]["Range"] == "bytes=5000-"
+
+
+def test_size_mismatch_is_rejected(tmp_path, http_server):
+    route = Route(BODY, head_length=len(BODY) + 10)
+    result, local = _download(tmp_path, http_server, route)
+
+    assert result is None
+    assert not local.exists()
+
+
+def test_md5_mismatch_starts_over(tmp_path, http_server, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRIES", 2)
+    route = Route(BODY, etag=hashlib.md5(BODY).hexdigest())
+    result, local = _download(tmp_path, http_server, route, part=b"x" * len(BODY))
+
+    # The full-size but corrupt part file is discarded and downloaded again
+    assert result == str(local)
+    assert local.read_bytes() == BODY
+    assert "Range" not in route.requests[-1]
+
+
+def test_iter_warc_files_checks_stop_before_waiting(tmp_path, http_server):
+    for name in ("a", "b", "c"):
+        http_server.routes[f"/{name}.warc.gz"] = Route(BODY)
+    downloader = WARCDownloader(download_dir=str(tmp_path))
+    urls = [http_server.url(f"/{name}.warc.gz") for name in ("a", "b", "c")]
+
+    consumed = []
+    for warc_url, local in downloader.iter_warc_files(urls, max_workers=1, should_stop=lambda: len(consumed) >= 1):
+        consumed.append(local)
+
+    assert consumed == [str(tmp_path / "a.warc.gz")]
+    assert not (tmp_path / "b.warc.gz").exists()
+    assert not (tmp_path / "c.warc.gz").exists()
+
+
+def test_each_thread_gets_its_own_session(tmp_path):
+    downloader = WARCDownloader(download_dir=str(tmp_path))
+    other = []
+    thread = threading.Thread(target=lambda: other.append(downloader.session))
+    thread.start()
+    thread.join()
+
+    assert downloader.session is downloader.session
+    assert other[0] is not downloader.session
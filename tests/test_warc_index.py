@@ -0,0 +1,52 @@
+# tests/test_warc_index.py
+import os
+
+from conftest import html_pages, write_warc
+from src.data_access.warc_index import WARCIndex
+from src.services.warc_service import iter_html_records
+
+
+def test_index_is_written_when_the_consumer_stops_early(tmp_path):
+    warc = write_warc(tmp_path / "a.warc.gz", html_pages(30))
+    index = WARCIndex()
+
+    records = index.iter_html_records(warc)
+    first = [next(records) for _ in range(12)]
+    records.close()
+
+    assert os.path.exists(index.index_path(warc))
+    assert len(index.load(warc)) == 30
+    # The next run seeks instead of scanning, and sees the same pages
+    assert list(index.iter_html_records(warc))[:12] == first
+
+
+def test_indexed_reads_match_a_full_scan(tmp_path):
+    pages = html_pages(5) + html_pages(5, host="other.org")
+    warc = write_warc(tmp_path / "b.warc.gz", pages, image_every=2)
+    with open(warc, "rb") as stream:
+        scanned = list(iter_html_records(stream))
+
+    index = WARCIndex()
+    assert list(index.iter_html_records(warc)) == scanned
+    assert list(index.iter_html_records(warc)) == scanned
+    assert len(index.load(warc)) == 15
+    assert [uri for uri, _ in index.iter_html_records(warc, domain="other.org")] == [url for url, _ in pages[5:]]
+
+
+def test_start_offset_skips_earlier_records(tmp_path):
+    warc = write_warc(tmp_path / "c.warc.gz", html_pages(6))
+    index = WARCIndex()
+    offset = index.load(warc)[3].offset
+
+    assert [uri for uri, _ in index.iter_html_records(warc, start_offset=offset)] == \
+        [url for url, _ in html_pages(6)[3:]]
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    warc = write_warc(tmp_path / "d.warc.gz", html_pages(2))
+    index = WARCIndex()
+    index.build(warc)
+    write_warc(tmp_path / "d.warc.gz", html_pages(4))
+    os.utime(index.index_path(warc), (0, 0))
+
+    assert len(index.load(warc)) == 4
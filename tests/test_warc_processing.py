@@ -0,0 +1,35 @@
+# tests/test_warc_processing.py
+import pytest
+
+from config import settings
+from src import html_cleaning, warc_processing
+
+PAGE = b"""<html><head><title> Story </title>
+<meta property="article:published_time" content="2024-01-02"><meta name="author" content="By Ann Lee">
+<script type="application/ld+json">{"@type": "NewsArticle", "datePublished": "2024-05-05"}</script></head>
+<body><nav>Menu</nav><article><p>Hello world</p>
+<figure><img src="/a.jpg" alt="A"><figcaption>Cap <b>x</b></figcaption></figure>
+<img data-src="b.png"></article></body></html>"""
+
+
+@pytest.mark.parametrize("backend", ["selectolax", "lxml", "bs4"])
+def test_every_backend_extracts_the_same_page(backend):
+    if backend == "selectolax":
+        pytest.importorskip("selectolax")
+    page = warc_processing.EXTRACTORS[backend](PAGE, "http://www.example.com/news/1")
+
+    assert page["title"] == "Story"
+    assert page["cleaned_text"] == "Story Hello world Cap x"
+    assert (page["publication_date"], page["author"], page["source_domain"]) == ("2024-01-02", "Ann Lee", "example.com")
+    assert page["images"] == [
+        {"url": "http://www.example.com/a.jpg", "alt_text": "A", "caption": "Cap x"},
+        {"url": "http://www.example.com/news/b.png", "alt_text": None, "caption": None},
+    ]
+
+
+def test_extraction_uses_the_configured_cleaner(monkeypatch):
+    monkeypatch.setattr(settings, "HTML_CLEANER", "bs4")
+    monkeypatch.setattr(html_cleaning, "_selected", {})
+    monkeypatch.setattr(warc_processing, "_extractor", None)
+
+    assert warc_processing._get_extractor() is warc_processing.extract_page_bs4
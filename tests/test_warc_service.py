@@ -0,0 +1,27 @@
+# tests/test_warc_service.py
+from conftest import Route, html_pages, write_warc
+from config import settings
+from src.services.warc_service import WARCService
+
+
+def test_parallel_scan_streams_pages_and_stops_at_the_cap(http_server, tmp_path, monkeypatch):
+    warc_urls = []
+    for n in range(4):
+        path = write_warc(tmp_path / f"w{n}.warc.gz", html_pages(40, host=f"site{n}.example.com"))
+        with open(path, "rb") as f:
+            http_server.routes[f"/w{n}.warc.gz"] = Route(f.read())
+        warc_urls.append(http_server.url(f"/w{n}.warc.gz"))
+
+    # Workers download into data/ relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "MAX_HTML_PAGES", 10)
+    monkeypatch.setattr(settings, "WARC_PROCESS_WORKERS", 2)
+    monkeypatch.setattr(settings, "WARC_SCAN_QUEUE_CHUNKS", 1)
+    service = WARCService()
+    service.downloader.download_and_get_warc_paths = lambda: warc_urls
+
+    assert service.process_warc_files() == 10
+
+    mappings = list(service.file_manager.iter_mappings())
+    assert len(mappings) == 10
+    assert len({mapping["url"] for mapping in mappings}) == 10